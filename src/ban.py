@@ -1,6 +1,59 @@
+import itertools
+import random
 import typing as tp
+from dataclasses import dataclass
+from enum import Enum, auto
 
-from values import Cell, Position
+from layout import BoardLayout, get_layout
+from values import Cell, Position, StoneColor, intern_cells
+
+#: 判定する方向(右、下、右下、左下)
+_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+#: Zobristハッシュの乱数の種
+_ZOBRIST_SEED = 0x5A4D
+#: これより大きな盤では Zobrist の乱数表を作らず、その都度ハッシュで求める
+_ZOBRIST_TABLE_LIMIT = 64
+#: 64ビットのマスク
+_MASK64 = (1 << 64) - 1
+
+
+class HashedZobristTable:
+    """Zobristハッシュの値を、表を持たずに添字から求める(splitmix64).
+
+    大きな盤でもマス数に比例したメモリを使わない.
+
+    :param seed: 乱数の種
+    """
+
+    def __init__(self, seed: int) -> None:
+        self._seed = seed
+
+    def __getitem__(self, index: int) -> int:
+        z = (index + self._seed) * 0x9E3779B97F4A7C15 & _MASK64
+        z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+        z = (z ^ (z >> 27)) * 0x94D049BB133111EB & _MASK64
+        return z ^ (z >> 31)
+
+
+#: マス数→Zobristハッシュの乱数表
+_zobrist_tables: tp.Dict[int, tp.Union[tp.List[int], HashedZobristTable]] = {}
+
+
+def get_zobrist_table(cell_num: int) -> tp.Union[tp.List[int], HashedZobristTable]:
+    """Zobristハッシュの乱数表を得る.
+
+    マス (row, column) の色 color の値は table[(row * cell_num + column) * (StoneColor.Max + 1) + color].
+    同じマス数なら常に同じ表になる. 大きな盤では表の代わりに HashedZobristTable を返す.
+    """
+    table = _zobrist_tables.get(cell_num)
+    if table is None:
+        if cell_num <= _ZOBRIST_TABLE_LIMIT:
+            rand = random.Random(_ZOBRIST_SEED + cell_num)
+            table = [rand.getrandbits(64) for _ in range(cell_num * cell_num * (StoneColor.Max + 1))]
+        else:
+            table = HashedZobristTable((_ZOBRIST_SEED + cell_num) << 32)
+        _zobrist_tables[cell_num] = table
+    return table
 
 
 class SequenceCounter:
@@ -19,87 +72,88 @@ class SequenceCounter:
         return self._num
 
 
-class Ban:
-    """盤面.
+class PutState(Enum):
+    """石を置いた結果."""
+    #: 他の石があって置けなかった
+    Occupied = auto()
+    #: ゲーム続行
+    Continue = auto()
+    #: 失敗
+    Fail = auto()
+    #: クリア
+    Success = auto()
+
+
+@dataclass(frozen=True)
+class PutResult:
+    """Ban.place の戻り値.
+
+    :param state: 置いた結果
+    :param line: 失敗時に揃ってしまった列
+    """
+    state: PutState
+    line: tp.Tuple[Cell, ...] = ()
+
+
+class BanBackend(Enum):
+    """盤面の記憶方式."""
+    #: 二次元リスト
+    List = auto()
+    #: 色ごとのビットボード
+    Bit = auto()
+    #: 石のあるマスだけの辞書(大きな盤向け)
+    Sparse = auto()
+
+
+class ListCells:
+    """二次元リストによるマスの記憶.
 
-    :param size: 盤の大きさ
     :param cell_num: 一辺のマス数
-    :param margin: 盤の端からマスまでの余白
     :param fail_num: 失敗判定となる数
     """
 
-    def __init__(self, size: int, cell_num: int, margin: int, fail_num: int) -> None:
-        self._size = size
+    def __init__(self, cell_num: int, fail_num: int) -> None:
         self._cell_num = cell_num
-        self._margin = margin
         self._fail_num = fail_num
 
-        self._cells: tp.List[tp.List] = []
+        self._rows: tp.List[tp.List] = []
         for row in range(cell_num):
-            self._cells.append([])
+            self._rows.append([])
             for column in range(cell_num):
-                self._cells[row].append(0)
+                self._rows[row].append(0)
 
-    @property
-    def size(self) -> int:
-        """盤の大きさ."""
-        return self._size
-
-    @property
-    def cell_num(self) -> int:
-        """盤のマス数."""
+    def __len__(self) -> int:
         return self._cell_num
 
-    @property
-    def margin(self) -> int:
-        return self._margin
+    def __getitem__(self, row: int) -> tp.List:
+        return self._rows[row]
 
-    def display(self):
-        print(self._cells)
+    def __repr__(self) -> str:
+        return repr(self._rows)
 
-    def get(self, cell: Cell) -> int:
+    def get(self, row: int, column: int) -> int:
         """指定位置の石を得る."""
-        return self._cells[cell.row][cell.column]
-
-    def put(self, cell: Cell, color) -> bool:
-        """石を置く.
-
-        :return: 置けたらTrue. 他の石があって置けない場合はFalse
-        """
-        if not self._is_in_range(cell):
-            raise ValueError()
-
-        if self._cells[cell.row][cell.column] == 0:
-            self._cells[cell.row][cell.column] = color
-            return True
-        return False
-
-    def _is_in_range(self, cell: Cell) -> bool:
-        """指定した座標が範囲内か"""
-        if cell.column < 0 or self._cell_num <= cell.column:
-            return False
-        if cell.row < 0 or self._cell_num <= cell.row:
-            return False
-        return True
-
-    def position_to_cell(self, pos: Position) -> tp.Optional[Cell]:
-        row = (pos.y - self._margin) / self._cell_size
-        column = (pos.x - self._margin) / self._cell_size
-        if row < 0 or column < 0:
-            return None
+        return self._rows[row][column]
 
-        try:
-            cell = Cell(int(row), int(column))
-        except ValueError:
-            return None
+    def set(self, row: int, column: int, color) -> None:
+        """指定位置の石を設定する. 0なら取り除く."""
+        self._rows[row][column] = color
 
-        if self._is_in_range(cell):
-            return cell
-        return None
+    def stones(self) -> tp.Iterator[tp.Tuple[int, int]]:
+        """石のあるマスを (row * cell_num + column, 色) で列挙する."""
+        cell_num = self._cell_num
+        for (row, colors) in enumerate(self._rows):
+            for (column, color) in enumerate(colors):
+                if color != 0:
+                    yield row * cell_num + column, color
 
-    @property
-    def _cell_size(self) -> int:
-        return int((self._size - (self._margin * 2)) / self._cell_num)
+    def empty_indices(self) -> tp.List[int]:
+        """空きマスの row * cell_num + column を昇順に得る."""
+        cell_num = self._cell_num
+        return [
+            row * cell_num + column
+            for (row, colors) in enumerate(self._rows)
+            for (column, color) in enumerate(colors) if color == 0]
 
     def is_fail(self) -> bool:
         """失敗判定"""
@@ -118,7 +172,7 @@ class Ban:
         if x <= start_max:
             counter = SequenceCounter()
             for dx in range(self._fail_num):
-                col = self._cells[y][x + dx]
+                col = self._rows[y][x + dx]
                 if col == 0:
                     break
                 num = counter.count(col)
@@ -129,7 +183,7 @@ class Ban:
         if y <= start_max:
             counter = SequenceCounter()
             for dy in range(self._fail_num):
-                col = self._cells[y + dy][x]
+                col = self._rows[y + dy][x]
                 if col == 0:
                     break
                 num = counter.count(col)
@@ -140,7 +194,7 @@ class Ban:
         if x <= start_max and y <= start_max:
             counter = SequenceCounter()
             for d in range(self._fail_num):
-                col = self._cells[y + d][x + d]
+                col = self._rows[y + d][x + d]
                 if col == 0:
                     break
                 num = counter.count(col)
@@ -151,7 +205,7 @@ class Ban:
         if start_min <= x and y <= start_max:
             counter = SequenceCounter()
             for d in range(self._fail_num):
-                col = self._cells[y + d][x - d]
+                col = self._rows[y + d][x - d]
                 if col == 0:
                     break
                 num = counter.count(col)
@@ -160,10 +214,484 @@ class Ban:
 
         return False
 
+
+class BitCells:
+    """色ごとのビットマスクによるマスの記憶.
+
+    各行の右端に番兵用の空き列を1つ置き、横・斜め方向のシフトで
+    次の行へ回り込まないようにしている.
+
+    :param cell_num: 一辺のマス数
+    :param fail_num: 失敗判定となる数
+    """
+
+    def __init__(self, cell_num: int, fail_num: int) -> None:
+        self._cell_num = cell_num
+        self._fail_num = fail_num
+        self._stride = cell_num + 1
+        # 右、下、右下、左下へ1マス進んだときのビット位置の差
+        self._shifts = (1, self._stride, self._stride + 1, self._stride - 1)
+        # 色ごとのビットマスク(添字0は未使用)
+        self._masks: tp.List[int] = [0] * (StoneColor.Max + 1)
+
+    def __len__(self) -> int:
+        return self._cell_num
+
+    def __getitem__(self, row: int) -> tp.List:
+        return [self.get(row, column) for column in range(self._cell_num)]
+
+    def __repr__(self) -> str:
+        return repr([self[row] for row in range(self._cell_num)])
+
+    def get(self, row: int, column: int) -> int:
+        """指定位置の石を得る."""
+        bit = 1 << (row * self._stride + column)
+        for color in range(StoneColor.Min, StoneColor.Max + 1):
+            if self._masks[color] & bit:
+                return color
+        return 0
+
+    def set(self, row: int, column: int, color) -> None:
+        """指定位置の石を設定する. 0なら取り除く."""
+        bit = 1 << (row * self._stride + column)
+        for c in range(StoneColor.Min, StoneColor.Max + 1):
+            self._masks[c] &= ~bit
+        if color != 0:
+            self._masks[color] |= bit
+
+    def stones(self) -> tp.Iterator[tp.Tuple[int, int]]:
+        """石のあるマスを (row * cell_num + column, 色) で列挙する."""
+        for color in range(StoneColor.Min, StoneColor.Max + 1):
+            mask = self._masks[color]
+            while mask:
+                low = mask & -mask
+                (row, column) = divmod(low.bit_length() - 1, self._stride)
+                yield row * self._cell_num + column, color
+                mask ^= low
+
+    def empty_indices(self) -> tp.List[int]:
+        """空きマスの row * cell_num + column を昇順に得る."""
+        occupied = 0
+        for color in range(StoneColor.Min, StoneColor.Max + 1):
+            occupied |= self._masks[color]
+        return [
+            row * self._cell_num + column
+            for row in range(self._cell_num)
+            for column in range(self._cell_num)
+            if not occupied >> (row * self._stride + column) & 1]
+
+    def is_fail(self) -> bool:
+        """失敗判定"""
+        for color in range(StoneColor.Min, StoneColor.Max + 1):
+            if self.fail_mask(self._masks[color]):
+                return True
+        return False
+
+    def fail_mask(self, mask: int) -> int:
+        """失敗判定数以上並んだ列の始点のビットを得る."""
+        result = 0
+        for shift in self._shifts:
+            run = mask
+            for i in range(1, self._fail_num):
+                run &= mask >> (shift * i)
+            result |= run
+        return result
+
+
+class SparseCells:
+    """石のあるマスだけを辞書に持つマスの記憶.
+
+    メモリは盤の面積ではなく置いた石の数に比例する.
+
+    :param cell_num: 一辺のマス数
+    :param fail_num: 失敗判定となる数
+    """
+
+    def __init__(self, cell_num: int, fail_num: int) -> None:
+        self._cell_num = cell_num
+        self._fail_num = fail_num
+        # row * cell_num + column → 色
+        self._stones: tp.Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self._cell_num
+
+    def __getitem__(self, row: int) -> tp.List:
+        return [self.get(row, column) for column in range(self._cell_num)]
+
+    def __repr__(self) -> str:
+        return repr(self._stones)
+
+    @property
+    def stone_num(self) -> int:
+        """置かれている石の数."""
+        return len(self._stones)
+
+    def get(self, row: int, column: int) -> int:
+        """指定位置の石を得る."""
+        return self._stones.get(row * self._cell_num + column, 0)
+
+    def set(self, row: int, column: int, color) -> None:
+        """指定位置の石を設定する. 0なら取り除く."""
+        index = row * self._cell_num + column
+        if color == 0:
+            self._stones.pop(index, None)
+        else:
+            self._stones[index] = color
+
+    def stones(self) -> tp.Iterator[tp.Tuple[int, int]]:
+        """石のあるマスを (row * cell_num + column, 色) で列挙する."""
+        return iter(self._stones.items())
+
+    def empty_indices(self) -> tp.List[int]:
+        """空きマスの row * cell_num + column を昇順に得る.
+
+        マスを1つずつ調べずに、石のあるマスの間の範囲をつなげる.
+        """
+        ranges = []
+        start = 0
+        for index in sorted(self._stones):
+            ranges.append(range(start, index))
+            start = index + 1
+        ranges.append(range(start, self._cell_num * self._cell_num))
+        return list(itertools.chain.from_iterable(ranges))
+
+    def is_fail(self) -> bool:
+        """失敗判定.
+
+        置かれた石だけを調べ、各方向の並びの先頭から数える.
+        """
+        cell_num = self._cell_num
+        stones = self._stones
+        for (index, color) in stones.items():
+            (row, column) = divmod(index, cell_num)
+            for (dr, dc) in _DIRECTIONS:
+                prev_row = row - dr
+                prev_column = column - dc
+                if (0 <= prev_row < cell_num and 0 <= prev_column < cell_num
+                        and stones.get(prev_row * cell_num + prev_column) == color):
+                    continue
+                num = 1
+                r = row + dr
+                c = column + dc
+                while 0 <= r < cell_num and 0 <= c < cell_num and stones.get(r * cell_num + c) == color:
+                    num += 1
+                    if self._fail_num <= num:
+                        return True
+                    r += dr
+                    c += dc
+                if self._fail_num <= num:
+                    return True
+        return False
+
+
+class Ban:
+    """盤面.
+
+    :param size: 盤の大きさ
+    :param cell_num: 一辺のマス数
+    :param margin: 盤の端からマスまでの余白
+    :param fail_num: 失敗判定となる数
+    :param backend: 盤面の記憶方式
+    """
+
+    def __init__(
+            self,
+            size: int,
+            cell_num: int,
+            margin: int,
+            fail_num: int,
+            backend: BanBackend = BanBackend.List) -> None:
+        self._size = size
+        self._cell_num = cell_num
+        self._margin = margin
+        self._fail_num = fail_num
+        self._backend = backend
+        self._layout = get_layout(size, cell_num, margin)
+
+        if backend == BanBackend.Bit:
+            self._cells: tp.Union[ListCells, BitCells, SparseCells] = BitCells(cell_num, fail_num)
+        elif backend == BanBackend.Sparse:
+            self._cells = SparseCells(cell_num, fail_num)
+        else:
+            self._cells = ListCells(cell_num, fail_num)
+        self._empty_num = cell_num * cell_num
+        self._zobrist_table = get_zobrist_table(cell_num)
+        self._zobrist_key = 0
+        intern_cells(cell_num)
+
+        # 色ごとの、置くと失敗になる空きマス(row * cell_num + column).
+        # 置くだけなら要らないので、初めて問い合わせがあったときに作る
+        self._forbidden: tp.Optional[tp.List[tp.Set[int]]] = None
+        # 1個で失敗になるなら、どの空きマスも置くと失敗になる
+        self._all_forbidden = fail_num <= 1
+
+    @property
+    def size(self) -> int:
+        """盤の大きさ."""
+        return self._size
+
+    @property
+    def cell_num(self) -> int:
+        """盤のマス数."""
+        return self._cell_num
+
+    @property
+    def margin(self) -> int:
+        return self._margin
+
+    @property
+    def fail_num(self) -> int:
+        """失敗判定となる数."""
+        return self._fail_num
+
+    @property
+    def layout(self) -> BoardLayout:
+        """盤の配置."""
+        return self._layout
+
+    @property
+    def backend(self) -> BanBackend:
+        """盤面の記憶方式."""
+        return self._backend
+
+    @property
+    def empty_num(self) -> int:
+        """空いているマスの数."""
+        return self._empty_num
+
+    @property
+    def stone_num(self) -> int:
+        """置かれている石の数."""
+        return self._cell_num * self._cell_num - self._empty_num
+
+    @property
+    def zobrist_key(self) -> int:
+        """盤面のZobristハッシュ. 置く・取り除くたびに差分で更新される."""
+        return self._zobrist_key
+
+    def display(self):
+        print(self._cells)
+
+    def to_list(self) -> tp.List[tp.List[int]]:
+        """盤面を二次元リストで得る(空きマスは0)."""
+        return [list(self._cells[row]) for row in range(self._cell_num)]
+
+    def get(self, cell: Cell) -> int:
+        """指定位置の石を得る."""
+        return self._cells.get(cell.row, cell.column)
+
+    def put(self, cell: Cell, color) -> bool:
+        """石を置く.
+
+        :return: 置けたらTrue. 他の石があって置けない場合はFalse
+        """
+        if not self._is_in_range(cell):
+            raise ValueError()
+
+        if self._cells.get(cell.row, cell.column) == 0:
+            self._cells.set(cell.row, cell.column, color)
+            self._empty_num -= 1
+            self._zobrist_key ^= self._zobrist_table[self._zobrist_index(cell, color)]
+            if self._forbidden is not None:
+                self._update_forbidden_on_put(cell.row, cell.column, color)
+            return True
+        return False
+
+    def remove(self, cell: Cell) -> int:
+        """石を取り除く.
+
+        :return: 取り除いた石. 空きマスだった場合は0
+        """
+        if not self._is_in_range(cell):
+            raise ValueError()
+
+        color = self._cells.get(cell.row, cell.column)
+        if color != 0:
+            self._cells.set(cell.row, cell.column, 0)
+            self._empty_num += 1
+            self._zobrist_key ^= self._zobrist_table[self._zobrist_index(cell, color)]
+            if self._forbidden is not None:
+                self._update_forbidden_on_remove(cell.row, cell.column, color)
+        return color
+
+    def _zobrist_index(self, cell: Cell, color) -> int:
+        return (cell.row * self._cell_num + cell.column) * (StoneColor.Max + 1) + color
+
+    def place(self, cell: Cell, color) -> PutResult:
+        """石を置き、その結果を判定する.
+
+        置いた石を通る列だけを調べるので、盤全体を走査する is_fail より速い.
+        置く前の盤面が失敗状態でないことが前提.
+
+        :return: 置いた結果と、失敗時に揃った列
+        """
+        if not self.put(cell, color):
+            return PutResult(PutState.Occupied)
+
+        line = self._find_line(cell.row, cell.column, color)
+        if line:
+            return PutResult(PutState.Fail, line)
+        if self._empty_num == 0:
+            return PutResult(PutState.Success)
+        return PutResult(PutState.Continue)
+
+    def would_fail(self, cell: Cell, color) -> bool:
+        """空きマスに石を置いたら失敗になるか. 盤面は変更しない."""
+        if self._all_forbidden:
+            return True
+        return (cell.row * self._cell_num + cell.column) in self._forbidden_cells()[color]
+
+    def forbidden_num(self, color) -> int:
+        """置くと失敗になる空きマスの数."""
+        if self._all_forbidden:
+            return self._empty_num
+        return len(self._forbidden_cells()[color])
+
+    def has_safe_cell(self, color) -> bool:
+        """置いても失敗にならない空きマスがあるか."""
+        return self.forbidden_num(color) < self._empty_num
+
+    def safe_cells(self, color) -> tp.List[Cell]:
+        """置いても失敗にならない空きマスを全て得る."""
+        if self._all_forbidden:
+            return []
+        forbidden = self._forbidden_cells()[color]
+        cell_num = self._cell_num
+        return [
+            Cell(*divmod(index, cell_num))
+            for index in self._cells.empty_indices() if index not in forbidden]
+
+    def empty_cells(self) -> tp.List[Cell]:
+        """空いているマスを全て得る."""
+        cell_num = self._cell_num
+        return [Cell(*divmod(index, cell_num)) for index in self._cells.empty_indices()]
+
+    def _forbidden_cells(self) -> tp.List[tp.Set[int]]:
+        """色ごとの、置くと失敗になる空きマス.
+
+        初めて呼ばれたときに石の周りだけを調べて作り、以降は置く・取り除くたびに
+        差分で更新する.
+        """
+        if self._forbidden is None:
+            forbidden: tp.List[tp.Set[int]] = [set() for _ in range(StoneColor.Max + 1)]
+            cell_num = self._cell_num
+            for (index, color) in self._cells.stones():
+                (row, column) = divmod(index, cell_num)
+                for (dr, dc) in _DIRECTIONS:
+                    for sign in (-1, 1):
+                        end_row = row + dr * sign
+                        end_column = column + dc * sign
+                        if not (0 <= end_row < cell_num and 0 <= end_column < cell_num):
+                            continue
+                        if (self._cells.get(end_row, end_column) == 0
+                                and self._find_line(end_row, end_column, color)):
+                            forbidden[color].add(end_row * cell_num + end_column)
+            self._forbidden = forbidden
+        return self._forbidden
+
+    def _update_forbidden_on_put(self, row: int, column: int, color) -> None:
+        """石を置いたときに、置くと失敗になる空きマスを更新する.
+
+        置いたマスは空きでなくなる. 他の色の判定は変わらないので、置いた色について
+        置いた石を含む並びの両端の空きマスだけを調べる.
+        """
+        assert self._forbidden is not None
+        index = row * self._cell_num + column
+        for forbidden in self._forbidden:
+            forbidden.discard(index)
+
+        forbidden = self._forbidden[color]
+        for (dr, dc) in _DIRECTIONS:
+            before = self._count_run(row, column, -dr, -dc, color)
+            after = self._count_run(row, column, dr, dc, color)
+            run = before + 1 + after
+            for (d, sign) in ((-before - 1, -1), (after + 1, 1)):
+                end_row = row + dr * d
+                end_column = column + dc * d
+                if not (0 <= end_row < self._cell_num and 0 <= end_column < self._cell_num):
+                    continue
+                if self._cells.get(end_row, end_column) != 0:
+                    continue
+                beyond = self._count_run(end_row, end_column, dr * sign, dc * sign, color)
+                if self._fail_num <= run + 1 + beyond:
+                    forbidden.add(end_row * self._cell_num + end_column)
+
+    def _update_forbidden_on_remove(self, row: int, column: int, color) -> None:
+        """石を取り除いたときに、置くと失敗になる空きマスを更新する.
+
+        取り除いたマスは全ての色について調べ直す. 取り除いた色の並びが途切れるので、
+        その両隣の並びの端の空きマスも調べ直す.
+        """
+        for c in range(StoneColor.Min, StoneColor.Max + 1):
+            self._update_forbidden(row, column, c)
+
+        for (dr, dc) in _DIRECTIONS:
+            for sign in (-1, 1):
+                d = self._count_run(row, column, dr * sign, dc * sign, color) + 1
+                end_row = row + dr * sign * d
+                end_column = column + dc * sign * d
+                if not (0 <= end_row < self._cell_num and 0 <= end_column < self._cell_num):
+                    continue
+                if self._cells.get(end_row, end_column) == 0:
+                    self._update_forbidden(end_row, end_column, color)
+
+    def _update_forbidden(self, row: int, column: int, color) -> None:
+        """空きマスについて、置くと失敗になるかを調べ直す."""
+        assert self._forbidden is not None
+        index = row * self._cell_num + column
+        if self._find_line(row, column, color):
+            self._forbidden[color].add(index)
+        else:
+            self._forbidden[color].discard(index)
+
+    def _find_line(self, row: int, column: int, color) -> tp.Tuple[Cell, ...]:
+        """指定地点を通り、同じ色が失敗判定数以上並んでいる列を探す.
+
+        :return: 見つかった列. 無ければ空のタプル
+        """
+        for (dr, dc) in _DIRECTIONS:
+            before = self._count_run(row, column, -dr, -dc, color)
+            after = self._count_run(row, column, dr, dc, color)
+            if self._fail_num <= before + 1 + after:
+                return tuple(
+                    Cell(row + dr * d, column + dc * d)
+                    for d in range(-before, after + 1))
+        return ()
+
+    def _count_run(self, row: int, column: int, dr: int, dc: int, color) -> int:
+        """指定地点の隣から、同じ色が何個続いているかを数える(指定地点は含まない)."""
+        num = 0
+        row += dr
+        column += dc
+        while 0 <= row < self._cell_num and 0 <= column < self._cell_num:
+            if self._cells.get(row, column) != color:
+                break
+            num += 1
+            row += dr
+            column += dc
+        return num
+
+    def _is_in_range(self, cell: Cell) -> bool:
+        """指定した座標が範囲内か"""
+        if cell.column < 0 or self._cell_num <= cell.column:
+            return False
+        if cell.row < 0 or self._cell_num <= cell.row:
+            return False
+        return True
+
+    def position_to_cell(self, pos: Position) -> tp.Optional[Cell]:
+        """座標にあるマスを得る. 盤の外ならNone."""
+        return self._layout.hit(pos.x, pos.y)
+
+    @property
+    def _cell_size(self) -> int:
+        return self._layout.cell_size
+
+    def is_fail(self) -> bool:
+        """失敗判定"""
+        return self._cells.is_fail()
+
     def is_success(self) -> bool:
         """クリア状態か."""
-        for row in self._cells:
-            for cell in row:
-                if cell == 0:
-                    return False
-        return True
+        return self._empty_num == 0
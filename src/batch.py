@@ -0,0 +1,119 @@
+"""複数盤面の一括判定(NumPy).
+
+(B, N, N) の uint8 配列に積んだ盤面を、スライディングウィンドウの比較で
+まとめて判定する. 各値は Ban と同じく 0 が空き、それ以外が石の色.
+"""
+import typing as tp
+from dataclasses import dataclass
+
+import numpy as np
+
+from ban import Ban, BanBackend
+from values import Cell
+
+
+@dataclass
+class BatchResult:
+    """一括判定の結果.
+
+    :param fail: 盤面ごとの失敗判定 (B,)
+    :param success: 盤面ごとのクリア判定 (B,)
+    :param fail_mask: 揃った列に含まれるマス (B, N, N). 要求しなかった場合はNone
+    """
+    fail: np.ndarray
+    success: np.ndarray
+    fail_mask: tp.Optional[np.ndarray] = None
+
+
+def _windows(boards: np.ndarray, fail_num: int):
+    """4方向それぞれについて、各始点から fail_num 個分のビューを得る.
+
+    :return: (方向ごとのビューのリスト, 始点を盤面上の位置へ戻すためのスライス) のリスト
+    """
+    n = boards.shape[1]
+    m = n - fail_num + 1
+    result = []
+    # 右
+    result.append((
+        [boards[:, :, i:m + i] for i in range(fail_num)],
+        [(slice(None), slice(None), slice(i, m + i)) for i in range(fail_num)]))
+    # 下
+    result.append((
+        [boards[:, i:m + i, :] for i in range(fail_num)],
+        [(slice(None), slice(i, m + i), slice(None)) for i in range(fail_num)]))
+    # 右下
+    result.append((
+        [boards[:, i:m + i, i:m + i] for i in range(fail_num)],
+        [(slice(None), slice(i, m + i), slice(i, m + i)) for i in range(fail_num)]))
+    # 左下
+    last = fail_num - 1
+    result.append((
+        [boards[:, i:m + i, last - i:n - i] for i in range(fail_num)],
+        [(slice(None), slice(i, m + i), slice(last - i, n - i)) for i in range(fail_num)]))
+    return result
+
+
+def evaluate(boards: np.ndarray, fail_num: int, with_mask: bool = False) -> BatchResult:
+    """盤面をまとめて判定する.
+
+    Ban.is_fail / Ban.is_success と同じ判定を盤面ごとに行う.
+
+    :param boards: (B, N, N) の盤面
+    :param fail_num: 失敗判定となる数
+    :param with_mask: 揃った列のマスクも求めるか
+    """
+    if boards.ndim != 3 or boards.shape[1] != boards.shape[2]:
+        raise ValueError(f'boards must be (B, N, N): {boards.shape}')
+    if fail_num < 1:
+        raise ValueError(f'fail_num must be positive: {fail_num}')
+
+    batch = boards.shape[0]
+    if batch == 0:
+        empty = np.zeros(0, dtype=bool)
+        return BatchResult(empty, empty.copy(), np.zeros(boards.shape, dtype=bool) if with_mask else None)
+    success = ~(boards == 0).reshape(batch, -1).any(axis=1)
+    fail = np.zeros(batch, dtype=bool)
+    mask = np.zeros(boards.shape, dtype=bool) if with_mask else None
+    if boards.shape[1] < fail_num:
+        return BatchResult(fail, success, mask)
+
+    for (views, slices) in _windows(boards, fail_num):
+        first = views[0]
+        run = first != 0
+        for view in views[1:]:
+            run &= view == first
+        fail |= run.reshape(batch, -1).any(axis=1)
+        if mask is not None:
+            for index in slices:
+                mask[index] |= run
+
+    return BatchResult(fail, success, mask)
+
+
+def bans_to_array(bans: tp.Sequence[Ban], cell_num: int = 0) -> np.ndarray:
+    """Banのリストを (B, N, N) の配列に変換する.
+
+    :param cell_num: bans が空のときのマス数. 空なら (0, cell_num, cell_num) を返す
+    """
+    if not bans:
+        return np.zeros((0, cell_num, cell_num), dtype=np.uint8)
+    return np.array([ban.to_list() for ban in bans], dtype=np.uint8)
+
+
+def array_to_bans(
+        boards: np.ndarray,
+        size: int,
+        margin: int,
+        fail_num: int,
+        backend: BanBackend = BanBackend.List) -> tp.List[Ban]:
+    """(B, N, N) の配列をBanのリストに変換する."""
+    if boards.ndim != 3 or boards.shape[1] != boards.shape[2]:
+        raise ValueError(f'boards must be (B, N, N): {boards.shape}')
+    cell_num = boards.shape[1]
+    bans = []
+    for board in boards:
+        ban = Ban(size, cell_num, margin, fail_num, backend)
+        for (row, column) in zip(*np.nonzero(board)):
+            ban.put(Cell(int(row), int(column)), int(board[row, column]))
+        bans.append(ban)
+    return bans
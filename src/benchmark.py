@@ -0,0 +1,330 @@
+"""モデル層のベンチマーク.
+
+Ban の基本操作、GameModel.operate の振り分け、ヘッドレスの1ゲームを盤の大きさ
+ごとに計測する. 各ケースは準備(計測外)と実行(計測対象)に分かれ、ウォームアップの
+後に繰り返し計測して1操作あたりの時間のパーセンタイルを求める.
+
+使い方::
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.1
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import typing as tp
+from dataclasses import asdict, dataclass, field
+
+from ban import Ban, BanBackend
+from game import GameModel
+from input import InputState, OperationParam, VirtualKey
+from simulator import greedy_strategy, play_game
+from stats import percentile
+from stone_stream import StoneStream
+from values import Cell, Position, StoneColor
+
+#: 盤の大きさ
+_BAN_SIZE = 400
+#: 盤の余白
+_BAN_MARGIN = 10
+#: 失敗判定となる数
+_BAN_FAIL_NUM = 3
+#: 計測する盤のマス数
+_CELL_NUMS = (5, 9, 15)
+#: 盤の大きさに対する伸びを測るときのマス数
+_SCALING_CELL_NUMS = (16, 64, 256, 1024, 4096)
+#: 盤の大きさに対する伸びを測るケース
+_SCALING_CASES = ('ban.place', 'sparse.place')
+#: place の計測で置く石の最大数
+_PLACE_MOVES = 200
+#: 乱数の種
+_SEED = 0
+
+
+@dataclass
+class BenchResult:
+    """1ケースの計測結果.
+
+    :param name: ケース名
+    :param cell_num: 盤のマス数
+    :param samples: 繰り返しごとの1操作あたりの秒数
+    """
+    name: str
+    cell_num: int
+    samples: tp.List[float] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        """比較に使うキー."""
+        return f'{self.name}[{self.cell_num}]'
+
+    def percentile(self, percent: float) -> float:
+        """パーセンタイル(最近傍順位法)."""
+        return percentile(self.samples, percent)
+
+    def to_dict(self) -> tp.Dict[str, tp.Any]:
+        result = asdict(self)
+        result.update(
+            min=min(self.samples),
+            mean=sum(self.samples) / len(self.samples),
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99))
+        return result
+
+
+class Case:
+    """ベンチマークのケース.
+
+    :param name: ケース名
+    :param prepare: 計測前に呼ばれ、実行に渡す状態を作る
+    :param run: 計測対象. 行った操作の数を返す
+    """
+
+    def __init__(
+            self,
+            name: str,
+            prepare: tp.Callable[[int], tp.Any],
+            run: tp.Callable[[tp.Any], int]) -> None:
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+
+
+def _shuffled_cells(cell_num: int) -> tp.List[Cell]:
+    cells = [Cell(row, column) for row in range(cell_num) for column in range(cell_num)]
+    random.Random(_SEED).shuffle(cells)
+    return cells
+
+
+def _safe_board(cell_num: int) -> Ban:
+    """失敗していない、空きの残った盤面を作る."""
+    ban = Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, _BAN_FAIL_NUM)
+    for row in range(cell_num):
+        for column in range(cell_num - 1):
+            ban.put(Cell(row, column), (row + 2 * column) % StoneColor.Max + 1)
+    return ban
+
+
+def _prepare_put(cell_num: int):
+    return Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, cell_num + 1), _shuffled_cells(cell_num)
+
+
+def _run_put(state) -> int:
+    (ban, cells) = state
+    for cell in cells:
+        ban.put(cell, StoneColor.Red)
+    return len(cells)
+
+
+def _place_moves(cell_num: int) -> tp.List[tp.Tuple[Cell, int]]:
+    """失敗にならない手の列を作る. 盤の大きさによらず同じ数だけ置く."""
+    ban = Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, _BAN_FAIL_NUM, BanBackend.Sparse)
+    rand = random.Random(_SEED)
+    moves = []
+    while len(moves) < min(_PLACE_MOVES, cell_num * cell_num // 4):
+        cell = Cell(rand.randrange(cell_num), rand.randrange(cell_num))
+        color = rand.randint(StoneColor.Min, StoneColor.Max)
+        if ban.get(cell) != 0 or ban.would_fail(cell, color):
+            continue
+        ban.put(cell, color)
+        moves.append((cell, color))
+    return moves
+
+
+def _prepare_place(backend: BanBackend) -> tp.Callable[[int], tp.Any]:
+    def prepare(cell_num: int):
+        return Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, _BAN_FAIL_NUM, backend), _place_moves(cell_num)
+    return prepare
+
+
+def _run_place(state) -> int:
+    (ban, moves) = state
+    for (cell, color) in moves:
+        ban.place(cell, color)
+    return len(moves)
+
+
+def _run_is_fail(ban: Ban) -> int:
+    ban.is_fail()
+    return 1
+
+
+def _run_is_success(ban: Ban) -> int:
+    for _ in range(100):
+        ban.is_success()
+    return 100
+
+
+def _prepare_position_to_cell(cell_num: int):
+    ban = Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, _BAN_FAIL_NUM)
+    rand = random.Random(_SEED)
+    positions = [Position(rand.randrange(_BAN_SIZE), rand.randrange(_BAN_SIZE)) for _ in range(200)]
+    return ban, positions
+
+
+def _run_position_to_cell(state) -> int:
+    (ban, positions) = state
+    for pos in positions:
+        ban.position_to_cell(pos)
+    return len(positions)
+
+
+def _prepare_operate(cell_num: int):
+    model = GameModel(_BAN_SIZE, cell_num, _BAN_MARGIN, _BAN_FAIL_NUM, seed=_SEED)
+    # 開始済みにして、盤の外を押す・離すを繰り返す(石は置かれない)
+    model.operate(OperationParam(VirtualKey.MouseLeft, InputState.Press))
+    model.operate(OperationParam(VirtualKey.MouseLeft, InputState.Release))
+    outside = Position(_BAN_SIZE + 1, _BAN_SIZE + 1)
+    params = [
+        OperationParam(VirtualKey.MouseLeft, InputState.Press, outside),
+        OperationParam(VirtualKey.MouseLeft, InputState.Release, outside),
+        OperationParam(VirtualKey.MouseMove, InputState.Press, outside),
+    ] * 50
+    return model, params
+
+
+def _run_operate(state) -> int:
+    (model, params) = state
+    for param in params:
+        model.operate(param)
+    return len(params)
+
+
+def _prepare_stones(cell_num: int) -> StoneStream:
+    return StoneStream(_SEED, block=cell_num * cell_num)
+
+
+def _run_stones(stones: StoneStream) -> int:
+    for _ in range(100):
+        stones.next()
+    return 100
+
+
+def _prepare_game(cell_num: int):
+    return cell_num, random.Random(_SEED)
+
+
+def _run_game(state) -> int:
+    (cell_num, rand) = state
+    play_game(cell_num, _BAN_FAIL_NUM, greedy_strategy, rand)
+    return 1
+
+
+#: 全てのケース
+CASES = [
+    Case('ban.put', _prepare_put, _run_put),
+    Case('ban.place', _prepare_place(BanBackend.List), _run_place),
+    Case('sparse.place', _prepare_place(BanBackend.Sparse), _run_place),
+    Case('ban.is_fail', _safe_board, _run_is_fail),
+    Case('ban.is_success', _safe_board, _run_is_success),
+    Case('ban.position_to_cell', _prepare_position_to_cell, _run_position_to_cell),
+    Case('game.operate', _prepare_operate, _run_operate),
+    Case('game.next_stone', _prepare_stones, _run_stones),
+    Case('headless.game', _prepare_game, _run_game),
+]
+
+
+def measure(case: Case, cell_num: int, repeat: int, warmup: int) -> BenchResult:
+    """1ケースを計測する."""
+    result = BenchResult(case.name, cell_num)
+    for index in range(warmup + repeat):
+        state = case.prepare(cell_num)
+        start = time.perf_counter()
+        ops = case.run(state)
+        elapsed = time.perf_counter() - start
+        if warmup <= index:
+            result.samples.append(elapsed / ops)
+    return result
+
+
+def run_all(
+        cell_nums: tp.Sequence[int] = _CELL_NUMS,
+        repeat: int = 30,
+        warmup: int = 3,
+        names: tp.Optional[tp.Sequence[str]] = None) -> tp.List[BenchResult]:
+    """全てのケースを計測する."""
+    results = []
+    for case in CASES:
+        if names and case.name not in names:
+            continue
+        for cell_num in cell_nums:
+            results.append(measure(case, cell_num, repeat, warmup))
+    return results
+
+
+@dataclass
+class Regression:
+    """基準より遅くなったケース.
+
+    :param key: ケースのキー
+    :param baseline: 基準のp50(秒)
+    :param current: 今回のp50(秒)
+    """
+    key: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+
+def compare(
+        results: tp.Sequence[tp.Dict[str, tp.Any]],
+        baseline: tp.Sequence[tp.Dict[str, tp.Any]],
+        threshold: float) -> tp.List[Regression]:
+    """基準と比べて、p50が threshold の割合を超えて遅くなったケースを得る."""
+    baseline_p50 = {f"{item['name']}[{item['cell_num']}]": item['p50'] for item in baseline}
+    regressions = []
+    for item in results:
+        key = f"{item['name']}[{item['cell_num']}]"
+        if key not in baseline_p50:
+            continue
+        if baseline_p50[key] * (1.0 + threshold) < item['p50']:
+            regressions.append(Regression(key, baseline_p50[key], item['p50']))
+    return regressions
+
+
+def main() -> int:
+    """メイン関数."""
+    parser = argparse.ArgumentParser(description='Sanmoku model benchmark')
+    parser.add_argument('--cell-num', type=int, nargs='+', default=list(_CELL_NUMS))
+    parser.add_argument('--case', nargs='+', choices=[case.name for case in CASES])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--scaling', action='store_true',
+                        help=f'measure {", ".join(_SCALING_CASES)} on boards up to {_SCALING_CELL_NUMS[-1]}')
+    args = parser.parse_args()
+    if args.scaling:
+        args.cell_num = list(_SCALING_CELL_NUMS)
+        args.case = list(_SCALING_CASES)
+
+    results = [result.to_dict() for result in run_all(args.cell_num, args.repeat, args.warmup, args.case)]
+    for item in results:
+        print(f"{item['name']:<24}{item['cell_num']:>4}  p50={item['p50'] * 1e6:10.2f}us "
+              f"p90={item['p90'] * 1e6:10.2f}us p99={item['p99'] * 1e6:10.2f}us")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression.key}: {regression.baseline * 1e6:.2f}us -> '
+                  f'{regression.current * 1e6:.2f}us (x{regression.ratio:.2f})')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
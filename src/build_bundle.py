@@ -0,0 +1,264 @@
+"""PyScript 版の起動用バンドルの作成と、その読み込み時間の計測.
+
+pyscript_app から import をたどって必要なモジュールだけを集め、最適化して
+コンパイルした .pyc を1つの zip にまとめる. ブラウザは個別の .py を1つずつ
+取りに行ってコンパイルする代わりに、zip を1つ読むだけになる.
+
+.pyc はソースの更新時刻を確かめない形式(UNCHECKED_HASH)にする. ただし .pyc は
+作った Python のバージョン専用なので、既定ではソースも同梱しておく. zipimport は
+.pyc の magic number が合わなければソースを使う.
+
+計測では、新しいプロセスで pyscript_app を import するまでの時間を、ソースから
+(キャッシュ無し)とバンドルからとで比べる. ブラウザの外で測るため、js と pyodide
+は何もしない代役のモジュールで置き換える.
+
+使い方::
+
+    python build_bundle.py --output dist
+    python build_bundle.py --output dist --bench 20
+"""
+import argparse
+import ast
+import os
+import py_compile
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import typing as tp
+import zipfile
+from dataclasses import dataclass
+
+from stats import percentile
+
+#: ソースのディレクトリ
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+#: 起点のモジュール
+_ENTRY = 'pyscript_app'
+#: バンドルのファイル名
+_BUNDLE_NAME = 'sanmoku.zip'
+#: 起動スクリプトのファイル名
+_BOOT_NAME = 'boot.py'
+#: HTML のファイル名
+_HTML_NAME = 'index.html'
+#: .pyc の最適化レベル. 2 なら assert と docstring を落とす
+_OPTIMIZE = 2
+#: zip に記録する日時. 同じソースからは同じ zip を作る
+_ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+#: 起動スクリプト. バンドルを import パスの先頭に置いてから起動する
+_BOOT_SCRIPT = f'''import sys
+sys.path.insert(0, {_BUNDLE_NAME!r})
+
+from {_ENTRY} import main
+
+pyscript_loader.close()
+pyscript.run_until_complete(main())
+'''
+
+#: 計測用のプロセスで実行するコード. 1行目に秒、2行目に読み込んだモジュール数を出す
+_BENCH_CODE = '''import sys, time, types
+
+class _Stub:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return _Stub()
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+for _name in ('js', 'pyodide'):
+    _module = types.ModuleType(_name)
+    _module.__getattr__ = lambda name: _Stub
+    sys.modules[_name] = _module
+
+sys.path.insert(0, {path!r})
+_before = len(sys.modules)
+_start = time.perf_counter()
+import {module}
+print(time.perf_counter() - _start)
+print(len(sys.modules) - _before)
+'''
+
+
+@dataclass(frozen=True)
+class Bundle:
+    """作ったバンドル.
+
+    :param path: zip のパス
+    :param modules: 含めたモジュール名(import される順ではない)
+    :param size: zip の大きさ(バイト)
+    """
+    path: str
+    modules: tp.Tuple[str, ...]
+    size: int
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    """import にかかった時間の計測結果.
+
+    :param name: 計測の名前
+    :param samples: 1回ごとの時間(秒)
+    :param module_num: import で読み込まれたモジュール数
+    """
+    name: str
+    samples: tp.Tuple[float, ...]
+    module_num: int
+
+    def __str__(self) -> str:
+        return (f'{self.name:<8} n={len(self.samples)} modules={self.module_num} '
+                f'p50={percentile(self.samples, 50) * 1000:.2f}ms '
+                f'p90={percentile(self.samples, 90) * 1000:.2f}ms '
+                f'p99={percentile(self.samples, 99) * 1000:.2f}ms')
+
+
+def _imported_names(source: str) -> tp.Set[str]:
+    """ソースが import するトップレベルのモジュール名.
+
+    関数の中で遅れて import するものも含める.
+    """
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+    return names
+
+
+def find_modules(entry: str = _ENTRY, src_dir: str = _SRC_DIR) -> tp.List[str]:
+    """entry から import をたどり、src_dir にあるモジュールを集める.
+
+    :return: モジュール名. entry が先頭で、残りは名前順
+    """
+    found = {entry}
+    pending = [entry]
+    while pending:
+        name = pending.pop()
+        with open(os.path.join(src_dir, f'{name}.py'), encoding='utf-8') as f:
+            source = f.read()
+        for imported in _imported_names(source):
+            if imported not in found and os.path.isfile(os.path.join(src_dir, f'{imported}.py')):
+                found.add(imported)
+                pending.append(imported)
+    return [entry] + sorted(found - {entry})
+
+
+def _compile(path: str, name: str, optimize: int) -> bytes:
+    """ソースを .pyc の内容にコンパイルする."""
+    with tempfile.TemporaryDirectory() as work:
+        cfile = os.path.join(work, f'{name}.pyc')
+        py_compile.compile(
+            path, cfile=cfile, dfile=f'{name}.py', doraise=True, optimize=optimize,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        with open(cfile, 'rb') as f:
+            return f.read()
+
+
+def _write_entry(archive: zipfile.ZipFile, name: str, data: bytes) -> None:
+    info = zipfile.ZipInfo(name, date_time=_ZIP_DATE)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    archive.writestr(info, data)
+
+
+def build_bundle(
+        output: str,
+        entry: str = _ENTRY,
+        src_dir: str = _SRC_DIR,
+        optimize: int = _OPTIMIZE,
+        with_source: bool = True) -> Bundle:
+    """バンドルの zip を作る.
+
+    :param output: 出力先のディレクトリ
+    :param entry: 起点のモジュール
+    :param src_dir: ソースのディレクトリ
+    :param optimize: .pyc の最適化レベル
+    :param with_source: ソースも同梱するか
+    """
+    os.makedirs(output, exist_ok=True)
+    modules = find_modules(entry, src_dir)
+    path = os.path.join(output, _BUNDLE_NAME)
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name in modules:
+            source_path = os.path.join(src_dir, f'{name}.py')
+            _write_entry(archive, f'{name}.pyc', _compile(source_path, name, optimize))
+            if with_source:
+                with open(source_path, 'rb') as f:
+                    _write_entry(archive, f'{name}.py', f.read())
+    return Bundle(path, tuple(modules), os.path.getsize(path))
+
+
+def _bundle_html(template: str) -> str:
+    """HTML の外部モジュールの一覧をバンドルだけにし、起動スクリプトを差し替える."""
+    html = re.sub(r'(- paths:\n)(?:\s*- .*\n)+', rf'\1      - {_BUNDLE_NAME}\n', template)
+    return re.sub(r'<py-script src="[^"]*">', f'<py-script src="{_BOOT_NAME}">', html)
+
+
+def build(output: str, with_source: bool = True) -> Bundle:
+    """バンドル・起動スクリプト・HTML を出力先に作る."""
+    bundle = build_bundle(output, with_source=with_source)
+    with open(os.path.join(output, _BOOT_NAME), 'w', encoding='utf-8') as f:
+        f.write(_BOOT_SCRIPT)
+    with open(os.path.join(_SRC_DIR, _HTML_NAME), encoding='utf-8') as f:
+        html = _bundle_html(f.read())
+    with open(os.path.join(output, _HTML_NAME), 'w', encoding='utf-8') as f:
+        f.write(html)
+    return bundle
+
+
+def measure_import(name: str, path: str, runs: int, module: str = _ENTRY) -> ImportTiming:
+    """新しいプロセスで module を import する時間を runs 回測る.
+
+    :param name: 計測の名前
+    :param path: import パスの先頭に置くディレクトリか zip
+    """
+    if runs < 1:
+        raise ValueError(f'runs must be positive: {runs}')
+    code = _BENCH_CODE.format(path=path, module=module)
+    samples = []
+    module_num = 0
+    for _ in range(runs):
+        # -I で環境変数やユーザーの site を無視し、-B でキャッシュを書かない
+        result = subprocess.run(
+            [sys.executable, '-I', '-B', '-c', code], capture_output=True, text=True, check=True)
+        (sec, num) = result.stdout.split()
+        samples.append(float(sec))
+        module_num = int(num)
+    return ImportTiming(name, tuple(samples), module_num)
+
+
+def bench(bundle: Bundle, runs: int) -> tp.List[ImportTiming]:
+    """ソース(キャッシュ無し)とバンドルからの起動時の import を比べる."""
+    with tempfile.TemporaryDirectory() as work:
+        for name in bundle.modules:
+            shutil.copy(os.path.join(_SRC_DIR, f'{name}.py'), work)
+        return [
+            measure_import('source', work, runs),
+            measure_import('bundle', bundle.path, runs),
+        ]
+
+
+def main() -> int:
+    """メイン関数."""
+    parser = argparse.ArgumentParser(description='Build the PyScript bundle')
+    parser.add_argument('--output', default='dist')
+    parser.add_argument('--no-source', action='store_true',
+                        help='omit sources (the bundle then only runs on this Python version)')
+    parser.add_argument('--bench', type=int, metavar='RUNS', help='measure cold-start import time')
+    args = parser.parse_args()
+
+    bundle = build(args.output, with_source=not args.no_source)
+    print(f'{bundle.path}: {len(bundle.modules)} modules, {bundle.size} bytes')
+    print(' '.join(bundle.modules))
+    if args.bench:
+        for timing in bench(bundle, args.bench):
+            print(timing)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
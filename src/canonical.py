@@ -0,0 +1,168 @@
+"""盤面の正規化.
+
+失敗判定は盤の回転・反転(8通り)と石の色の入れ替え(24通り)で変わらないので、
+同じ種類の局面を1つのキーにまとめる. キャッシュや局面表で同値な局面を
+重複して持たないために使う.
+"""
+import itertools
+import typing as tp
+from operator import itemgetter
+
+from ban import Ban
+from values import StoneColor
+
+#: 石の色
+_COLORS = tuple(range(StoneColor.Min, StoneColor.Max + 1))
+#: ビットボードを変換するときに、表を一度に引くビット数
+_CHUNK_BITS = 8
+#: 表を引くときに切り出すビットのマスク
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+#: 色の出現順→色を出現順に振り直す bytes.translate 用の表
+_RELABEL_TABLES = {
+    order: bytes.maketrans(bytes(order), bytes(_COLORS))
+    for order in itertools.permutations(_COLORS)
+}
+
+
+def make_transforms(cell_num: int) -> tp.List[tp.Tuple[int, ...]]:
+    """盤の回転・反転8通りについて、変換後の各マスが変換前のどのマスかを表す表を作る.
+
+    マスは row * cell_num + column の一次元の添字で表す.
+    """
+    last = cell_num - 1
+    mappings = (
+        lambda r, c: (r, c),
+        lambda r, c: (c, last - r),
+        lambda r, c: (last - r, last - c),
+        lambda r, c: (last - c, r),
+        lambda r, c: (r, last - c),
+        lambda r, c: (last - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (last - c, last - r),
+    )
+    transforms = []
+    for mapping in mappings:
+        perm = []
+        for row in range(cell_num):
+            for column in range(cell_num):
+                (src_row, src_column) = mapping(row, column)
+                perm.append(src_row * cell_num + src_column)
+        transforms.append(tuple(perm))
+    return transforms
+
+
+class Canonicalizer:
+    """盤面を正規形のキーに変換する.
+
+    8通りの変換表は最初に作っておき、変換ごとに色を出現順に振り直した
+    バイト列のうち最小のものを正規形とする. 石の色(1~4)以外の値はそのまま残す.
+
+    :param cell_num: 一辺のマス数
+    """
+
+    def __init__(self, cell_num: int) -> None:
+        self._cell_num = cell_num
+        self._transforms = make_transforms(cell_num)
+        self._mask_tables: tp.Optional[tp.List[tp.List[tp.List[int]]]] = None
+
+    @property
+    def cell_num(self) -> int:
+        """盤のマス数."""
+        return self._cell_num
+
+    @property
+    def transforms(self) -> tp.List[tp.Tuple[int, ...]]:
+        """回転・反転の変換表."""
+        return self._transforms
+
+    def canonical(self, board: bytes, next_stone: int = 0) -> bytes:
+        """一次元の盤面と次の石から正規形のキーを得る.
+
+        :param board: row * cell_num + column の順に並べた盤面
+        :param next_stone: 次の石. 0なら次の石を区別しない
+        :return: 先頭1バイトが次の石、残りが盤面の正規形
+        """
+        if len(board) != self._cell_num * self._cell_num:
+            raise ValueError(f'board size mismatch: {len(board)}')
+        best = None
+        head = bytes((next_stone,))
+        getter = board.__getitem__
+        for perm in self._transforms:
+            key = self._relabel(head + bytes(map(getter, perm)))
+            if best is None or key < best:
+                best = key
+        return best  # type: ignore
+
+    def canonical_ban(self, ban: Ban, next_stone: int = 0) -> bytes:
+        """Banと次の石から正規形のキーを得る."""
+        board = bytearray()
+        for row in ban.to_list():
+            board.extend(row)
+        return self.canonical(bytes(board), next_stone)
+
+    def canonical_masks(
+            self,
+            masks: tp.Sequence[int],
+            empty: int) -> tp.Tuple[tp.Tuple[int, ...], tp.Tuple[int, ...]]:
+        """色ごとのビットボードと空きマスのビットボードから正規形のキーを得る.
+
+        ビットボードは row * cell_num + column 番目のビットがそのマスを表す.
+        色の入れ替えは色ごとのビットボードを並べ替えることで吸収し、
+        8通りの変換のうち最小のものを正規形とする.
+
+        :param masks: 色ごとのビットボード
+        :param empty: 空きマスのビットボード
+        :return: (キー, キーの色の並びに対応する masks の添字).
+            キーは先頭が空きマス、残りが並べ替えた色ごとのビットボード
+        """
+        if self._mask_tables is None:
+            self._mask_tables = [self._make_mask_tables(perm) for perm in self._transforms]
+        transform = self._transform_mask
+        best = None
+        best_order: tp.Tuple[int, ...] = ()
+        for tables in self._mask_tables:
+            pairs = sorted((transform(mask, tables), index) for (index, mask) in enumerate(masks))
+            key = (transform(empty, tables),) + tuple(mask for (mask, _) in pairs)
+            if best is None or key < best:
+                best = key
+                best_order = tuple(index for (_, index) in pairs)
+        return best, best_order  # type: ignore
+
+    @staticmethod
+    def _make_mask_tables(perm: tp.Tuple[int, ...]) -> tp.List[tp.List[int]]:
+        """変換表から、ビットボードを _CHUNK_BITS ビットずつ変換する表を作る."""
+        destinations = [0] * len(perm)
+        for (destination, source) in enumerate(perm):
+            destinations[source] = destination
+        tables = []
+        for start in range(0, len(perm), _CHUNK_BITS):
+            bits = destinations[start:start + _CHUNK_BITS]
+            table = []
+            for value in range(1 << len(bits)):
+                mask = 0
+                for (bit, destination) in enumerate(bits):
+                    if value >> bit & 1:
+                        mask |= 1 << destination
+                table.append(mask)
+            tables.append(table)
+        return tables
+
+    @staticmethod
+    def _transform_mask(mask: int, tables: tp.List[tp.List[int]]) -> int:
+        """ビットボードを表で変換する."""
+        result = 0
+        for table in tables:
+            result |= table[mask & _CHUNK_MASK]
+            mask >>= _CHUNK_BITS
+        return result
+
+    @staticmethod
+    def _relabel(key: bytes) -> bytes:
+        """色を出現順に 1, 2, ... と振り直す."""
+        end = len(key)
+        firsts = []
+        for color in _COLORS:
+            index = key.find(color)
+            firsts.append((index if 0 <= index else end, color))
+        firsts.sort()
+        return key.translate(_RELABEL_TABLES[tuple(map(itemgetter(1), firsts))])
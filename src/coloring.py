@@ -0,0 +1,368 @@
+"""盤を埋め尽くす塗り方の数え上げ(転送行列法, NumPy).
+
+全てのマスに石を置き、縦・横・斜めのどこにも同じ色が fail_num 個並ばない
+塗り方の数を数える. is_fail にならずに is_success となる最終局面の数で、
+盤の難しさを設計するときの目安になる.
+
+盤を1マスずつ埋める動的計画法で、塗り終わりの境界の状態ごとの塗り方の数を
+更新する. 境界の各マスは色と、そこから縦・右下・左下へ続く同色の数を持ち、
+さらに左上のマスの右下への並びと左のマスの横の並びを持つ. 状態は次のように圧縮する.
+
+* 盤の端までに fail_num 個に届かない並びは以後の判定に影響しないので捨てる.
+  どの方向の並びも残らないマスは色も捨てる
+* 色の入れ替えで移り合う状態は同じ数になるので、1マス塗るたびに色を出現順に
+  付け直す. 左右反転で移り合う状態は、行の終わりに小さい方を選んで1つにまとめる
+
+状態は uint8 の2次元配列の1行に詰め、1マス分の更新は全ての状態について色ごとに
+配列演算でまとめて行う. 同じ状態は行を並べ替えて足し合わせる. 塗り方の数は
+64ビットに収まらないので、Python の整数(object 配列)で持つ.
+
+状態数は盤が1回り大きくなるごとにおよそ10倍以上になり、時間とメモリもそれに
+比例する. 4色・3個並びで失敗の場合、1コアで 6x6 は数秒、7x7 は1分半ほど
+(メモリは 1GB ほど)かかる. 8x8 以上は数百万から数千万の状態を持つことになり、
+このやり方では現実的でない. アプリの 9x9 盤は数えられない.
+
+workers を2以上にすると、行ごとに状態を分けてワーカープロセスで更新する.
+状態の受け渡しがあるので、コアが複数あり、状態数が多い(7x7 以上)ときだけ速くなる.
+
+使い方::
+
+    python coloring.py --cell-num 3 4 5 6 --fail-num 3
+"""
+import argparse
+import time
+import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import product, repeat
+
+import numpy as np
+
+from values import StoneColor
+
+#: 石の色の数
+_COLOR_NUM = StoneColor.Max - StoneColor.Min + 1
+#: 色の数の上限. 色の付け直しの表が color_num ** color_num 行になる
+_MAX_COLORS = 6
+#: ワーカーに分けて更新する状態数の下限
+_PARALLEL_STATES = 1 << 16
+
+#: 行の境界の状態. 列ごとのマスの符号 ((色 * k + 縦) * k + 右下) * k + 左下 (k は fail_num)
+State = tp.Tuple[int, ...]
+
+
+@dataclass
+class ColoringCount:
+    """数え上げの結果.
+
+    :param cell_num: 盤のマス数
+    :param fail_num: 失敗判定となる数
+    :param color_num: 色の数
+    :param count: 失敗にならない塗り方の数
+    :param max_states: 行の境界の状態数の最大
+    :param elapsed: 経過秒
+    """
+    cell_num: int
+    fail_num: int
+    color_num: int
+    count: int = 0
+    max_states: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        """全ての塗り方の数."""
+        return self.color_num ** (self.cell_num * self.cell_num)
+
+    @property
+    def density(self) -> float:
+        """全ての塗り方のうち失敗にならないものの割合."""
+        return self.count / self.total
+
+    def __str__(self) -> str:
+        return (f'cell_num={self.cell_num} fail_num={self.fail_num} colors={self.color_num} '
+                f'count={self.count} density={self.density:.6e} '
+                f'max_states={self.max_states} elapsed={self.elapsed:.2f}s')
+
+
+def _runs(remaining: int, fail_num: int) -> tp.Tuple[np.ndarray, int]:
+    """並びの数を1つ進める表.
+
+    並びの数は fail_num 以上なら失敗. この先の盤上のマス数 remaining を足しても
+    fail_num に届かなければ以後の判定に影響しないので 0 にする.
+
+    :return: (直前のマスと同じ色のときの、直前の並びの数 → 並びの数, 違う色のときの並びの数)
+    """
+    def run(previous: int, same: bool) -> int:
+        value = previous + 1 if previous and same else 1
+        return 0 if value < fail_num and value + remaining < fail_num else value
+
+    return np.array([run(previous, True) for previous in range(fail_num)], dtype=np.uint8), run(0, False)
+
+
+class _Board:
+    """状態の配列の形と、1マス分の更新.
+
+    状態の配列は (状態数, 2 * (cell_num + 2)) の uint8 で、前半が色、後半が並び.
+    列 0..cell_num-1 は境界のマスで、c 列目を塗っている途中なら c 列目より左は
+    塗ったばかりのマス、c 列目以降は1つ上の行のマス. 列 cell_num は左上のマスの
+    右下への並び、列 cell_num + 1 は左のマスの横の並び.
+    マスの並びは (縦 * k + 右下) * k + 左下、左上・左は並びの数そのもの.
+    """
+
+    def __init__(self, cell_num: int, fail_num: int, color_num: int) -> None:
+        if fail_num ** 3 > 256 or color_num > _MAX_COLORS:
+            raise ValueError(f'too many runs or colors: fail_num={fail_num} colors={color_num}')
+        self.cell_num = cell_num
+        self.fail_num = fail_num
+        self.color_num = color_num
+        #: 色の列の数(= 並びの列の始まり)
+        self.width = cell_num + 2
+        #: 色ごとの新しい番号 - 1 を color_num 進数にした添字, 色 → 新しい色
+        self._relabel_table = np.zeros((color_num ** color_num, color_num + 1), dtype=np.uint8)
+        for (index, ranks) in enumerate(product(range(color_num), repeat=color_num)):
+            self._relabel_table[index, 1:] = np.array(ranks) + 1
+
+    def pack(self, states: tp.Sequence[State]) -> np.ndarray:
+        """行の境界の状態を配列にする. 左上・左の並びは無し."""
+        codes = np.array(states, dtype=np.int64).reshape(len(states), self.cell_num)
+        unit = self.fail_num ** 3
+        keys = np.zeros((len(states), 2 * self.width), dtype=np.uint8)
+        keys[:, :self.cell_num] = codes // unit
+        keys[:, self.width:self.width + self.cell_num] = codes % unit
+        return keys
+
+    def unpack(self, keys: np.ndarray) -> tp.List[State]:
+        """配列の境界の部分を符号に戻す."""
+        unit = self.fail_num ** 3
+        codes = (keys[:, :self.cell_num].astype(np.int64) * unit
+                 + keys[:, self.width:self.width + self.cell_num])
+        return [tuple(row) for row in codes.tolist()]
+
+    def paint(
+            self,
+            keys: np.ndarray,
+            counts: np.ndarray,
+            row: int,
+            column: int) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """row 行 column 列のマスを全ての色で塗り、色を付け直してまとめる."""
+        n = self.cell_num
+        k = self.fail_num
+        w = self.width
+        down = n - 1 - row
+        (horizontal_same, horizontal_other) = _runs(n - 1 - column, k)
+        (vertical_same, vertical_other) = _runs(down, k)
+        (right_same, right_other) = _runs(min(down, n - 1 - column), k)
+        (left_same, left_other) = _runs(min(down, column), k)
+
+        up_color = keys[:, column]
+        up_runs = keys[:, w + column]
+        up_vertical = up_runs // (k * k)
+        up_right = up_runs // k % k
+        upper_left_color = keys[:, n]
+        upper_left_run = keys[:, w + n]
+        side_color = keys[:, n + 1]
+        side_run = keys[:, w + n + 1]
+
+        # 色によらない部分. 塗ったマスの右下への並びは、右隣を塗るときに左上として使う
+        base = keys.copy()
+        base[:, n] = np.where(up_right != 0, up_color, 0)
+        base[:, w + n] = up_right
+        if column + 1 < n:
+            # 右上のマスの左下への並びは、このマスで使い終わる
+            upper_right_color = keys[:, column + 1]
+            upper_right_runs = keys[:, w + column + 1]
+            upper_right_left = upper_right_runs % k
+            stripped = upper_right_runs - upper_right_left
+            base[:, column + 1] = np.where(stripped != 0, upper_right_color, 0)
+            base[:, w + column + 1] = stripped
+        else:
+            upper_right_color = np.zeros_like(up_color)
+            upper_right_left = np.zeros_like(up_color)
+
+        parts = []
+        part_counts = []
+        for color in range(1, self.color_num + 1):
+            horizontal = np.where(side_color == color, horizontal_same[side_run], horizontal_other)
+            vertical = np.where(up_color == color, vertical_same[up_vertical], vertical_other)
+            right = np.where(upper_left_color == color, right_same[upper_left_run], right_other)
+            left = np.where(upper_right_color == color, left_same[upper_right_left], left_other)
+            valid = (horizontal < k) & (vertical < k) & (right < k) & (left < k)
+            runs = ((vertical * k + right) * k + left)[valid]
+            horizontal = horizontal[valid]
+            part = base[valid]
+            part[:, column] = np.where(runs != 0, color, 0)
+            part[:, w + column] = runs
+            part[:, n + 1] = np.where(horizontal != 0, color, 0)
+            part[:, w + n + 1] = horizontal
+            parts.append(part)
+            part_counts.append(counts[valid])
+        keys = np.concatenate(parts)
+        keys[:, :w] = self._relabel(keys[:, :w])
+        return _merge(keys, np.concatenate(part_counts))
+
+    def finish_row(self, keys: np.ndarray, counts: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """行の終わりの状態を、左右反転したものと小さい方にまとめる.
+
+        左上・左の並びはもう使わないので捨てる.
+        """
+        n = self.cell_num
+        k = self.fail_num
+        w = self.width
+        keys = keys.copy()
+        keys[:, n:w] = 0
+        keys[:, w + n:] = 0
+        mirrored = keys.copy()
+        mirrored[:, :n] = keys[:, n - 1::-1]
+        # 左右反転では右下と左下が入れ替わる
+        runs = keys[:, w:w + n][:, ::-1]
+        mirrored[:, w:w + n] = runs - runs // k % k * k - runs % k + runs % k * k + runs // k % k
+        mirrored[:, :w] = self._relabel(mirrored[:, :w])
+        keys[:, :w] = self._relabel(keys[:, :w])
+        # 最初に異なる列で比べ、辞書順で小さい方を選ぶ
+        differ = keys != mirrored
+        first = differ.argmax(axis=1)
+        rows = np.arange(len(keys))
+        smaller = differ.any(axis=1) & (mirrored[rows, first] < keys[rows, first])
+        keys[smaller] = mirrored[smaller]
+        return _merge(keys, counts)
+
+    def expand(self, keys: np.ndarray, counts: np.ndarray, row: int) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """1行分を塗る."""
+        for column in range(self.cell_num):
+            (keys, counts) = self.paint(keys, counts, row, column)
+        return self.finish_row(keys, counts)
+
+    def _relabel(self, colors: np.ndarray) -> np.ndarray:
+        """各状態の色を出現順に 1, 2, ... と付け直す."""
+        (num, width) = colors.shape
+        color_num = self.color_num
+        rows = np.arange(num)
+        first = []
+        for color in range(1, color_num + 1):
+            found = colors == color
+            position = found.argmax(axis=1)
+            first.append(np.where(found[rows, position], position, width))
+        # 色ごとの新しい番号 - 1 (先に現れる色の数)を、color_num 進数の表の添字にまとめる.
+        # 出現しない色どうしは番号順にするが、どのマスにも無いので影響しない
+        index = np.zeros(num, dtype=np.intp)
+        for (color, position) in enumerate(first):
+            rank = np.zeros(num, dtype=np.intp)
+            for (other, other_position) in enumerate(first):
+                if other != color:
+                    rank += (other_position < position) | ((other_position == position) & (other < color))
+            index = index * color_num + rank
+        return self._relabel_table[index[:, None], colors]
+
+
+def _merge(keys: np.ndarray, counts: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """同じ状態をまとめて塗り方の数を足す."""
+    if len(keys) == 0:
+        return keys, counts
+    keys = np.ascontiguousarray(keys)
+    rows = keys.view(np.dtype((np.void, keys.shape[1]))).ravel()
+    order = np.argsort(rows, kind='stable')
+    rows = rows[order]
+    starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    return keys[order[starts]], np.add.reduceat(counts[order], starts)
+
+
+def _expand_chunk(
+        keys: np.ndarray,
+        counts: np.ndarray,
+        row: int,
+        cell_num: int,
+        fail_num: int,
+        color_num: int) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """ワーカーで1行分を塗る."""
+    return _Board(cell_num, fail_num, color_num).expand(keys, counts, row)
+
+
+def expand_row(
+        states: tp.Iterable[tp.Tuple[State, int]],
+        row: int,
+        cell_num: int,
+        fail_num: int,
+        color_num: int = _COLOR_NUM) -> tp.Dict[State, int]:
+    """1行分を塗って次の境界の状態を得る.
+
+    :param states: 行 row - 1 の境界の状態と塗り方の数. 最初の行では空の境界
+    :param row: 塗る行
+    :return: 行 row の境界の状態(色と左右反転は正規化済み)と塗り方の数
+    """
+    board = _Board(cell_num, fail_num, color_num)
+    items = list(states)
+    keys = board.pack([state for (state, _) in items])
+    counts = np.array([count for (_, count) in items] + [None], dtype=object)[:-1]
+    (keys, counts) = _merge(keys, counts)
+    (keys, counts) = board.expand(keys, counts, row)
+    return dict(zip(board.unpack(keys), counts.tolist()))
+
+
+def count_colorings(
+        cell_num: int,
+        fail_num: int,
+        color_num: int = _COLOR_NUM,
+        workers: int = 1) -> ColoringCount:
+    """失敗にならない塗り方を数える.
+
+    :param cell_num: 盤のマス数
+    :param fail_num: 失敗判定となる数
+    :param color_num: 色の数
+    :param workers: ワーカープロセス数. 1ならプロセスを使わない
+    """
+    if cell_num < 1 or fail_num < 1 or color_num < 1 or workers < 1:
+        raise ValueError(f'invalid arguments: cell_num={cell_num} fail_num={fail_num} '
+                         f'colors={color_num} workers={workers}')
+
+    result = ColoringCount(cell_num, fail_num, color_num)
+    start_time = time.perf_counter()
+    if fail_num > cell_num:
+        # どの方向にも fail_num 個並ぶ場所がない
+        result.count = result.total
+        result.elapsed = time.perf_counter() - start_time
+        return result
+
+    board = _Board(cell_num, fail_num, color_num)
+    keys = board.pack([(0,) * cell_num])
+    counts = np.array([1, None], dtype=object)[:1]
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for row in range(cell_num):
+            if executor is None or len(keys) < _PARALLEL_STATES:
+                (keys, counts) = board.expand(keys, counts, row)
+            else:
+                bounds = np.linspace(0, len(keys), workers + 1).astype(int)
+                chunks = [(keys[start:stop], counts[start:stop]) for (start, stop) in zip(bounds, bounds[1:])]
+                parts = list(executor.map(
+                    _expand_chunk, *zip(*chunks), repeat(row), repeat(cell_num), repeat(fail_num),
+                    repeat(color_num)))
+                (keys, counts) = _merge(
+                    np.concatenate([part_keys for (part_keys, _) in parts]),
+                    np.concatenate([part_counts for (_, part_counts) in parts]))
+            result.max_states = max(result.max_states, len(keys))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    result.count = int(counts.sum()) if len(counts) else 0
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+
+def main():
+    """メイン関数."""
+    parser = argparse.ArgumentParser(description='Sanmoku coloring counter (up to about 7x7)')
+    parser.add_argument('--cell-num', type=int, nargs='+', default=[3, 4, 5, 6])
+    parser.add_argument('--fail-num', type=int, nargs='+', default=[3])
+    parser.add_argument('--colors', type=int, default=_COLOR_NUM)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes (only pays off on several cores from 7x7 up)')
+    args = parser.parse_args()
+
+    for cell_num in args.cell_num:
+        for fail_num in args.fail_num:
+            print(count_colorings(cell_num, fail_num, args.colors, args.workers))
+
+
+if __name__ == "__main__":
+    main()
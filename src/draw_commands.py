@@ -0,0 +1,315 @@
+"""描画コマンドのバッファ.
+
+PyScript版では CanvasRenderingContext2D の呼び出し1回ごとに Pyodide→JS の
+境界を越えるので、Python側では描画命令を数値の配列に記録しておき、1フレームに
+1回だけ JS の実行関数へまとめて渡す. 連続する線は1つのパスに、連続する石は色ごとに
+1つのパスにまとめて塗る.
+
+バッファは array('d') で、各命令は [命令コード, 引数...] の並び.
+文字列(色・フォント・テキスト)と描画先などのJSオブジェクトは別の表に入れ、
+バッファにはその添字を記録する.
+"""
+import math
+import typing as tp
+from array import array
+
+#: 描画先を切り替える (オブジェクト添字)
+OP_TARGET = 0
+#: 塗りつぶしスタイル (文字列添字)
+OP_FILL_STYLE = 1
+#: 線のスタイル (文字列添字, 線の太さ)
+OP_STROKE_STYLE = 2
+#: 矩形を塗る (x, y, w, h)
+OP_FILL_RECT = 3
+#: 矩形を透明にする (x, y, w, h)
+OP_CLEAR_RECT = 4
+#: 線をまとめて引く (本数, [x1, y1, x2, y2] * 本数)
+OP_LINES = 5
+#: 円をまとめて塗る (個数, 半径, [x, y] * 個数)
+OP_CIRCLES = 6
+#: フォント (文字列添字)
+OP_FONT = 7
+#: 文字列を描く (文字列添字, x, y)
+OP_FILL_TEXT = 8
+#: 画像を描く (オブジェクト添字, x, y)
+OP_DRAW_IMAGE = 9
+
+#: 命令コード→固定長の引数の数(OP_LINES, OP_CIRCLES は可変長)
+_ARG_NUMS = {
+    OP_TARGET: 1,
+    OP_FILL_STYLE: 1,
+    OP_STROKE_STYLE: 2,
+    OP_FILL_RECT: 4,
+    OP_CLEAR_RECT: 4,
+    OP_FONT: 1,
+    OP_FILL_TEXT: 3,
+    OP_DRAW_IMAGE: 3,
+}
+
+#: JS側の実行関数. (buffer: Float64Array, strings: Array, objects: Array) を受け取る
+EXECUTOR_JS = """
+(function (buf, strings, objects) {
+  let ctx = null;
+  let i = 0;
+  const n = buf.length;
+  while (i < n) {
+    switch (buf[i]) {
+      case 0: ctx = objects[buf[i + 1]]; i += 2; break;
+      case 1: ctx.fillStyle = strings[buf[i + 1]]; i += 2; break;
+      case 2: ctx.strokeStyle = strings[buf[i + 1]]; ctx.lineWidth = buf[i + 2]; i += 3; break;
+      case 3: ctx.fillRect(buf[i + 1], buf[i + 2], buf[i + 3], buf[i + 4]); i += 5; break;
+      case 4: ctx.clearRect(buf[i + 1], buf[i + 2], buf[i + 3], buf[i + 4]); i += 5; break;
+      case 5: {
+        const count = buf[i + 1];
+        i += 2;
+        ctx.beginPath();
+        for (let k = 0; k < count; k++, i += 4) {
+          ctx.moveTo(buf[i], buf[i + 1]);
+          ctx.lineTo(buf[i + 2], buf[i + 3]);
+        }
+        ctx.stroke();
+        break;
+      }
+      case 6: {
+        const count = buf[i + 1];
+        const r = buf[i + 2];
+        i += 3;
+        ctx.beginPath();
+        for (let k = 0; k < count; k++, i += 2) {
+          ctx.moveTo(buf[i] + r, buf[i + 1]);
+          ctx.arc(buf[i], buf[i + 1], r, 0, 2 * Math.PI);
+        }
+        ctx.fill();
+        break;
+      }
+      case 7: ctx.font = strings[buf[i + 1]]; i += 2; break;
+      case 8: ctx.fillText(strings[buf[i + 1]], buf[i + 2], buf[i + 3]); i += 4; break;
+      case 9: ctx.drawImage(objects[buf[i + 1]], buf[i + 2], buf[i + 3]); i += 4; break;
+      default: throw new Error("unknown draw command " + buf[i]);
+    }
+  }
+})
+"""
+
+
+class Executor(tp.Protocol):
+    """描画コマンドの実行先."""
+
+    def execute(self, buffer: array, strings: tp.List[str], objects: tp.List[tp.Any]) -> None:
+        ...
+
+
+class DrawCommandBuffer:
+    """描画コマンドの記録.
+
+    線と円は同じスタイルが続く間は溜めておき、別の命令が来たときやフラッシュ時に
+    1つの命令として書き出す. 円は色ごとに溜めるので、色の違う石は重ならない前提.
+
+    :param objects: 描画先(コンテキスト)や画像などのJSオブジェクトの表
+    """
+
+    def __init__(self, objects: tp.Sequence[tp.Any] = ()) -> None:
+        self._objects = list(objects)
+        self._buffer = array('d')
+        self._strings: tp.List[str] = []
+        self._string_ids: tp.Dict[str, int] = {}
+        self._target: tp.Optional[int] = None
+        self._fill_style: tp.Optional[str] = None
+        self._font: tp.Optional[str] = None
+        self._lines: tp.Dict[tp.Tuple[str, float], tp.List[float]] = {}
+        self._circles: tp.Dict[tp.Tuple[str, float], tp.List[float]] = {}
+        self._flush_num = 0
+
+    @property
+    def objects(self) -> tp.List[tp.Any]:
+        """JSオブジェクトの表."""
+        return self._objects
+
+    @property
+    def flush_num(self) -> int:
+        """フラッシュした回数."""
+        return self._flush_num
+
+    def __len__(self) -> int:
+        """書き出し済みの数値の数."""
+        return len(self._buffer)
+
+    def add_object(self, obj: tp.Any) -> int:
+        """JSオブジェクトを表に加える.
+
+        :return: 添字
+        """
+        self._objects.append(obj)
+        return len(self._objects) - 1
+
+    def target(self, object_id: int) -> None:
+        """描画先を切り替える."""
+        if object_id == self._target:
+            return
+        self._write_pending()
+        self._target = object_id
+        self._fill_style = None
+        self._font = None
+        self._buffer.extend((OP_TARGET, object_id))
+
+    def fill_rect(self, x: float, y: float, w: float, h: float, style: str) -> None:
+        """矩形を塗る."""
+        self._write_pending()
+        self._set_fill_style(style)
+        self._buffer.extend((OP_FILL_RECT, x, y, w, h))
+
+    def clear_rect(self, x: float, y: float, w: float, h: float) -> None:
+        """矩形を透明にする."""
+        self._write_pending()
+        self._buffer.extend((OP_CLEAR_RECT, x, y, w, h))
+
+    def line(self, start: tp.Tuple[float, float], end: tp.Tuple[float, float], style: str, width: float) -> None:
+        """線を引く."""
+        if self._circles:
+            self._write_circles()
+        self._lines.setdefault((style, width), []).extend((*start, *end))
+
+    def circle(self, center: tp.Tuple[float, float], radius: float, style: str) -> None:
+        """円を塗る."""
+        if self._lines:
+            self._write_lines()
+        self._circles.setdefault((style, radius), []).extend(center)
+
+    def text(self, text: str, position: tp.Tuple[float, float], font: str, style: str) -> None:
+        """文字列を描く."""
+        self._write_pending()
+        if font != self._font:
+            self._font = font
+            self._buffer.extend((OP_FONT, self._string_id(font)))
+        self._set_fill_style(style)
+        self._buffer.extend((OP_FILL_TEXT, self._string_id(text), *position))
+
+    def draw_image(self, object_id: int, x: float, y: float) -> None:
+        """画像を描く."""
+        self._write_pending()
+        self._buffer.extend((OP_DRAW_IMAGE, object_id, x, y))
+
+    def flush(self, executor: Executor) -> bool:
+        """記録した命令を実行先へまとめて渡し、記録と文字列の表を空にする.
+
+        :return: 渡す命令があればTrue
+        """
+        self._write_pending()
+        if not self._buffer:
+            return False
+        executor.execute(self._buffer, self._strings, self._objects)
+        self._flush_num += 1
+        self._buffer = array('d')
+        # 文字列の表もフレームごとに作り直し、変わり続けるテキストで伸び続けないようにする
+        self._strings = []
+        self._string_ids = {}
+        self._target = None
+        self._fill_style = None
+        self._font = None
+        return True
+
+    def _string_id(self, text: str) -> int:
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(text)
+            self._string_ids[text] = string_id
+        return string_id
+
+    def _set_fill_style(self, style: str) -> None:
+        if style != self._fill_style:
+            self._fill_style = style
+            self._buffer.extend((OP_FILL_STYLE, self._string_id(style)))
+
+    def _write_pending(self) -> None:
+        if self._lines:
+            self._write_lines()
+        if self._circles:
+            self._write_circles()
+
+    def _write_lines(self) -> None:
+        for (style, width), coords in self._lines.items():
+            self._buffer.extend((OP_STROKE_STYLE, self._string_id(style), width))
+            self._buffer.extend((OP_LINES, len(coords) // 4))
+            self._buffer.extend(coords)
+        self._lines.clear()
+
+    def _write_circles(self) -> None:
+        for (style, radius), coords in self._circles.items():
+            self._set_fill_style(style)
+            self._buffer.extend((OP_CIRCLES, len(coords) // 2, radius))
+            self._buffer.extend(coords)
+        self._circles.clear()
+
+
+class MockExecutor:
+    """ブラウザなしで命令を解釈する実行先.
+
+    EXECUTOR_JS と同じように命令を読み、コンテキストへの呼び出しを calls に記録する.
+    """
+
+    def __init__(self) -> None:
+        #: (描画先の添字, メソッド名, 引数) のリスト
+        self.calls: tp.List[tp.Tuple[int, str, tp.Tuple]] = []
+        #: execute が呼ばれた回数(JSとの境界を越える回数)
+        self.execute_num = 0
+        #: 直前の execute で渡された文字列の数
+        self.string_num = 0
+
+    def execute(self, buffer: array, strings: tp.List[str], objects: tp.List[tp.Any]) -> None:
+        self.execute_num += 1
+        self.string_num = len(strings)
+        target = -1
+        i = 0
+        n = len(buffer)
+        while i < n:
+            op = int(buffer[i])
+            if op == OP_LINES:
+                count = int(buffer[i + 1])
+                i += 2
+                self._call(target, 'beginPath')
+                for _ in range(count):
+                    self._call(target, 'moveTo', buffer[i], buffer[i + 1])
+                    self._call(target, 'lineTo', buffer[i + 2], buffer[i + 3])
+                    i += 4
+                self._call(target, 'stroke')
+                continue
+            if op == OP_CIRCLES:
+                (count, radius) = (int(buffer[i + 1]), buffer[i + 2])
+                i += 3
+                self._call(target, 'beginPath')
+                for _ in range(count):
+                    self._call(target, 'moveTo', buffer[i] + radius, buffer[i + 1])
+                    self._call(target, 'arc', buffer[i], buffer[i + 1], radius, 0, 2 * math.pi)
+                    i += 2
+                self._call(target, 'fill')
+                continue
+            if op not in _ARG_NUMS:
+                raise ValueError(f'unknown draw command: {op}')
+
+            args = tuple(buffer[i + 1:i + 1 + _ARG_NUMS[op]])
+            i += 1 + _ARG_NUMS[op]
+            if op == OP_TARGET:
+                target = int(args[0])
+            elif op == OP_FILL_STYLE:
+                self._call(target, 'fillStyle', strings[int(args[0])])
+            elif op == OP_STROKE_STYLE:
+                self._call(target, 'strokeStyle', strings[int(args[0])])
+                self._call(target, 'lineWidth', args[1])
+            elif op == OP_FILL_RECT:
+                self._call(target, 'fillRect', *args)
+            elif op == OP_CLEAR_RECT:
+                self._call(target, 'clearRect', *args)
+            elif op == OP_FONT:
+                self._call(target, 'font', strings[int(args[0])])
+            elif op == OP_FILL_TEXT:
+                self._call(target, 'fillText', strings[int(args[0])], args[1], args[2])
+            elif op == OP_DRAW_IMAGE:
+                self._call(target, 'drawImage', int(args[0]), args[1], args[2])
+
+    def _call(self, target: int, name: str, *args) -> None:
+        self.calls.append((target, name, args))
+
+    def count(self, name: str) -> int:
+        """指定したメソッドの呼び出し回数."""
+        return sum(1 for (_, call_name, _) in self.calls if call_name == name)
@@ -0,0 +1,206 @@
+"""構造化イベントログ.
+
+モデルの出来事(生成・石を置いた・失敗・クリア)をフィールド付きのイベントとして
+シンクへ流す. シンクがないか、レベルが閾値に届かないときは enabled が False を
+返すので、呼び出し側はイベントを組み立てる前に打ち切れる.
+
+    log = EventLog(Level.Info, [StdoutSink()])
+    if log.enabled(Level.Info):
+        log.emit(Level.Info, EventType.Placed, row=1, column=2, color=3)
+"""
+import sys
+import time
+import typing as tp
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum, auto
+
+#: JSON Lines をまとめて書き出す行数
+_BATCH_LINES = 256
+#: リングバッファの既定の長さ
+_RING_CAPACITY = 1024
+#: どのレベルも出力しないときの閾値
+_DISABLED = 1 << 30
+
+
+class Level(IntEnum):
+    """ログレベル."""
+    Debug = 10
+    Info = 20
+    Warning = 30
+    Off = 100
+
+
+class EventType(Enum):
+    """イベントの種類."""
+    Created = auto()
+    Placed = auto()
+    Failed = auto()
+    Succeeded = auto()
+    Stats = auto()
+    TraceDumped = auto()
+
+
+@dataclass(frozen=True)
+class Event:
+    """1つのイベント.
+
+    :param level: ログレベル
+    :param type: イベントの種類
+    :param timestamp: 発生時刻(エポック秒)
+    :param fields: イベント固有の値
+    """
+    level: Level
+    type: EventType
+    timestamp: float
+    fields: tp.Dict[str, tp.Any] = field(default_factory=dict)
+
+    def to_dict(self) -> tp.Dict[str, tp.Any]:
+        result = {'level': self.level.name, 'type': self.type.name, 'timestamp': self.timestamp}
+        result.update(self.fields)
+        return result
+
+    def __str__(self) -> str:
+        fields = ' '.join(f'{key}={value}' for key, value in self.fields.items())
+        return f'[{self.level.name}] {self.type.name} {fields}'.rstrip()
+
+
+class Sink(tp.Protocol):
+    """イベントの出力先."""
+
+    def write(self, event: Event) -> None:
+        ...
+
+
+class StdoutSink:
+    """イベントを1行ずつテキストで出力する.
+
+    :param stream: 出力先. 省略時は標準出力
+    """
+
+    def __init__(self, stream: tp.Optional[tp.TextIO] = None) -> None:
+        self._stream = stream
+
+    def write(self, event: Event) -> None:
+        print(event, file=self._stream if self._stream is not None else sys.stdout)
+
+
+class RingBufferSink:
+    """直近のイベントだけをメモリに残す.
+
+    :param capacity: 残すイベント数
+    """
+
+    def __init__(self, capacity: int = _RING_CAPACITY) -> None:
+        self._events: tp.Deque[Event] = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def events(self) -> tp.List[Event]:
+        """残っているイベント(古い順)."""
+        return list(self._events)
+
+    def write(self, event: Event) -> None:
+        self._events.append(event)
+
+    def clear(self) -> None:
+        self._events.clear()
+
+
+class JsonLinesSink:
+    """イベントを JSON Lines でファイルへ書く.
+
+    書き込みは batch_lines 行ごとにまとめて行う. 残りは flush か close で書き出す.
+
+    :param path: 出力先のファイル
+    :param batch_lines: まとめて書き出す行数
+    """
+
+    def __init__(self, path: str, batch_lines: int = _BATCH_LINES) -> None:
+        if batch_lines < 1:
+            raise ValueError(f'batch_lines must be positive: {batch_lines}')
+        # json は起動時には使わないので、シンクを作るときに読み込む
+        import json
+        self._dumps = json.dumps
+        self._file = open(path, 'a', encoding='utf-8')
+        self._batch_lines = batch_lines
+        self._lines: tp.List[str] = []
+
+    def __enter__(self) -> 'JsonLinesSink':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, event: Event) -> None:
+        self._lines.append(self._dumps(event.to_dict(), ensure_ascii=False, default=str))
+        if len(self._lines) >= self._batch_lines:
+            self.flush()
+
+    def flush(self) -> None:
+        """溜まっている行を書き出す."""
+        if self._lines:
+            self._file.write('\n'.join(self._lines) + '\n')
+            self._lines.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        """書き出してファイルを閉じる."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+class EventLog:
+    """レベルで絞り込んでイベントをシンクへ流す.
+
+    :param level: 出力する最低レベル
+    :param sinks: 出力先
+    """
+
+    def __init__(self, level: Level = Level.Info, sinks: tp.Iterable[Sink] = ()) -> None:
+        self._level = level
+        self._sinks: tp.List[Sink] = list(sinks)
+        self._threshold = _DISABLED
+        self._update_threshold()
+
+    @property
+    def level(self) -> Level:
+        return self._level
+
+    @level.setter
+    def level(self, level: Level) -> None:
+        self._level = level
+        self._update_threshold()
+
+    def add_sink(self, sink: Sink) -> None:
+        """出力先を加える."""
+        self._sinks.append(sink)
+        self._update_threshold()
+
+    def remove_sink(self, sink: Sink) -> None:
+        """出力先を外す."""
+        self._sinks.remove(sink)
+        self._update_threshold()
+
+    def enabled(self, level: Level) -> bool:
+        """そのレベルのイベントが出力されるか."""
+        return level >= self._threshold
+
+    def emit(self, level: Level, event_type: EventType, **fields: tp.Any) -> None:
+        """イベントを出力する. 出力されないレベルなら何もしない."""
+        if level < self._threshold:
+            return
+        event = Event(level, event_type, time.time(), fields)
+        for sink in self._sinks:
+            sink.write(event)
+
+    def _update_threshold(self) -> None:
+        """シンクがないか Off ならどのレベルも出力しない."""
+        if not self._sinks or self._level >= Level.Off:
+            self._threshold = _DISABLED
+        else:
+            self._threshold = self._level
@@ -1,14 +1,25 @@
 """ゲームモデル."""
+import math
 import random
+import typing as tp
 
-from ban import Ban
+from ban import Ban, BanBackend, PutState
+from event_log import EventLog, EventType, Level
 from input import VirtualKey, OperationParam, InputState
+from stone_stream import StoneStream
 from values import Position, Cell, StoneColor, GameMode
 
+if tp.TYPE_CHECKING:
+    # 記録は使うときだけ読み込む
+    from recording import GameRecorder
+
+#: get_next_stone が使う石の列
+_default_stones = StoneStream()
+
 
 def get_next_stone() -> StoneColor:
     """次の石をランダムで得る."""
-    return random.randint(StoneColor.Min, StoneColor.Max)  # type: ignore
+    return _default_stones.next()  # type: ignore
 
 
 class Timer:
@@ -29,29 +40,61 @@ class Timer:
             return
         self._sec += delta
 
+    @property
+    def sec(self) -> float:
+        return self._sec
+
     def get_int(self) -> int:
         return int(self._sec)
 
+    def time_to_next_sec(self) -> tp.Optional[float]:
+        """整数の秒が次に変わるまでの秒数. 止まっているときはNone."""
+        if not self._is_start:
+            return None
+        return math.floor(self._sec) + 1.0 - self._sec
+
 
 class GameModel:
-    """ゲーム本体."""
+    """ゲーム本体.
+
+    次の石は stones から得る. stones を省略したときは seed で種を決めた石の列を作る.
+
+    :param stones: 次の石の列
+    :param seed: 次の石の乱数の種か random.Random. 省略時は種を決めない
+    :raise ValueError: stones と seed を両方指定した
+    """
 
     def __init__(
             self,
             ban_size: int,
             ban_cell_num: int,
             ban_margin: int,
-            ban_fail_num: int) -> None:
-        print('[GameModel] Create')
-
-        self._ban = Ban(ban_size, ban_cell_num, ban_margin, ban_fail_num)
+            ban_fail_num: int,
+            ban_backend: BanBackend = BanBackend.List,
+            log: tp.Optional[EventLog] = None,
+            recorder: tp.Optional['GameRecorder'] = None,
+            stones: tp.Optional[StoneStream] = None,
+            seed: tp.Union[int, random.Random, None] = None) -> None:
+        if stones is not None and seed is not None:
+            raise ValueError('specify either stones or seed')
+        self._log = log if log is not None else EventLog()
+        if self._log.enabled(Level.Info):
+            self._log.emit(Level.Info, EventType.Created, name='GameModel', cell_num=ban_cell_num)
+
+        self._ban = Ban(ban_size, ban_cell_num, ban_margin, ban_fail_num, ban_backend)
         self._mouse_pos: Position = Position(0, 0)
         self._press = False
         self._mode = GameMode.WaitStart
 
+        # 1ゲームで使う石はマス数以下なので、既定のブロックはそれに合わせる
+        if stones is None:
+            stones = StoneStream(seed, block=ban_cell_num * ban_cell_num)
+        self._stones = stones
         self._next = StoneColor.Min
         self._change_stone()
         self._timer = Timer()
+        self._fail_line: tuple[Cell, ...] = ()
+        self._recorder = recorder
 
     @property
     def time_sec(self) -> int:
@@ -61,10 +104,30 @@ class GameModel:
     def ban(self):
         return self._ban
 
+    @property
+    def log(self) -> EventLog:
+        """イベントログ."""
+        return self._log
+
+    @property
+    def recorder(self) -> tp.Optional['GameRecorder']:
+        """手の記録. 記録しないときはNone."""
+        return self._recorder
+
     @property
     def next_stone(self) -> StoneColor:
         return self._next
 
+    @property
+    def has_safe_cell(self) -> bool:
+        """次の石を置いても失敗にならないマスがあるか."""
+        return self._ban.has_safe_cell(self._next)
+
+    @property
+    def fail_line(self) -> tuple[Cell, ...]:
+        """失敗時に揃ってしまった列."""
+        return self._fail_line
+
     def update(self, delta: float) -> bool:
         """定期更新処理.
 
@@ -75,6 +138,13 @@ class GameModel:
 
         return True
 
+    def next_update_sec(self) -> tp.Optional[float]:
+        """時間経過で表示が次に変わるまでの秒数.
+
+        :return: 時間経過で変わるものがなければNone
+        """
+        return self._timer.time_to_next_sec()
+
     def is_waitstart(self) -> bool:
         """ゲーム開始待ちか."""
         return self._mode == GameMode.WaitStart
@@ -116,18 +186,36 @@ class GameModel:
         self._put_stone(cell)
 
     def _put_stone(self, cell: Cell):
-        if self._ban.put(cell, self._next):
-            print(f'Put({self._next}) to {cell}')
-            if self._ban.is_fail():
-                print('GameOver!')
-                self._mode = GameMode.GameOver
-                self._timer.stop()
-            elif self._ban.is_success():
-                print('Success!')
-                self._mode = GameMode.Success
-                self._timer.stop()
-            self._change_stone()
+        result = self._ban.place(cell, self._next)
+        if result.state == PutState.Occupied:
+            return
+        if self._recorder is not None:
+            self._recorder.add(cell.row, cell.column, self._next, self._timer.sec)
+        log = self._log
+        if log.enabled(Level.Info):
+            log.emit(Level.Info, EventType.Placed,
+                     row=cell.row, column=cell.column, color=int(self._next), time=self._timer.sec)
+        if result.state == PutState.Fail:
+            self._mode = GameMode.GameOver
+            self._fail_line = result.line
+            self._timer.stop()
+            if self._recorder is not None:
+                from recording import GameResult
+                self._recorder.finish(GameResult.GameOver)
+            if log.enabled(Level.Info):
+                log.emit(Level.Info, EventType.Failed,
+                         row=cell.row, column=cell.column, color=int(self._next), time=self._timer.sec,
+                         line=[c.get() for c in result.line])
+        elif result.state == PutState.Success:
+            self._mode = GameMode.Success
+            self._timer.stop()
+            if self._recorder is not None:
+                from recording import GameResult
+                self._recorder.finish(GameResult.Success)
+            if log.enabled(Level.Info):
+                log.emit(Level.Info, EventType.Succeeded, time=self._timer.sec)
+        self._change_stone()
 
     def _change_stone(self):
         """石を替える."""
-        self._next = get_next_stone()
+        self._next = self._stones.next()  # type: ignore
@@ -1,5 +1,5 @@
 """入力モジュール."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 
 from values import Position
@@ -94,4 +94,4 @@ class OperationParam:
     """operateに渡すパラメーター."""
     code: VirtualKey
     state: InputState
-    position: Position = Position(0, 0)
+    position: Position = field(default_factory=Position)
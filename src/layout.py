@@ -0,0 +1,107 @@
+"""盤の配置.
+
+盤の大きさ・マス数・余白から決まる座標を1度だけ計算して共有する.
+Ban の当たり判定と、pygame 版・PyScript 版の BanView の描画が同じものを使う.
+
+当たり判定は従来どおり整数のマスの大きさで、描画は実数のマスの間隔で行う.
+"""
+import typing as tp
+
+from values import Cell
+
+#: 枠線の1本. (始点, 終点)
+Line = tp.Tuple[tp.Tuple[float, float], tp.Tuple[float, float]]
+
+
+class BoardLayout:
+    """盤の配置の計算結果.
+
+    get_layout で得ると、同じ大きさの盤では同じインスタンスが共有される.
+
+    :param size: 盤の大きさ
+    :param cell_num: 一辺のマス数
+    :param margin: 盤の端からマスまでの余白
+    """
+
+    def __init__(self, size: int, cell_num: int, margin: int) -> None:
+        self._size = size
+        self._cell_num = cell_num
+        self._margin = margin
+        self._cell_size = int((size - margin * 2) / cell_num)
+        self._pitch = (size - margin * 2) / cell_num
+
+        # 当たり判定表: 画素の座標 → 行・列の番号(マスの外は -1)
+        if self._cell_size > 0:
+            self._axis: tp.Tuple[int, ...] = tuple(
+                (v - margin) // self._cell_size if v >= margin else -1
+                for v in range(margin + self._cell_size * cell_num))
+        else:
+            self._axis = ()
+
+        offset = margin + self._pitch / 2
+        self._centers = tuple(i * self._pitch + offset for i in range(cell_num))
+
+        lines = []
+        for x in range(cell_num + 1):
+            lines.append(((x * self._pitch + margin, 0 + margin), (x * self._pitch + margin, size - margin)))
+        for y in range(cell_num + 1):
+            lines.append(((margin, y * self._pitch + margin), (size - margin, y * self._pitch + margin)))
+        self._lines: tp.Tuple[Line, ...] = tuple(lines)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def cell_num(self) -> int:
+        return self._cell_num
+
+    @property
+    def margin(self) -> int:
+        return self._margin
+
+    @property
+    def cell_size(self) -> int:
+        """当たり判定に使う整数のマスの大きさ."""
+        return self._cell_size
+
+    @property
+    def pitch(self) -> float:
+        """描画に使うマスの間隔."""
+        return self._pitch
+
+    @property
+    def lines(self) -> tp.Tuple[Line, ...]:
+        """マスの枠線(縦線、横線の順)."""
+        return self._lines
+
+    def hit(self, x: float, y: float) -> tp.Optional[Cell]:
+        """画素の座標にあるマスを得る.
+
+        :return: マス. マスの外ならNone
+        """
+        axis = self._axis
+        if 0 <= x < len(axis) and 0 <= y < len(axis):
+            row = axis[int(y)]
+            column = axis[int(x)]
+            if row >= 0 and column >= 0:
+                return Cell(row, column)
+        return None
+
+    def center(self, row: int, column: int) -> tp.Tuple[float, float]:
+        """マスの中心の座標."""
+        return self._centers[column], self._centers[row]
+
+
+#: (大きさ, マス数, 余白) → 配置
+_layouts: tp.Dict[tp.Tuple[int, int, int], BoardLayout] = {}
+
+
+def get_layout(size: int, cell_num: int, margin: int) -> BoardLayout:
+    """盤の配置を得る. 同じ引数なら同じインスタンスを返す."""
+    key = (size, cell_num, margin)
+    layout = _layouts.get(key)
+    if layout is None:
+        layout = BoardLayout(size, cell_num, margin)
+        _layouts[key] = layout
+    return layout
@@ -0,0 +1,197 @@
+"""ゲームサーバーの負荷生成クライアント.
+
+多数のクライアントを同時に接続し、空いているマスをランダムにクリックし続けて、
+石を置く操作を送ってから ack が返るまでの時間を集計する.
+
+使い方::
+
+    python loadgen.py --port 8765 --clients 1000 --moves 20
+    python loadgen.py --local --clients 1000 --think 0.5
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import typing as tp
+from dataclasses import dataclass, field
+
+from server import GameServer, ServerConfig
+from stats import percentile
+
+
+@dataclass
+class LoadResult:
+    """負荷生成の結果.
+
+    :param clients: 接続したクライアント数
+    :param errors: 失敗したクライアント数
+    :param latencies: 操作1回ごとの応答時間(秒)
+    :param elapsed: 経過秒
+    """
+    clients: int
+    errors: int = 0
+    latencies: tp.List[float] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def moves(self) -> int:
+        """送った操作の数."""
+        return len(self.latencies)
+
+    @property
+    def moves_per_sec(self) -> float:
+        """1秒あたりの操作数."""
+        return self.moves / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        if not self.latencies:
+            return f'clients={self.clients} errors={self.errors} moves=0'
+        return (f'clients={self.clients} errors={self.errors} moves={self.moves} '
+                f'moves/sec={self.moves_per_sec:.0f} '
+                f'p50={percentile(self.latencies, 50) * 1000:.2f}ms '
+                f'p99={percentile(self.latencies, 99) * 1000:.2f}ms')
+
+
+class _Client:
+    """1人分のプレイヤー."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._seq = 0
+        self._state: tp.Dict[str, tp.Any] = {}
+        self._board = ''
+
+    @property
+    def mode(self) -> str:
+        return self._state.get('mode', '')
+
+    @property
+    def board(self) -> str:
+        return self._board
+
+    async def receive(self) -> tp.Dict[str, tp.Any]:
+        """1メッセージ受け取る. state なら手元の状態を更新する."""
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError('connection closed')
+        message = json.loads(line)
+        if message['type'] == 'error':
+            raise RuntimeError(message['message'])
+        if message['type'] == 'state':
+            self._state = message
+            self._board = message.get('board', self._board)
+        return message
+
+    async def operate(self, code: str, state: str, x: int = 0, y: int = 0) -> float:
+        """操作を送り、ack が返るまで待つ.
+
+        :return: 応答時間(秒)
+        """
+        self._seq += 1
+        seq = self._seq
+        start = time.perf_counter()
+        self._writer.write(json.dumps(
+            {'seq': seq, 'code': code, 'state': state, 'x': x, 'y': y}).encode() + b'\n')
+        while (await self.receive()).get('ack') != seq:
+            pass
+        return time.perf_counter() - start
+
+    async def click(self, x: int, y: int) -> float:
+        """クリックする. 押したときの応答時間を返す."""
+        latency = await self.operate('MouseLeft', 'Press', x, y)
+        await self.operate('MouseLeft', 'Release', x, y)
+        return latency
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+async def play(
+        host: str,
+        port: int,
+        moves: int,
+        rand: random.Random,
+        think: float = 0.0) -> tp.List[float]:
+    """1クライアント分の負荷をかける.
+
+    :param moves: 石を置く操作の最大数. ゲームが終わればそこでやめる
+    :param think: 操作の間に空ける秒数
+    :return: 石を置く操作ごとの応答時間(秒)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    client = _Client(reader, writer)
+    try:
+        hello = await client.receive()
+        cell_num = hello['cell_num']
+        margin = hello['margin']
+        cell_size = (hello['size'] - margin * 2) // cell_num
+        latencies = []
+        await client.click(0, 0)
+        while len(latencies) < moves and client.mode == 'InGame':
+            empty = [index for index, color in enumerate(client.board) if color == '0']
+            row, column = divmod(rand.choice(empty), cell_num)
+            x = margin + column * cell_size + cell_size // 2
+            y = margin + row * cell_size + cell_size // 2
+            latencies.append(await client.click(x, y))
+            if think > 0.0:
+                await asyncio.sleep(think)
+        return latencies
+    finally:
+        client.close()
+
+
+async def run(
+        host: str,
+        port: int,
+        clients: int,
+        moves: int,
+        seed: int = 0,
+        think: float = 0.0) -> LoadResult:
+    """複数クライアントで同時に負荷をかける."""
+    result = LoadResult(clients)
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(play(host, port, moves, random.Random(seed + index), think) for index in range(clients)),
+        return_exceptions=True)
+    result.elapsed = time.perf_counter() - start
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            result.errors += 1
+        else:
+            result.latencies += outcome
+    return result
+
+
+async def run_local(clients: int, moves: int, seed: int = 0, think: float = 0.0) -> LoadResult:
+    """同じプロセスでサーバーを立てて負荷をかける."""
+    server = GameServer(ServerConfig(port=0, max_sessions=clients))
+    await server.start()
+    try:
+        return await run('127.0.0.1', server.port, clients, moves, seed, think)
+    finally:
+        await server.close()
+
+
+def main():
+    """メイン関数."""
+    parser = argparse.ArgumentParser(description='Sanmoku game server load generator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--moves', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--think', type=float, default=0.0, help='seconds between moves')
+    parser.add_argument('--local', action='store_true', help='start a server in this process')
+    args = parser.parse_args()
+
+    if args.local:
+        result = asyncio.run(run_local(args.clients, args.moves, args.seed, args.think))
+    else:
+        result = asyncio.run(run(args.host, args.port, args.clients, args.moves, args.seed, args.think))
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
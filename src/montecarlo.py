@@ -0,0 +1,350 @@
+"""モンテカルロ法による自動プレイとヒント.
+
+厳密に解けない大きな盤向けに、候補のマスごとにランダムなプレイアウトを繰り返し、
+平均の成績が最も良いマスを選ぶ. いつ打ち切っても答えが出るので、1手50ミリ秒
+などの時間の予算で使える.
+
+プレイアウトでは次の石を StoneStream でゲームと同じく一様に選び、すぐには
+失敗しないマスからランダムに置く. 成績は置けた石の数を空きマスの数で割った値で、
+クリアなら1になる.
+
+    with MonteCarloPlayer(budget=0.05, workers=4) as player:
+        cell = player.best_cell(model.ban, model.next_stone)
+"""
+import random
+import time
+import typing as tp
+from concurrent.futures import Executor, Future
+
+from ban import Ban
+from stone_stream import StoneStream
+from values import Cell, StoneColor
+
+#: 1手の既定の予算(秒)
+_BUDGET = 0.05
+#: ヒントを1回の poll で考える時間(秒)
+_SLICE_SEC = 0.004
+#: executor が無いときに、1回の poll のうちプレイアウトに使う割合. 残りは時間の揺らぎの分
+_SLICE_FILL = 0.75
+#: ワーカーとのやりとりのために予算から差し引く時間(秒)
+_DISPATCH_SEC = 0.005
+#: 盤の大きさ(判定には影響しない)
+_BAN_SIZE = 400
+#: 盤の余白(判定には影響しない)
+_BAN_MARGIN = 10
+
+#: 盤面. Ban.to_list の形
+Board = tp.List[tp.List[int]]
+
+
+class Search:
+    """1つの局面の探索.
+
+    run を呼ぶたびにプレイアウトを足していき、評価を精しくする.
+    候補が1つ以下なら考えるまでもないので、プレイアウトはしない.
+
+    :param board: 盤面
+    :param fail_num: 失敗判定となる数
+    :param next_stone: 次に置く石
+    :param seed: 乱数の種
+    """
+
+    def __init__(
+            self,
+            board: Board,
+            fail_num: int,
+            next_stone: StoneColor,
+            seed: tp.Optional[int] = None) -> None:
+        cell_num = len(board)
+        self._ban = Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, fail_num)
+        for (row, colors) in enumerate(board):
+            for (column, color) in enumerate(colors):
+                if color != 0:
+                    self._ban.put(Cell(row, column), color)
+        self._next_stone = next_stone
+        self._rand = random.Random(seed)
+        self._stones = StoneStream(self._rand, block=cell_num * cell_num)
+
+        # すぐには失敗しないマスが候補. 無ければどこに置いても失敗なので空きマス全て
+        if self._ban.has_safe_cell(next_stone):
+            self._candidates = self._ban.safe_cells(next_stone)
+        else:
+            self._candidates = self._ban.empty_cells()
+        self._totals = [0.0] * len(self._candidates)
+        self._counts = [0] * len(self._candidates)
+        self._cursor = 0
+
+    @property
+    def candidates(self) -> tp.List[Cell]:
+        return self._candidates
+
+    @property
+    def rollouts(self) -> int:
+        """行ったプレイアウトの数."""
+        return sum(self._counts)
+
+    @property
+    def totals(self) -> tp.List[float]:
+        """候補ごとの成績の合計."""
+        return self._totals
+
+    @property
+    def counts(self) -> tp.List[int]:
+        """候補ごとのプレイアウトの数."""
+        return self._counts
+
+    def run(self, sec: float, clock: tp.Callable[[], float] = time.monotonic) -> int:
+        """sec 秒が経つまで、候補を順に巡ってプレイアウトを行う. 少なくとも1回は行う.
+
+        :return: 行ったプレイアウトの数
+        """
+        if len(self._candidates) <= 1:
+            return 0
+        last = clock()
+        deadline = last + sec
+        longest = 0.0
+        done = 0
+        while True:
+            index = self._cursor
+            self._totals[index] += self._rollout(self._candidates[index])
+            self._counts[index] += 1
+            self._cursor = (index + 1) % len(self._candidates)
+            done += 1
+            # 次のプレイアウトが最も長かったものと同じだけかかっても期限を越えそうならやめる
+            now = clock()
+            longest = max(longest, now - last)
+            last = now
+            if now + longest >= deadline:
+                return done
+
+    def merge(self, totals: tp.Sequence[float], counts: tp.Sequence[int]) -> None:
+        """同じ局面を別に探索した結果を足し込む."""
+        if len(totals) != len(self._totals) or len(counts) != len(self._counts):
+            raise ValueError('candidate mismatch')
+        for (index, (total, count)) in enumerate(zip(totals, counts)):
+            self._totals[index] += total
+            self._counts[index] += count
+
+    def results(self) -> tp.List[tp.Tuple[Cell, float]]:
+        """候補のマスごとの平均の成績. プレイアウトしていない候補は0."""
+        return [
+            (cell, total / count if count else 0.0)
+            for (cell, total, count) in zip(self._candidates, self._totals, self._counts)]
+
+    def best_cell(self) -> tp.Optional[Cell]:
+        """平均の成績が最も良いマス. 空きマスが無ければNone."""
+        if not self._candidates:
+            return None
+        (cell, _) = max(self.results(), key=lambda item: item[1])
+        return cell
+
+    def _rollout(self, cell: Cell) -> float:
+        """cell に次の石を置いてから、最後まで置き続ける.
+
+        盤面は元に戻す.
+
+        :return: 置けた石の数 / 空きマスの数
+        """
+        ban = self._ban
+        empty_num = ban.empty_num
+        placed = []
+        color = self._next_stone
+        while not ban.would_fail(cell, color):
+            ban.put(cell, color)
+            placed.append(cell)
+            if ban.empty_num == 0:
+                break
+            color = self._stones.next()  # type: ignore
+            if not ban.has_safe_cell(color):
+                break
+            cell = self._rand.choice(ban.safe_cells(color))
+        for cell in placed:
+            ban.remove(cell)
+        return len(placed) / empty_num
+
+
+def _search_task(
+        board: Board,
+        fail_num: int,
+        next_stone: int,
+        sec: float,
+        seed: int) -> tp.Tuple[tp.List[float], tp.List[int]]:
+    """ワーカーで探索する.
+
+    :return: (候補ごとの成績の合計, 候補ごとのプレイアウトの数)
+    """
+    search = Search(board, fail_num, next_stone, seed)  # type: ignore
+    search.run(sec)
+    return search.totals, search.counts
+
+
+class MonteCarloPlayer:
+    """時間の予算内で最善のマスを選ぶ自動プレイヤー.
+
+    workers が2以上なら、同じ局面を各ワーカープロセスで別の乱数で探索して足し合わせる.
+    プロセスは使い回すので、使い終わったら close する.
+
+    :param budget: 1手の予算(秒)
+    :param workers: ワーカープロセス数. 1ならプロセスを使わない
+    :param seed: 乱数の種
+    """
+
+    def __init__(self, budget: float = _BUDGET, workers: int = 1, seed: tp.Optional[int] = None) -> None:
+        if budget <= 0.0:
+            raise ValueError(f'budget must be positive: {budget}')
+        if workers < 1:
+            raise ValueError(f'workers must be positive: {workers}')
+        self._budget = budget
+        self._workers = workers
+        self._rand = random.Random(seed)
+        self._executor: tp.Optional[Executor] = None
+        if workers > 1:
+            # PyScript 版はプロセスを使わないので、使うときだけ読み込む
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def __enter__(self) -> 'MonteCarloPlayer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def budget(self) -> float:
+        return self._budget
+
+    def search(self, ban: Ban, next_stone: StoneColor, budget: tp.Optional[float] = None) -> Search:
+        """予算いっぱいまで探索する.
+
+        :param budget: 予算(秒). 省略時は既定の予算
+        """
+        sec = self._budget if budget is None else budget
+        board = ban.to_list()
+        search = Search(board, ban.fail_num, next_stone, self._rand.getrandbits(64))
+        if self._executor is None or len(search.candidates) <= 1:
+            search.run(sec)
+            return search
+
+        sec = max(sec - _DISPATCH_SEC, 0.0)
+        futures = [
+            self._executor.submit(
+                _search_task, board, ban.fail_num, next_stone, sec, self._rand.getrandbits(64))
+            for _ in range(self._workers)]
+        for future in futures:
+            search.merge(*future.result())
+        return search
+
+    def best_cell(self, ban: Ban, next_stone: StoneColor, budget: tp.Optional[float] = None) -> tp.Optional[Cell]:
+        """次の石を置くべきマスを得る. 空きマスが無ければNone."""
+        return self.search(ban, next_stone, budget).best_cell()
+
+    def close(self) -> None:
+        """ワーカープロセスを終わらせる."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def make_montecarlo_strategy(
+        budget: float = _BUDGET) -> tp.Callable[[Ban, StoneColor, random.Random], Cell]:
+    """モンテカルロ法で選ぶ simulator の配置戦略を作る.
+
+    プレイヤーは最初の呼び出しで1つだけ作り、以降の手で使い回す.
+    乱数の種は最初に渡された乱数から取る.
+
+    :param budget: 1手の予算(秒)
+    """
+    players: tp.List[MonteCarloPlayer] = []
+
+    def strategy(ban: Ban, color: StoneColor, rand: random.Random) -> Cell:
+        if not players:
+            players.append(MonteCarloPlayer(budget, seed=rand.getrandbits(64)))
+        cell = players[0].best_cell(ban, color)
+        assert cell is not None
+        return cell
+
+    return strategy
+
+
+#: 既定の予算のモンテカルロ法で選ぶ. simulator の配置戦略
+montecarlo_strategy = make_montecarlo_strategy()
+
+
+class HintEngine:
+    """ビューから呼ぶヒント.
+
+    フレームを止めないように、request で考え始めて poll で結果を受け取る.
+    executor を渡すとそこで予算いっぱい考え、渡さなければ poll のたびに
+    slice_sec だけ考える(PyScript のようにプロセスを使えない環境向け).
+
+    :param budget: 1つのヒントの予算(秒)
+    :param slice_sec: executor が無いときに1回の poll で考える時間(秒)
+    :param executor: 探索を任せる Executor
+    :param seed: 乱数の種
+    """
+
+    def __init__(
+            self,
+            budget: float = _BUDGET,
+            slice_sec: float = _SLICE_SEC,
+            executor: tp.Optional[Executor] = None,
+            seed: tp.Optional[int] = None) -> None:
+        if budget <= 0.0 or slice_sec <= 0.0:
+            raise ValueError(f'invalid time: budget={budget}, slice={slice_sec}')
+        self._budget = budget
+        self._slice_sec = slice_sec
+        self._executor = executor
+        self._rand = random.Random(seed)
+        self._search: tp.Optional[Search] = None
+        self._future: tp.Optional[Future] = None
+        self._remaining = 0.0
+        self._hint: tp.Optional[Cell] = None
+
+    @property
+    def pending(self) -> bool:
+        """考えている途中か."""
+        return self._search is not None
+
+    @property
+    def hint(self) -> tp.Optional[Cell]:
+        """最後に出たヒント."""
+        return self._hint
+
+    def request(self, ban: Ban, next_stone: StoneColor) -> None:
+        """ヒントを考え始める. 考えている途中のものは捨てる."""
+        self.cancel()
+        board = ban.to_list()
+        self._search = Search(board, ban.fail_num, next_stone, self._rand.getrandbits(64))
+        if self._executor is not None and len(self._search.candidates) > 1:
+            self._future = self._executor.submit(
+                _search_task, board, ban.fail_num, next_stone, self._budget, self._rand.getrandbits(64))
+        else:
+            self._remaining = self._budget
+
+    def poll(self) -> tp.Optional[Cell]:
+        """考え終わっていればヒントを返す. 途中なら少し考えてNoneを返す."""
+        search = self._search
+        if search is None:
+            return None
+        if self._future is not None:
+            if not self._future.done():
+                return None
+            search.merge(*self._future.result())
+        elif len(search.candidates) > 1 and self._remaining > 0.0:
+            start = time.monotonic()
+            search.run(min(self._slice_sec * _SLICE_FILL, self._remaining))
+            self._remaining -= time.monotonic() - start
+            if self._remaining > 0.0:
+                return None
+        self._hint = search.best_cell()
+        self._search = None
+        self._future = None
+        return self._hint
+
+    def cancel(self) -> None:
+        """考えている途中のヒントと、最後に出たヒントを捨てる."""
+        if self._future is not None:
+            self._future.cancel()
+        self._search = None
+        self._future = None
+        self._hint = None
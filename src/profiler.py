@@ -0,0 +1,281 @@
+"""実行時の計測.
+
+モデルの更新・操作、各ビューの描画、画面への反映などの区間にかかった時間を測り、
+区間ごとに直近の分布(ヒストグラム)を残す. 同時に Chrome のトレース形式
+(chrome://tracing や Perfetto で読める JSON)のイベントも残す.
+
+メソッドの計測は attach で登録しておき、計測を有効にしたときだけインスタンスに
+計測付きのメソッドを差し込む. 無効にすると差し込んだものを外すので、計測を
+切っている間は何も余計に走らない.
+
+    profiler = Profiler()
+    profiler.attach(model, 'update', 'GameModel.update')
+    profiler.enabled = True
+    with profiler.section('frame'):
+        model.update(delta)
+    profiler.dump_trace('trace.json')
+"""
+import time
+import typing as tp
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass
+
+from stats import percentile
+
+#: ヒストグラムに残す回数
+_CAPACITY = 600
+#: トレースに残すイベント数
+_TRACE_CAPACITY = 100000
+#: ヒストグラムの最小の目盛り(秒)
+_BUCKET_MIN = 1e-6
+#: ヒストグラムの目盛りの数. 2 の 1/2 乗ずつ増やして約1秒まで
+_BUCKET_NUM = 41
+
+
+@dataclass(frozen=True)
+class SectionStats:
+    """1区間の統計.
+
+    :param name: 区間の名前
+    :param count: 残っている回数
+    :param mean: 平均(秒)
+    :param p50: 中央値(秒)
+    :param p99: 99パーセンタイル(秒)
+    :param max: 最大(秒)
+    """
+    name: str
+    count: int
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+    def __str__(self) -> str:
+        return (f'{self.name} n={self.count} mean={self.mean * 1000:.3f}ms '
+                f'p50={self.p50 * 1000:.3f}ms p99={self.p99 * 1000:.3f}ms max={self.max * 1000:.3f}ms')
+
+
+#: ヒストグラムの目盛り(各区間の上端, 秒)
+_BUCKET_EDGES = tuple(_BUCKET_MIN * 2 ** (i / 2) for i in range(_BUCKET_NUM))
+
+
+class Histogram:
+    """直近 capacity 回の時間の分布.
+
+    目盛りは対数で、最後の目盛りより長いものは最後の区間に数える.
+    古いものを捨てるときに数え直さずに済むよう、区間ごとの数を増減させる.
+
+    :param capacity: 残す回数
+    """
+
+    def __init__(self, capacity: int = _CAPACITY) -> None:
+        if capacity < 1:
+            raise ValueError(f'capacity must be positive: {capacity}')
+        self._samples: tp.Deque[float] = deque()
+        self._capacity = capacity
+        self._counts = [0] * (_BUCKET_NUM + 1)
+        self._total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, sec: float) -> None:
+        """1回分を加える."""
+        if len(self._samples) == self._capacity:
+            old = self._samples.popleft()
+            self._counts[bisect_left(_BUCKET_EDGES, old)] -= 1
+            self._total -= old
+        self._samples.append(sec)
+        self._counts[bisect_left(_BUCKET_EDGES, sec)] += 1
+        self._total += sec
+
+    def buckets(self) -> tp.List[tp.Tuple[float, int]]:
+        """(区間の上端(秒), 回数) のリスト. 最後の区間の上端は無限大."""
+        edges = _BUCKET_EDGES + (float('inf'),)
+        return list(zip(edges, self._counts))
+
+    def stats(self, name: str = '') -> SectionStats:
+        """統計を得る."""
+        if not self._samples:
+            return SectionStats(name, 0, 0.0, 0.0, 0.0, 0.0)
+        return SectionStats(
+            name=name,
+            count=len(self._samples),
+            mean=self._total / len(self._samples),
+            p50=percentile(self._samples, 50),
+            p99=percentile(self._samples, 99),
+            max=max(self._samples))
+
+    def clear(self) -> None:
+        self._samples.clear()
+        self._counts = [0] * (_BUCKET_NUM + 1)
+        self._total = 0.0
+
+
+class _Section:
+    """計測する区間. with で囲む."""
+
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler: 'Profiler', name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = self._profiler.clock()
+
+    def __exit__(self, *args) -> None:
+        self._profiler.record(self._name, self._start, self._profiler.clock())
+
+
+class _NullSection:
+    """計測しないときの区間."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+_NULL_SECTION = _NullSection()
+
+
+class Profiler:
+    """区間ごとの時間の計測.
+
+    :param capacity: 区間ごとにヒストグラムへ残す回数
+    :param trace_capacity: トレースに残すイベント数. 古いものから捨てる
+    :param clock: 時計(秒)
+    """
+
+    def __init__(
+            self,
+            capacity: int = _CAPACITY,
+            trace_capacity: int = _TRACE_CAPACITY,
+            clock: tp.Callable[[], float] = time.perf_counter) -> None:
+        self._capacity = capacity
+        self.clock = clock
+        self._origin = clock()
+        self._enabled = False
+        self._histograms: tp.Dict[str, Histogram] = {}
+        self._trace: tp.Deque[tp.Tuple[str, float, float]] = deque(maxlen=trace_capacity)
+        self._targets: tp.List[tp.Tuple[tp.Any, str, str]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool) -> None:
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        for (obj, method, name) in self._targets:
+            if enabled:
+                self._install(obj, method, name)
+            else:
+                self._uninstall(obj, method)
+
+    def toggle(self) -> bool:
+        """計測の有効・無効を切り替える.
+
+        :return: 切り替えた後の状態
+        """
+        self.enabled = not self._enabled
+        return self._enabled
+
+    def attach(self, obj: tp.Any, method: str, name: tp.Optional[str] = None) -> None:
+        """インスタンスのメソッドを計測する区間として登録する.
+
+        :param obj: インスタンス
+        :param method: メソッド名
+        :param name: 区間の名前. 省略時は「クラス名.メソッド名」
+        """
+        if name is None:
+            name = f'{type(obj).__name__}.{method}'
+        self._targets.append((obj, method, name))
+        if self._enabled:
+            self._install(obj, method, name)
+
+    def section(self, name: str) -> tp.ContextManager[None]:
+        """with で囲んだ処理を計測する. 無効なら何もしない."""
+        if not self._enabled:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """区間を1回分記録する.
+
+        :param start: 開始時刻(clock の値)
+        :param end: 終了時刻(clock の値)
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = Histogram(self._capacity)
+            self._histograms[name] = histogram
+        histogram.add(end - start)
+        self._trace.append((name, start, end - start))
+
+    @property
+    def trace_num(self) -> int:
+        """残っているトレースのイベント数."""
+        return len(self._trace)
+
+    def histogram(self, name: str) -> tp.Optional[Histogram]:
+        return self._histograms.get(name)
+
+    def stats(self) -> tp.List[SectionStats]:
+        """区間ごとの統計. 初めて記録した順."""
+        return [histogram.stats(name) for (name, histogram) in self._histograms.items()]
+
+    def trace_events(self) -> tp.List[tp.Dict[str, tp.Any]]:
+        """Chrome のトレース形式の完了イベント(ph=X). 時刻はマイクロ秒."""
+        return [
+            {'name': name, 'cat': 'sanmoku', 'ph': 'X',
+             'ts': (start - self._origin) * 1e6, 'dur': duration * 1e6, 'pid': 1, 'tid': 1}
+            for (name, start, duration) in self._trace]
+
+    def trace_json(self) -> str:
+        """Chrome のトレース形式の JSON."""
+        import json
+        return json.dumps({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'})
+
+    def dump_trace(self, path: str) -> int:
+        """トレースを JSON ファイルへ書く.
+
+        :return: 書いたイベント数
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.trace_json())
+        return len(self._trace)
+
+    def clear(self) -> None:
+        """ヒストグラムとトレースを捨てる."""
+        self._histograms.clear()
+        self._trace.clear()
+
+    def _install(self, obj: tp.Any, method: str, name: str) -> None:
+        """計測付きのメソッドをインスタンスに差し込む."""
+        func = getattr(obj, method)
+        clock = self.clock
+        record = self.record
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, start, clock())
+
+        setattr(obj, method, timed)
+
+    @staticmethod
+    def _uninstall(obj: tp.Any, method: str) -> None:
+        """差し込んだメソッドを外し、クラスのメソッドに戻す."""
+        if method in vars(obj):
+            delattr(obj, method)
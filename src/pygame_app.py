@@ -1,10 +1,14 @@
 """三目不並：アプリケーション."""
-import time
+from concurrent.futures import ProcessPoolExecutor
 
+from event_log import EventLog, EventType, Level, StdoutSink
 from game import GameModel
+from montecarlo import HintEngine
+from profiler import Profiler
 from pygame_view import GameView
+from scheduler import FrameScheduler
 
-#: ゲームのFPS
+#: フレームの最短間隔(秒)
 _FPS = 1.0 / 30.0
 #: スクリーン幅
 _SCR_W = 600
@@ -18,19 +22,34 @@ _BAN_CELL_NUM = 9
 _BAN_MARGIN = 10
 #: 失敗判定となる数
 _BAN_FAIL_NUM = 3
+#: ヒントの予算(秒)
+_HINT_BUDGET = 0.3
 
 
 def main():
     """メイン関数."""
-    model = GameModel(_BAN_SIZE, _BAN_CELL_NUM, _BAN_MARGIN, _BAN_FAIL_NUM)
-    view = GameView(model, _SCR_W, _SCR_H)
-
-    while True:
-        if not model.update(_FPS):
-            return
-        if not view.update():
-            return
-        time.sleep(_FPS)
+    model = GameModel(
+        _BAN_SIZE, _BAN_CELL_NUM, _BAN_MARGIN, _BAN_FAIL_NUM,
+        log=EventLog(Level.Info, [StdoutSink()]))
+    profiler = Profiler()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        view = GameView(model, _SCR_W, _SCR_H, HintEngine(_HINT_BUDGET, executor=executor), profiler)
+        scheduler = FrameScheduler(model.next_update_sec, min_interval=_FPS)
+
+        def step(delta: float) -> bool:
+            with profiler.section('frame'):
+                if not (model.update(delta) and view.update()):
+                    return False
+            # ヒントを待つ間はフレームを止めない
+            if view.hint_pending:
+                scheduler.request_frame()
+            return True
+
+        scheduler.run(step, view.wait)
+    if model.log.enabled(Level.Info):
+        model.log.emit(Level.Info, EventType.Stats, name='Scheduler', stats=str(scheduler.stats()))
+        for stats in profiler.stats():
+            model.log.emit(Level.Info, EventType.Stats, name='Profiler', stats=str(stats))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+"""PyGame用の文字描画キャッシュ.
+
+pygame.font.SysFont はシステムフォントの検索を伴うので、フォントは名前と大きさ
+ごとに1度だけ作る. 描画済みの文字列のサーフェスも (文字列, フォント, 大きさ, 色)
+ごとに一定数まで覚えておき、同じ文字列を毎フレーム描き直さないようにする.
+"""
+import typing as tp
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pygame
+
+#: 色
+Color = tp.Tuple[int, int, int]
+
+
+@dataclass
+class CacheStats:
+    """キャッシュの統計.
+
+    :param hits: 見つかった回数
+    :param misses: 見つからなかった回数
+    :param evictions: 追い出した回数
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class FontRegistry:
+    """フォントの登録所."""
+
+    def __init__(self) -> None:
+        self._fonts: tp.Dict[tp.Tuple[str, int], pygame.font.Font] = {}
+
+    def get(self, name: str, size: int) -> pygame.font.Font:
+        """フォントを得る. 初めての組み合わせのときだけ作る."""
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size)
+            self._fonts[key] = font
+        return font
+
+    def __len__(self) -> int:
+        return len(self._fonts)
+
+
+class TextCache:
+    """描画済みの文字列のLRUキャッシュ.
+
+    :param fonts: フォントの登録所
+    :param capacity: 覚えておくサーフェスの数
+    """
+
+    def __init__(self, fonts: FontRegistry, capacity: int = 64) -> None:
+        if capacity <= 0:
+            raise ValueError(f'capacity must be positive: {capacity}')
+        self._fonts = fonts
+        self._capacity = capacity
+        self._surfaces: tp.OrderedDict[tp.Tuple[str, str, int, Color], pygame.Surface] = OrderedDict()
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        """統計."""
+        return self._stats
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def render(self, text: str, font_name: str, size: int, color: Color) -> pygame.Surface:
+        """文字列を描いたサーフェスを得る."""
+        key = (text, font_name, size, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self._stats.hits += 1
+            return surface
+
+        self._stats.misses += 1
+        surface = self._fonts.get(font_name, size).render(text, True, color)
+        self._surfaces[key] = surface
+        if self._capacity < len(self._surfaces):
+            self._surfaces.popitem(last=False)
+            self._stats.evictions += 1
+        return surface
@@ -1,8 +1,14 @@
+import typing as tp
+
 import pygame
 
 import input
 from ban import Ban
+from event_log import EventType, Level
 from game import GameModel
+from montecarlo import HintEngine
+from profiler import Profiler
+from pygame_text import FontRegistry, TextCache
 from values import Cell, Position, StoneColor
 
 #: 石の色
@@ -12,124 +18,320 @@ _STONE_COLORS = {
     StoneColor.Blue: (0, 0, 200),
     StoneColor.Yellow: (200, 200, 0),
 }
+#: 背景色
+_BACK_GROUND_COLOR = (255, 255, 200)
+#: 石の半径
+_STONE_RADIUS = 15
+#: ヒントの枠の色
+_HINT_COLOR = (255, 255, 255)
+#: ヒントの枠の太さ
+_HINT_WIDTH = 3
+#: フォント名
+_FONT_NAME = "メイリオ"
+#: 計測結果の文字の大きさ
+_PERF_FONT_SIZE = 12
+#: 計測結果を描き直す間隔(秒)
+_PERF_INTERVAL = 0.5
+#: トレースの出力先
+_TRACE_PATH = 'sanmoku_trace.json'
 
 
 class ResultView:
-    """結果表示ビュー."""
+    """結果表示ビュー.
+
+    盤に重ねて描くので、GameView がゲームモードの変化時に画面全体を描き直すときだけ描画する.
+    """
 
-    def __init__(self, model: GameModel, screen: pygame.Surface):
+    def __init__(self, model: GameModel, screen: pygame.Surface, text_cache: TextCache):
         self._model = model
         self._screen = screen
+        self._text_cache = text_cache
 
     def draw(self) -> None:
         """描画."""
+        render = self._text_cache.render
         if self._model.is_waitstart():
-            font = pygame.font.SysFont("メイリオ", 40)
             mes = "Press MouseLeft to Start"
-            text = font.render(mes, True, (0, 0, 0))
+            text = render(mes, _FONT_NAME, 40, (0, 0, 0))
             self._screen.blit(text, [37, 172])
-            text = font.render(mes, True, (255, 255, 255))
+            text = render(mes, _FONT_NAME, 40, (255, 255, 255))
             self._screen.blit(text, [35, 170])
         elif self._model.is_gameover():
-            font = pygame.font.SysFont("メイリオ", 80)
             mes = "GameOver !"
-            text = font.render(mes, True, (0, 0, 0))
+            text = render(mes, _FONT_NAME, 80, (0, 0, 0))
             self._screen.blit(text, [42, 152])
-            text = font.render(mes, True, (255, 0, 0))
+            text = render(mes, _FONT_NAME, 80, (255, 0, 0))
             self._screen.blit(text, [40, 150])
         elif self._model.is_success():
-            font = pygame.font.SysFont("メイリオ", 80)
             mes = "Success !"
-            text = font.render(mes, True, (0, 0, 0))
+            text = render(mes, _FONT_NAME, 80, (0, 0, 0))
             self._screen.blit(text, [87, 152])
-            text = font.render(mes, True, (0, 255, 255))
+            text = render(mes, _FONT_NAME, 80, (0, 255, 255))
             self._screen.blit(text, [85, 150])
 
 
 class TimerView:
-    """経過時間ビュー."""
+    """経過時間ビュー.
+
+    表示する秒数が変わったときだけ描き直す.
+    """
 
-    def __init__(self, model: GameModel, screen: pygame.Surface):
+    #: 描画領域
+    RECT = pygame.Rect(430, 240, 170, 50)
+
+    def __init__(self, model: GameModel, screen: pygame.Surface, text_cache: TextCache):
         self._model = model
         self._screen = screen
-        self._font = pygame.font.SysFont("メイリオ", 40)
+        self._text_cache = text_cache
+        self._drawn_sec: tp.Optional[int] = None
 
-    def draw(self) -> None:
-        """描画."""
+    def invalidate(self) -> None:
+        """次の描画で必ず描き直す."""
+        self._drawn_sec = None
+
+    def draw(self) -> tp.List[pygame.Rect]:
+        """描画.
+
+        :return: 描き直した領域
+        """
+        sec = self._model.time_sec
+        if sec == self._drawn_sec:
+            return []
+        self._drawn_sec = sec
+        self._screen.fill(_BACK_GROUND_COLOR, TimerView.RECT)
 
         # テキスト
-        text = self._font.render(f'Time:{self._model.time_sec}', True, (0, 0, 0))
+        text = self._text_cache.render(f'Time:{sec}', _FONT_NAME, 40, (0, 0, 0))
         self._screen.blit(text, [440, 250])
+        return [TimerView.RECT]
 
 
 class NextStoneView:
-    """次の石ビュー."""
+    """次の石ビュー.
+
+    次の石が変わったときだけ描き直す.
+    """
 
-    def __init__(self, model: GameModel, screen: pygame.Surface):
+    #: 描画領域
+    RECT = pygame.Rect(430, 60, 170, 60)
+
+    def __init__(self, model: GameModel, screen: pygame.Surface, text_cache: TextCache):
         self._model = model
         self._screen = screen
-        self._font = pygame.font.SysFont("メイリオ", 40)
+        self._text_cache = text_cache
+        self._drawn_stone: tp.Optional[StoneColor] = None
+
+    def invalidate(self) -> None:
+        """次の描画で必ず描き直す."""
+        self._drawn_stone = None
+
+    def draw(self) -> tp.List[pygame.Rect]:
+        """描画.
+
+        :return: 描き直した領域
+        """
+        stone = self._model.next_stone
+        if stone == self._drawn_stone:
+            return []
+        self._drawn_stone = stone
+        self._screen.fill(_BACK_GROUND_COLOR, NextStoneView.RECT)
 
-    def draw(self) -> None:
-        """描画."""
         # テキスト
-        text = self._font.render("Next", True, (0, 0, 0))
+        text = self._text_cache.render("Next", _FONT_NAME, 40, (0, 0, 0))
         self._screen.blit(text, [440, 80])
 
         # 石
-        radius = 15
+        radius = _STONE_RADIUS
         pos = (530, 77 + radius)
-        pygame.draw.circle(self._screen, _STONE_COLORS[self._model.next_stone], pos, radius, width=0)  # type: ignore
+        pygame.draw.circle(self._screen, _STONE_COLORS[stone], pos, radius, width=0)  # type: ignore
+        return [NextStoneView.RECT]
+
+
+class PerfOverlayView:
+    """計測結果の表示.
+
+    区間ごとの処理時間の中央値と99パーセンタイル(ミリ秒)を右下に小さく描く.
+    描き直すのは _PERF_INTERVAL ごとだけ. 計測を切ったときは1度だけ消す.
+    """
+
+    #: 描画領域
+    RECT = pygame.Rect(405, 292, 195, 108)
+
+    def __init__(self, profiler: Profiler, screen: pygame.Surface, text_cache: TextCache):
+        self._profiler = profiler
+        self._screen = screen
+        self._text_cache = text_cache
+        self._drawn_time: tp.Optional[float] = None
+
+    def invalidate(self) -> None:
+        """次の描画で必ず描き直す."""
+        self._drawn_time = None
+
+    def draw(self) -> tp.List[pygame.Rect]:
+        """描画.
+
+        :return: 描き直した領域
+        """
+        if not self._profiler.enabled:
+            if self._drawn_time is None:
+                return []
+            self._drawn_time = None
+            self._screen.fill(_BACK_GROUND_COLOR, PerfOverlayView.RECT)
+            return [PerfOverlayView.RECT]
+
+        now = self._profiler.clock()
+        if self._drawn_time is not None and now - self._drawn_time < _PERF_INTERVAL:
+            return []
+        self._drawn_time = now
+        self._screen.fill(_BACK_GROUND_COLOR, PerfOverlayView.RECT)
+        (x, y) = PerfOverlayView.RECT.topleft
+        for stats in self._profiler.stats():
+            line = f'{stats.name} {stats.p50 * 1000:.2f}/{stats.p99 * 1000:.2f}'
+            text = self._text_cache.render(line, _FONT_NAME, _PERF_FONT_SIZE, (0, 0, 0))
+            self._screen.blit(text, [x, y])
+            y += _PERF_FONT_SIZE
+            if y + _PERF_FONT_SIZE > PerfOverlayView.RECT.bottom:
+                break
+        return [PerfOverlayView.RECT]
 
 
 class BanView:
-    """盤用ビュー."""
+    """盤用ビュー.
+
+    土台とマスの枠は最初に別のサーフェスへ描いておき、石が変わったマスだけを
+    描き直す. 盤面の変化は Ban.zobrist_key で調べる.
+    """
 
     def __init__(self, ban: Ban, screen: pygame.Surface):
         if ban is None:
             raise ValueError()
         self._ban = ban
         self._screen = screen
+        self._layout = ban.layout
 
-    def draw(self) -> None:
-        """描画."""
-        margin = self._ban.margin
-        cell_size = (self._ban.size - margin * 2) / self._ban.cell_num
+        self._rect = pygame.Rect(0, 0, self._ban.size, self._ban.size)
+        self._base = self._render_base()
+        self._cell_rects: tp.Dict[tp.Tuple[int, int], pygame.Rect] = {}
+        self._drawn: tp.List[tp.List[int]] = []
+        self._drawn_key = 0
+        self._hint: tp.Optional[tp.Tuple[int, int]] = None
+        self._drawn_hint: tp.Optional[tp.Tuple[int, int]] = None
+
+    def _render_base(self) -> pygame.Surface:
+        """土台とマスの枠を描いたサーフェスを作る."""
+        base = pygame.Surface(self._rect.size)
 
         # 土台
-        rect = pygame.Rect(0, 0, self._ban.size, self._ban.size)
-        pygame.draw.rect(self._screen, (200, 100, 0), rect)
+        pygame.draw.rect(base, (200, 100, 0), self._rect)
 
         # マスの枠
         line_color = (0, 0, 0)
-        for x in range(self._ban.cell_num + 1):
-            start_pos = (x * cell_size + margin, 0 + margin)
-            end_pos = (x * cell_size + margin, self._ban.size - margin)
-            pygame.draw.line(self._screen, line_color, start_pos, end_pos, width=2)
-        for y in range(self._ban.cell_num + 1):
-            start_pos = (margin, y * cell_size + margin)
-            end_pos = (self._ban.size - margin, y * cell_size + margin)
-            pygame.draw.line(self._screen, line_color, start_pos, end_pos, width=2)
+        for (start_pos, end_pos) in self._layout.lines:
+            pygame.draw.line(base, line_color, start_pos, end_pos, width=2)
+        return base
+
+    def invalidate(self) -> None:
+        """次の描画で盤全体を描き直す."""
+        self._drawn = []
+
+    def set_hint(self, cell: tp.Optional[Cell]) -> None:
+        """ヒントのマスを枠で示す. Noneなら消す."""
+        self._hint = cell.get() if cell is not None else None
+
+    def draw(self) -> tp.List[pygame.Rect]:
+        """描画.
+
+        :return: 描き直した領域
+        """
+        if self._drawn and self._drawn_key == self._ban.zobrist_key and self._drawn_hint == self._hint:
+            return []
+        cells = self._ban.to_list()
+
+        if not self._drawn:
+            self._screen.blit(self._base, self._rect)
+            for row, colors in enumerate(cells):
+                for column, color in enumerate(colors):
+                    if color != 0:
+                        self._draw_stone(row, column, color)
+            if self._hint is not None:
+                self._draw_hint(*self._hint)
+            rects = [self._rect]
+        else:
+            changed = set()
+            for row, (colors, drawn_colors) in enumerate(zip(cells, self._drawn)):
+                for column, (color, drawn) in enumerate(zip(colors, drawn_colors)):
+                    if color != drawn:
+                        changed.add((row, column))
+            if self._drawn_hint != self._hint:
+                changed.update(cell for cell in (self._drawn_hint, self._hint) if cell is not None)
+            rects = []
+            for (row, column) in changed:
+                rect = self._cell_rect(row, column)
+                self._screen.blit(self._base, rect, rect)
+                color = cells[row][column]
+                if color != 0:
+                    self._draw_stone(row, column, color)
+                if (row, column) == self._hint:
+                    self._draw_hint(row, column)
+                rects.append(rect)
+
+        self._drawn = cells
+        self._drawn_key = self._ban.zobrist_key
+        self._drawn_hint = self._hint
+        return rects
+
+    def _cell_rect(self, row: int, column: int) -> pygame.Rect:
+        """マスと、そこに置く石を含む領域. 1度求めたものは覚えておく."""
+        rect = self._cell_rects.get((row, column))
+        if rect is not None:
+            return rect
+        pitch = self._layout.pitch
+        margin = self._ban.margin
+        cell_rect = pygame.Rect(
+            int(column * pitch + margin), int(row * pitch + margin), int(pitch) + 1, int(pitch) + 1)
+        (x, y) = self._layout.center(row, column)
+        stone_rect = pygame.Rect(
+            int(x) - _STONE_RADIUS - 1, int(y) - _STONE_RADIUS - 1,
+            _STONE_RADIUS * 2 + 3, _STONE_RADIUS * 2 + 3)
+        rect = cell_rect.union(stone_rect).clip(self._rect)
+        self._cell_rects[(row, column)] = rect
+        return rect
 
-        # 石
-        for row in range(self._ban.cell_num):
-            for column in range(self._ban.cell_num):
-                color = self._ban.get(Cell(row, column))
-                if color == 0:
-                    continue
-                offset = margin + cell_size / 2
-                pos = (column * cell_size + offset, row * cell_size + offset)
-                radius = 15
-                pygame.draw.circle(self._screen, _STONE_COLORS[color], pos, radius, width=0)  # type: ignore
+    def _draw_stone(self, row: int, column: int, color: int) -> None:
+        pos = self._layout.center(row, column)
+        pygame.draw.circle(self._screen, _STONE_COLORS[color], pos, _STONE_RADIUS, width=0)  # type: ignore
+
+    def _draw_hint(self, row: int, column: int) -> None:
+        pos = self._layout.center(row, column)
+        pygame.draw.circle(self._screen, _HINT_COLOR, pos, _STONE_RADIUS, width=_HINT_WIDTH)  # type: ignore
 
 
 class GameView:
-    """PyGame用ビュー."""
+    """PyGame用ビュー.
+
+    hint を渡すと、ゲーム中に H キーで次の石を置くマスのヒントを示す.
+    ヒントは毎フレーム少しずつ受け取り、石を置くと消す.
+
+    profiler を渡すと、モデルの更新・操作、各ビューの描画、画面への反映を計測する区間として
+    登録する. P キーで計測と計測結果の表示を切り替え、T キーでトレースをファイルへ書く.
+
+    :param hint: ヒント
+    :param profiler: 計測
+    """
 
-    def __init__(self, model: GameModel, scr_w: int, scr_h: int):
+    def __init__(
+            self,
+            model: GameModel,
+            scr_w: int,
+            scr_h: int,
+            hint: tp.Optional[HintEngine] = None,
+            profiler: tp.Optional[Profiler] = None):
         if model is None:
             raise ValueError()
         self._model = model
+        self._hint = hint
+        self._profiler = profiler
+        self._hint_key: tp.Optional[int] = None
         self._scr_w = scr_w
         self._scr_h = scr_h
         self._ban = model.ban
@@ -138,23 +340,97 @@ class GameView:
         self._screen: pygame.Surface = pygame.display.set_mode((scr_w, scr_h))  # type: ignore
         pygame.display.set_caption("Sanmoku")
 
+        self._fonts = FontRegistry()
+        self._text_cache = TextCache(self._fonts)
+
         self._ban_view = BanView(self._ban, self._screen)
-        self._next_stone_view = NextStoneView(model, self._screen)
-        self._timer_view = TimerView(model, self._screen)
-        self._result_view = ResultView(model, self._screen)
+        self._next_stone_view = NextStoneView(model, self._screen, self._text_cache)
+        self._timer_view = TimerView(model, self._screen, self._text_cache)
+        self._result_view = ResultView(model, self._screen, self._text_cache)
+        self._perf_view: tp.Optional[PerfOverlayView] = None
+        self._drawn_mode: tp.Optional[tp.Tuple[bool, bool, bool]] = None
+        if profiler is not None:
+            self._perf_view = PerfOverlayView(profiler, self._screen, self._text_cache)
+            profiler.attach(model, 'update', 'GameModel.update')
+            profiler.attach(model, 'operate', 'GameModel.operate')
+            for view in (self._ban_view, self._timer_view, self._next_stone_view, self._result_view):
+                profiler.attach(view, 'draw')
+            profiler.attach(self, '_flush', 'display.flush')
+
+    @property
+    def text_cache(self) -> TextCache:
+        """文字描画のキャッシュ."""
+        return self._text_cache
 
     def update(self) -> bool:
+        """入力を処理してから描画する.
+
+        :return: 終了時はFalse
+        """
+        if not self._process_event():
+            return False
+        self._update_hint()
         self._draw()
-        return self._process_event()
+        return True
+
+    @property
+    def hint_pending(self) -> bool:
+        """ヒントを考えている途中か."""
+        return self._hint is not None and self._hint.pending
+
+    @staticmethod
+    def wait(sec: float) -> None:
+        """入力が来るか指定秒が経つまで待つ.
+
+        受け取ったイベントは次のフレームで処理できるようにキューへ戻す.
+
+        :param sec: 最長の待ち時間(秒)
+        """
+        timeout = int(sec * 1000)
+        if timeout <= 0:
+            return
+        event = pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            pygame.event.post(event)
 
     def _draw(self) -> None:
-        """描画."""
-        self._screen.fill((255, 255, 200))
-        self._ban_view.draw()
-        self._next_stone_view.draw()
-        self._timer_view.draw()
-        self._result_view.draw()
-        pygame.display.update()
+        """描画.
+
+        ゲームモードが変わったときは結果表示が盤に重なるので画面全体を描き直す.
+        それ以外は変化した領域だけを描いて画面へ送る.
+        """
+        mode = (self._model.is_waitstart(), self._model.is_gameover(), self._model.is_success())
+        if mode != self._drawn_mode:
+            self._drawn_mode = mode
+            self._screen.fill(_BACK_GROUND_COLOR)
+            self._ban_view.invalidate()
+            self._next_stone_view.invalidate()
+            self._timer_view.invalidate()
+            self._ban_view.draw()
+            self._next_stone_view.draw()
+            self._timer_view.draw()
+            self._result_view.draw()
+            if self._perf_view is not None:
+                self._perf_view.invalidate()
+                self._perf_view.draw()
+            self._flush(None)
+            return
+
+        rects = self._ban_view.draw()
+        rects += self._next_stone_view.draw()
+        rects += self._timer_view.draw()
+        if self._perf_view is not None:
+            rects += self._perf_view.draw()
+        if rects:
+            self._flush(rects)
+
+    @staticmethod
+    def _flush(rects: tp.Optional[tp.List[pygame.Rect]]) -> None:
+        """描いた領域を画面へ送る. Noneなら画面全体."""
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
 
     def _process_event(self) -> bool:
         """イベント処理."""
@@ -162,6 +438,9 @@ class GameView:
             if self._model.enable_control():
                 self._process_mouse_event()
 
+            if event.type == pygame.KEYDOWN:
+                self._process_key_event(event.key)
+
             # 終了イベント
             if event.type == pygame.QUIT:
                 pygame.quit()  # pygameのウィンドウを閉じる
@@ -169,6 +448,35 @@ class GameView:
 
         return True
 
+    def _process_key_event(self, key: int) -> None:
+        """キーイベントの処理."""
+        if key == pygame.K_h:
+            self._request_hint()
+        elif key == pygame.K_p and self._profiler is not None:
+            self._profiler.toggle()
+        elif key == pygame.K_t and self._profiler is not None:
+            num = self._profiler.dump_trace(_TRACE_PATH)
+            self._model.log.emit(Level.Info, EventType.TraceDumped, events=num, path=_TRACE_PATH)
+
+    def _request_hint(self) -> None:
+        """ヒントを考え始める."""
+        if self._hint is None or not self._model.enable_control() or self._model.is_waitstart():
+            return
+        self._hint.request(self._ban, self._model.next_stone)
+        self._hint_key = self._ban.zobrist_key
+
+    def _update_hint(self) -> None:
+        """ヒントを受け取る. 求めたときから盤面が変わっていれば捨てる."""
+        if self._hint is None or self._hint_key is None:
+            return
+        if self._hint_key != self._ban.zobrist_key or not self._model.enable_control():
+            self._hint.cancel()
+            self._hint_key = None
+            self._ban_view.set_hint(None)
+            return
+        if self._hint.pending:
+            self._ban_view.set_hint(self._hint.poll())
+
     def _process_mouse_event(self):
         """マウスイベントの処理."""
         (btn1, btn2, btn3) = pygame.mouse.get_pressed()  # type: ignore
@@ -1,5 +1,4 @@
 """三目不並：アプリケーション（PyScript版）."""
-import asyncio
 
 from js import (
     console,
@@ -8,12 +7,16 @@ from js import (
 )
 from pyodide import create_proxy
 
+from event_log import EventLog, Level, StdoutSink
 from game import GameModel
+from montecarlo import HintEngine
+from profiler import Profiler
 from pyscript_controller import GameController
 from pyscript_view import GameView
+from scheduler import FrameScheduler
 
 
-#: ゲームのFPS
+#: フレームの最短間隔(秒)
 _FPS = 1.0 / 30.0
 #: スクリーン幅
 _SCR_W = 600
@@ -27,6 +30,8 @@ _BAN_CELL_NUM = 9
 _BAN_MARGIN = 10
 #: 失敗判定となる数
 _BAN_FAIL_NUM = 3
+#: ヒントの予算(秒). フレームごとに少しずつ使う
+_HINT_BUDGET = 0.3
 
 
 async def main() -> None:
@@ -38,18 +43,35 @@ async def main() -> None:
         return
 
     try:
-        model = GameModel(_BAN_SIZE, _BAN_CELL_NUM, _BAN_MARGIN, _BAN_FAIL_NUM)
+        model = GameModel(
+            _BAN_SIZE, _BAN_CELL_NUM, _BAN_MARGIN, _BAN_FAIL_NUM,
+            log=EventLog(Level.Info, [StdoutSink()]))
         controller = GameController(model)
-        view = GameView(model, canvas, controller)
+        profiler = Profiler()
+        view = GameView(model, canvas, controller, profiler, HintEngine(_HINT_BUDGET))
 
     except ValueError as e:
         console.error(f'Failed to create GameObjects:{e}')
         return
 
-    while True:
-        model.update(_FPS)
-        view.draw()
-        await asyncio.sleep(_FPS)
+    scheduler = FrameScheduler(model.next_update_sec, min_interval=_FPS)
+    # 入力で表示が変わりうるので、眠っているループを起こす
+    wake = create_proxy(lambda event: scheduler.wake())
+    canvas.addEventListener('mousedown', wake)
+    canvas.addEventListener('mouseup', wake)
+    document.addEventListener('keydown', wake)
+    document.addEventListener('keyup', wake)
+
+    def step(delta: float) -> bool:
+        with profiler.section('frame'):
+            model.update(delta)
+            view.draw()
+        # ヒントを考える間は次のフレームもすぐに回す
+        if view.hint_pending:
+            scheduler.request_frame()
+        return True
+
+    await scheduler.run_async(step)
 
 
 if __name__ == '__main__':
@@ -9,6 +9,7 @@ from js import (
     KeyboardEvent,
 )
 
+from event_log import EventType, Level
 from game import GameModel
 from values import Position
 from input import VirtualKey, InputState, OperationParam
@@ -92,11 +93,11 @@ class GameController:
     """ゲームのコントローラー."""
 
     def __init__(self, model: GameModel) -> None:
-        print('[GameController] Create')
-
         if model is None:
             raise ValueError('model is None')
         self._model = model
+        if model.log.enabled(Level.Info):
+            model.log.emit(Level.Info, EventType.Created, name='GameController')
 
     def mousedown(self, event: MouseEvent) -> None:
         """マウスボタンが押された."""
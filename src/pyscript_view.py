@@ -1,17 +1,40 @@
-"""ゲームビュー(pyscript)."""
-import math
+"""ゲームビュー(pyscript).
+
+描画は3枚のオフスクリーンキャンバスに分けて行う.
+
++ 土台: 背景、盤、マスの枠. 最初に1度だけ描く
++ 石: 盤面が変わったときに、変わったマスだけを描き直す
++ HUD: 経過時間・次の石・結果表示. 表示内容が変わったときだけ描き直す
+
+ヒント(hint)を渡したときは、H キーで考え始め、毎フレーム少しずつ考えて、
+出たヒントのマスを石のキャンバスに枠で示す.
+
+計測(profiler)を渡したときは、計測結果を描く4枚目のキャンバスを使う.
+
+毎フレームの画面への描画は、いずれかが変わったときに drawImage を3回呼ぶだけになる.
+各ビューは CanvasRenderingContext2D を直接呼ばずに DrawCommandBuffer へ記録し、
+GameView が1フレームに1回だけJS側の実行関数へ渡す.
+"""
+import typing as tp
+from array import array
 
 from js import (
+    Blob,
+    Object,
+    URL,
     console,
     document,
+    window,
     Element,
-    CanvasRenderingContext2D,
 )
-from pyodide import create_proxy
+from pyodide import create_proxy, to_js
 
+from draw_commands import DrawCommandBuffer, EXECUTOR_JS
 from pyscript_controller import GameController
 from game import GameModel
 from ban import Ban
+from montecarlo import HintEngine
+from profiler import Profiler
 from values import Cell, StoneColor
 
 #: 石の色
@@ -22,154 +45,295 @@ _STONE_COLORS = {
     StoneColor.Yellow: 'rgb(200, 200, 0)',
 }
 
-#: arc開始角度
-_ANGLE_START = 0 * math.pi / 180
-#: arc終了角度
-_ANGLE_END = 360 * math.pi / 180
-
 #: 石の半径
 _STONE_RADIUS = 15
+#: マスの枠の色
+_LINE_COLOR = 'rgb(0, 0, 0)'
+#: ヒントの枠の色
+_HINT_COLOR = 'rgb(255, 255, 255)'
+#: ヒントの枠の太さ
+_HINT_WIDTH = 2
+#: マスの枠の太さ
+_LINE_WIDTH = 2
+#: 計測結果の文字の大きさ
+_PERF_FONT_SIZE = 12
+#: 計測結果を描き直す間隔(秒)
+_PERF_INTERVAL = 0.5
+#: 計測結果の描画位置(左, 上, 下)
+_PERF_AREA = (405, 292, 400)
+#: トレースのファイル名
+_TRACE_NAME = 'sanmoku_trace.json'
+
+
+class JsExecutor:
+    """描画コマンドをJS側で実行する."""
+
+    def __init__(self) -> None:
+        self._func = window.eval(EXECUTOR_JS)
+
+    def execute(self, buffer: array, strings: tp.List[str], objects: tp.List[tp.Any]) -> None:
+        self._func(to_js(buffer), to_js(strings), to_js(objects))
+
+
+class Layer:
+    """オフスクリーンのキャンバス.
+
+    :param buffer: 描画コマンドの記録先
+    :param width: 幅
+    :param height: 高さ
+    """
 
+    def __init__(self, buffer: DrawCommandBuffer, width: int, height: int) -> None:
+        self.canvas = document.createElement('canvas')
+        self.canvas.width = width
+        self.canvas.height = height
+        ctx = self.canvas.getContext('2d')
+        if ctx is None:
+            raise ValueError('ctx is None')
+        self._buffer = buffer
+        self._width = width
+        self._height = height
+        #: 描画先としての添字
+        self.target = buffer.add_object(ctx)
+        #: 画像としての添字
+        self.image = buffer.add_object(self.canvas)
+
+    def clear(self) -> None:
+        """全体を透明にする."""
+        self._buffer.target(self.target)
+        self._buffer.clear_rect(0, 0, self._width, self._height)
 
-def draw_line(ctx: CanvasRenderingContext2D, start_pos: tuple[int, int], end_pos: tuple[int, int]) -> None:
+
+def draw_line(buffer: DrawCommandBuffer, start_pos: tuple[int, int], end_pos: tuple[int, int]) -> None:
     """線の描画."""
-    ctx.beginPath()
-    ctx.moveTo(*start_pos)
-    ctx.lineTo(*end_pos)
-    ctx.stroke()
-    ctx.closePath()
+    buffer.line(start_pos, end_pos, _LINE_COLOR, _LINE_WIDTH)
 
 
-def draw_stone(ctx: CanvasRenderingContext2D, center: tuple[int, int], color: StoneColor) -> None:
+def draw_stone(buffer: DrawCommandBuffer, center: tuple[int, int], color: StoneColor) -> None:
     """石の描画."""
-    (x, y) = center
-    ctx.beginPath()
-    ctx.fillStyle = _STONE_COLORS[color]
-    ctx.arc(x, y, _STONE_RADIUS, _ANGLE_START, _ANGLE_END)
-    ctx.fill()
-    ctx.closePath()
+    buffer.circle(center, _STONE_RADIUS, _STONE_COLORS[color])
 
 
-def draw_text(ctx: CanvasRenderingContext2D, text: str, position: tuple[int, int], font: str, fill_style: str) -> None:
+def draw_text(buffer: DrawCommandBuffer, text: str, position: tuple[int, int], font: str, fill_style: str) -> None:
     """テキストの描画."""
-    (x, y) = position
-    text = text
-    ctx.font = font
-    ctx.fillStyle = fill_style
-    ctx.fillText(text, x, y)
+    buffer.text(text, position, font, fill_style)
+
+
+def download(name: str, text: str) -> None:
+    """テキストをファイルとしてダウンロードさせる."""
+    blob = Blob.new([text], to_js({'type': 'application/json'}, dict_converter=Object.fromEntries))
+    anchor = document.createElement('a')
+    anchor.href = URL.createObjectURL(blob)
+    anchor.download = name
+    anchor.click()
+    URL.revokeObjectURL(anchor.href)
+
+
+class PerfOverlayView:
+    """計測結果の表示.
+
+    区間ごとの処理時間の中央値と99パーセンタイル(ミリ秒)を右下に小さく描く.
+    描き直すのは _PERF_INTERVAL ごとだけ. 計測を切ったときは1度だけ消す.
+    """
+
+    def __init__(self, profiler: Profiler, layer: Layer, buffer: DrawCommandBuffer):
+        self._profiler = profiler
+        self._layer = layer
+        self._buffer = buffer
+        self._drawn_time: tp.Optional[float] = None
+
+    def draw(self) -> bool:
+        """描画.
+
+        :return: 描き直したらTrue
+        """
+        if not self._profiler.enabled:
+            if self._drawn_time is None:
+                return False
+            self._drawn_time = None
+            self._layer.clear()
+            return True
+
+        now = self._profiler.clock()
+        if self._drawn_time is not None and now - self._drawn_time < _PERF_INTERVAL:
+            return False
+        self._drawn_time = now
+        self._layer.clear()
+        self._buffer.target(self._layer.target)
+        (x, y, bottom) = _PERF_AREA
+        font = f'{_PERF_FONT_SIZE}px sans-serif'
+        for stats in self._profiler.stats():
+            y += _PERF_FONT_SIZE
+            if y > bottom:
+                break
+            line = f'{stats.name} {stats.p50 * 1000:.2f}/{stats.p99 * 1000:.2f}'
+            draw_text(self._buffer, line, position=(x, y), font=font, fill_style='rgb(0, 0, 0)')
+        return True
 
 
 class ResultView:
     """結果表示ビュー."""
 
-    def __init__(self, model: GameModel, ctx: CanvasRenderingContext2D):
+    def __init__(self, model: GameModel, layer: Layer, buffer: DrawCommandBuffer):
         self._model = model
-        self._ctx = ctx
+        self._layer = layer
+        self._buffer = buffer
 
     def draw(self) -> None:
         """描画."""
+        self._buffer.target(self._layer.target)
         if self._model.is_waitstart():
             text = 'Press MouseLeft to Start'
             font = '28px bold sans-serif'
-            draw_text(self._ctx,
+            draw_text(self._buffer,
                       text, position=(37, 182), font=font, fill_style='rgb(0, 0, 0)')
-            draw_text(self._ctx,
+            draw_text(self._buffer,
                       text, position=(35, 180), font=font, fill_style='rgb(255, 255, 255)')
         elif self._model.is_gameover():
             text = 'GameOver !'
             font = '60px bold sans-serif'
-            draw_text(self._ctx,
+            draw_text(self._buffer,
                       text, position=(37, 202), font=font, fill_style='rgb(0, 0, 0)')
-            draw_text(self._ctx,
+            draw_text(self._buffer,
                       text, position=(35, 200), font=font, fill_style='rgb(255, 0, 0)')
         elif self._model.is_success():
             text = 'Success !'
             font = '60px bold sans-serif'
-            draw_text(self._ctx,
+            draw_text(self._buffer,
                       text, position=(57, 202), font=font, fill_style='rgb(0, 0, 0)')
-            draw_text(self._ctx,
+            draw_text(self._buffer,
                       text, position=(55, 200), font=font, fill_style='rgb(0, 255, 255)')
 
 
 class NextStoneView:
     """次の石ビュー."""
 
-    def __init__(self, model: GameModel, ctx: CanvasRenderingContext2D):
+    def __init__(self, model: GameModel, layer: Layer, buffer: DrawCommandBuffer):
         self._model = model
-        self._ctx = ctx
+        self._layer = layer
+        self._buffer = buffer
 
     def draw(self) -> None:
         """描画."""
+        self._buffer.target(self._layer.target)
 
         # テキスト
-        draw_text(self._ctx,
+        draw_text(self._buffer,
                   'Next', position=(440, 80), font='30px bold sans-serif', fill_style="rgb(0, 0, 0)")
 
         # 石
         center = (535, 70)
-        draw_stone(self._ctx, center, self._model.next_stone)
+        draw_stone(self._buffer, center, self._model.next_stone)
 
 
 class TimerView:
     """経過時間ビュー."""
 
-    def __init__(self, model: GameModel, ctx: CanvasRenderingContext2D):
+    def __init__(self, model: GameModel, layer: Layer, buffer: DrawCommandBuffer):
         self._model = model
-        self._ctx = ctx
+        self._layer = layer
+        self._buffer = buffer
 
     def draw(self) -> None:
         """描画."""
-        draw_text(self._ctx,
+        self._buffer.target(self._layer.target)
+        draw_text(self._buffer,
                   f'Time:{self._model.time_sec}', position=(440, 250), font="30px bold sans-serif", fill_style="rgb(0, 0, 0)")
 
 
 class BanView:
-    """盤用ビュー."""
+    """盤用ビュー.
 
-    def __init__(self, ban: Ban, ctx: CanvasRenderingContext2D):
+    土台は draw_base で1度だけ描き、石は盤面が変わったときに変わったマスだけを
+    石のレイヤーへ描き直す. 盤面の変化は Ban.zobrist_key で調べる.
+    ヒントのマスは石のレイヤーに枠で示す.
+    """
+
+    def __init__(self, ban: Ban, base_layer: Layer, stone_layer: Layer, buffer: DrawCommandBuffer):
         if ban is None:
             raise ValueError()
         self._ban = ban
-        self._ctx = ctx
-
-    def draw(self) -> None:
-        """描画."""
-        margin = self._ban.margin
-        cell_size = (self._ban.size - margin * 2) / self._ban.cell_num
+        self._base_layer = base_layer
+        self._stone_layer = stone_layer
+        self._buffer = buffer
+        self._layout = ban.layout
+        self._drawn: tp.List[tp.List[int]] = [[0] * ban.cell_num for _ in range(ban.cell_num)]
+        self._drawn_key = 0
+        self._hint: tp.Optional[tp.Tuple[int, int]] = None
+        self._drawn_hint: tp.Optional[tp.Tuple[int, int]] = None
+
+    def set_hint(self, cell: tp.Optional[Cell]) -> None:
+        """ヒントのマスを枠で示す. Noneなら消す."""
+        self._hint = cell.get() if cell is not None else None
+
+    def draw_base(self) -> None:
+        """土台とマスの枠を描画."""
+        self._buffer.target(self._base_layer.target)
 
         # 土台
-        self._ctx.fillStyle = "rgb(200, 100, 0)"
-        self._ctx.fillRect(0, 0, self._ban.size, self._ban.size)
+        self._buffer.fill_rect(0, 0, self._ban.size, self._ban.size, "rgb(200, 100, 0)")
 
         # マスの枠
-        self._ctx.strokeStyle = "rgb(0, 0, 0)"
-        self._ctx.lineWidth = 2
-        for x in range(self._ban.cell_num + 1):
-            start_pos = (x * cell_size + margin, 0 + margin)
-            end_pos = (x * cell_size + margin, self._ban.size - margin)
-            draw_line(self._ctx, start_pos, end_pos)
-        for y in range(self._ban.cell_num + 1):
-            start_pos = (margin, y * cell_size + margin)
-            end_pos = (self._ban.size - margin, y * cell_size + margin)
-            draw_line(self._ctx, start_pos, end_pos)
-            
-        # 石
-        for row in range(self._ban.cell_num):
-            for column in range(self._ban.cell_num):
-                color = self._ban.get(Cell(row, column))
-                if color == 0:
+        for (start_pos, end_pos) in self._layout.lines:
+            draw_line(self._buffer, start_pos, end_pos)
+
+    def draw(self) -> bool:
+        """石を描画.
+
+        :return: 描き直したらTrue
+        """
+        if self._drawn_key == self._ban.zobrist_key and self._drawn_hint == self._hint:
+            return False
+
+        self._buffer.target(self._stone_layer.target)
+        layout = self._layout
+        cells = self._ban.to_list()
+        hint_cells = {cell for cell in (self._drawn_hint, self._hint) if cell is not None}
+        if self._drawn_hint == self._hint:
+            hint_cells.clear()
+        for row, (colors, drawn_colors) in enumerate(zip(cells, self._drawn)):
+            for column, (color, drawn) in enumerate(zip(colors, drawn_colors)):
+                if color == drawn and (row, column) not in hint_cells:
                     continue
-                offset = margin + cell_size / 2
-                center = (column * cell_size + offset, row * cell_size + offset)
-                draw_stone(self._ctx, center, color)
+                center = layout.center(row, column)
+                if drawn != 0 or (row, column) == self._drawn_hint:
+                    (x, y) = center
+                    size = _STONE_RADIUS * 2 + 2
+                    self._buffer.clear_rect(x - _STONE_RADIUS - 1, y - _STONE_RADIUS - 1, size, size)
+                if color != 0:
+                    draw_stone(self._buffer, center, color)
+                if (row, column) == self._hint:
+                    self._draw_hint(center)
+
+        self._drawn = cells
+        self._drawn_key = self._ban.zobrist_key
+        self._drawn_hint = self._hint
+        return True
+
+    def _draw_hint(self, center: tp.Tuple[float, float]) -> None:
+        """石の大きさの四角い枠を描く."""
+        (x, y) = center
+        r = _STONE_RADIUS
+        corners = ((x - r, y - r), (x + r, y - r), (x + r, y + r), (x - r, y + r))
+        for (start, end) in zip(corners, corners[1:] + corners[:1]):
+            self._buffer.line(start, end, _HINT_COLOR, _HINT_WIDTH)
 
 
 class GameView:
     """ゲームのビュー.
 
+    profiler を渡すと、モデルの更新・操作、各ビューの描画、JSへの描画コマンドの受け渡しを
+    計測する区間として登録する. P キーで計測と計測結果の表示を切り替え、T キーで
+    トレースをダウンロードする.
+
+    hint を渡すと、ゲーム中に H キーで次の石を置くマスのヒントを示す. ワーカーを使えないので、
+    ヒントは executor なしで作り、フレームごとの poll で少しずつ考える. 石を置くと消す.
+
     :param model: ゲームモデル
     :param canvas: 描画先のCanvas
     :param controller: コントローラー
+    :param profiler: 計測
+    :param hint: ヒント
     """
 
     #: 背景色
@@ -185,15 +349,29 @@ class GameView:
             self,
             model: GameModel,
             canvas: Element,
-            controller: GameController) -> None:
+            controller: GameController,
+            profiler: tp.Optional[Profiler] = None,
+            hint: tp.Optional[HintEngine] = None) -> None:
         console.log('[GameView] Create')
 
         if model is None:
             raise ValueError('model is None')
         self._model = model
+        self._profiler = profiler
+        self._hint = hint
+        self._hint_key: tp.Optional[int] = None
 
         self._setup_view(canvas)
         self._register_input_events(canvas, controller)
+        if profiler is not None:
+            self._setup_profiler(profiler)
+        if hint is not None:
+            document.addEventListener("keydown", create_proxy(self._on_hint_key))
+
+    @property
+    def hint_pending(self) -> bool:
+        """ヒントを考えている途中か."""
+        return self._hint is not None and self._hint.pending
 
     def _setup_view(self, canvas: Element) -> None:
         """ビューの初期化."""
@@ -202,14 +380,70 @@ class GameView:
         canvas.width = GameView.WIDTH
         canvas.height = GameView.HEIGHT
 
-        self._ctx = canvas.getContext('2d')
-        if self._ctx is None:
+        ctx = canvas.getContext('2d')
+        if ctx is None:
             raise ValueError('ctx is None')
 
-        self._ban = BanView(self._model.ban, self._ctx)
-        self._timer = TimerView(self._model, self._ctx)
-        self._next_stone = NextStoneView(self._model, self._ctx)
-        self._result = ResultView(self._model, self._ctx)
+        self._buffer = DrawCommandBuffer()
+        self._executor = JsExecutor()
+        self._target = self._buffer.add_object(ctx)
+        self._base_layer = Layer(self._buffer, GameView.WIDTH, GameView.HEIGHT)
+        self._stone_layer = Layer(self._buffer, GameView.WIDTH, GameView.HEIGHT)
+        self._hud_layer = Layer(self._buffer, GameView.WIDTH, GameView.HEIGHT)
+
+        self._ban = BanView(self._model.ban, self._base_layer, self._stone_layer, self._buffer)
+        self._timer = TimerView(self._model, self._hud_layer, self._buffer)
+        self._next_stone = NextStoneView(self._model, self._hud_layer, self._buffer)
+        self._result = ResultView(self._model, self._hud_layer, self._buffer)
+
+        self._buffer.target(self._base_layer.target)
+        self._buffer.fill_rect(0, 0, GameView.WIDTH, GameView.HEIGHT, GameView.BACK_GROUND_COLOR)
+        self._ban.draw_base()
+        self._drawn_hud: tp.Optional[tuple] = None
+
+    def _setup_profiler(self, profiler: Profiler) -> None:
+        """計測する区間と、計測結果の表示・切り替えキーを登録する."""
+        self._perf_layer = Layer(self._buffer, GameView.WIDTH, GameView.HEIGHT)
+        self._perf = PerfOverlayView(profiler, self._perf_layer, self._buffer)
+        profiler.attach(self._model, 'update', 'GameModel.update')
+        profiler.attach(self._model, 'operate', 'GameModel.operate')
+        for view in (self._ban, self._timer, self._next_stone, self._result):
+            profiler.attach(view, 'draw')
+        profiler.attach(self, '_flush', 'display.flush')
+        document.addEventListener("keydown", create_proxy(self._on_profiler_key))
+
+    def _on_profiler_key(self, event) -> None:
+        """P キーで計測を切り替え、T キーでトレースをダウンロードする."""
+        assert self._profiler is not None
+        key = event.key.lower()
+        if key == 'p':
+            self._profiler.toggle()
+        elif key == 't':
+            download(_TRACE_NAME, self._profiler.trace_json())
+
+    def _on_hint_key(self, event) -> None:
+        """H キーでヒントを考え始める."""
+        if event.key.lower() == 'h' and not event.repeat:
+            self._request_hint()
+
+    def _request_hint(self) -> None:
+        """ヒントを考え始める."""
+        if self._hint is None or not self._model.enable_control() or self._model.is_waitstart():
+            return
+        self._hint.request(self._model.ban, self._model.next_stone)
+        self._hint_key = self._model.ban.zobrist_key
+
+    def _update_hint(self) -> None:
+        """ヒントを少し考える. 求めたときから盤面が変わっていれば捨てる."""
+        if self._hint is None or self._hint_key is None:
+            return
+        if self._hint_key != self._model.ban.zobrist_key or not self._model.enable_control():
+            self._hint.cancel()
+            self._hint_key = None
+            self._ban.set_hint(None)
+            return
+        if self._hint.pending:
+            self._ban.set_hint(self._hint.poll())
 
     @staticmethod
     def _register_input_events(canvas: Element, controller: GameController) -> None:
@@ -223,14 +457,45 @@ class GameView:
         document.addEventListener("keyup", create_proxy(controller.keyup))
 
     def draw(self) -> None:
-        """描画."""
-        self._clear()
-        self._ban.draw()
+        """描画.
+
+        石・HUD・計測結果のどれかが変わったときだけ、レイヤーを画面に重ねる.
+        記録した描画コマンドはフレームの最後にまとめてJSへ渡す.
+        """
+        self._update_hint()
+        changed = self._ban.draw()
+        changed = self._draw_hud() or changed
+        if self._profiler is not None:
+            changed = self._perf.draw() or changed
+        if changed:
+            self._buffer.target(self._target)
+            self._buffer.draw_image(self._base_layer.image, 0, 0)
+            self._buffer.draw_image(self._stone_layer.image, 0, 0)
+            self._buffer.draw_image(self._hud_layer.image, 0, 0)
+            if self._profiler is not None and self._profiler.enabled:
+                self._buffer.draw_image(self._perf_layer.image, 0, 0)
+        self._flush()
+
+    def _flush(self) -> None:
+        """記録した描画コマンドをJSへ渡す."""
+        self._buffer.flush(self._executor)
+
+    def _draw_hud(self) -> bool:
+        """経過時間・次の石・結果表示のどれかが変わっていたらHUDを描き直す.
+
+        :return: 描き直したらTrue
+        """
+        hud = (
+            self._model.time_sec,
+            self._model.next_stone,
+            self._model.is_waitstart(),
+            self._model.is_gameover(),
+            self._model.is_success())
+        if hud == self._drawn_hud:
+            return False
+        self._drawn_hud = hud
+        self._hud_layer.clear()
         self._timer.draw()
         self._next_stone.draw()
         self._result.draw()
-
-    def _clear(self) -> None:
-        """画面をクリアする."""
-        self._ctx.fillStyle = GameView.BACK_GROUND_COLOR
-        self._ctx.fillRect(0, 0, GameView.WIDTH, GameView.HEIGHT)
+        return True
@@ -0,0 +1,247 @@
+"""ゲームの記録と再生.
+
+石を置くたびにマス・色・経過時間を固定長のバイナリで記録する.
+ファイルには複数のゲームを続けて並べ、末尾に各ゲームの位置の索引を置く.
+再生は mmap したファイルから必要な手だけを読み、入力イベントを経由せずに
+盤へ直接石を置いて n 手目まで進める.
+
+ファイルの構成(すべてリトルエンディアン)::
+
+    ヘッダー   : magic(4s) version(H) reserved(H)
+    ゲーム * N : cell_num(H) fail_num(B) result(B) move_num(I) 手(row*cell_num+column(H) color(B) ミリ秒(I)) * move_num
+    索引       : 各ゲームの開始位置(Q) * N
+    フッター   : 索引の開始位置(Q) ゲーム数(I) magic(4s)
+"""
+import mmap
+import struct
+import typing as tp
+from dataclasses import dataclass
+from enum import IntEnum
+
+from ban import Ban, BanBackend
+from values import Cell
+
+#: ファイル先頭の識別子
+_MAGIC = b'SMKR'
+#: ファイル末尾の識別子
+_INDEX_MAGIC = b'SMKI'
+#: 形式のバージョン
+_VERSION = 1
+#: 記録できる最大のマス数
+_MAX_CELL_NUM = 255
+#: 記録できる最大の失敗判定となる数(1バイト)
+_MAX_FAIL_NUM = 255
+#: 再生で作る盤の大きさ
+_BAN_SIZE = 400
+#: 再生で作る盤の余白
+_BAN_MARGIN = 10
+
+_FILE_HEADER = struct.Struct('<4sHH')
+_GAME_HEADER = struct.Struct('<HBBI')
+_MOVE = struct.Struct('<HBI')
+_OFFSET = struct.Struct('<Q')
+_FOOTER = struct.Struct('<QI4s')
+
+
+class GameResult(IntEnum):
+    """記録したゲームの結果."""
+    Playing = 0
+    Success = 1
+    GameOver = 2
+
+
+@dataclass(frozen=True)
+class Move:
+    """1手.
+
+    :param row: 行
+    :param column: 列
+    :param color: 石の色
+    :param sec: 置いたときの経過秒(ミリ秒精度)
+    """
+    row: int
+    column: int
+    color: int
+    sec: float
+
+
+class GameRecorder:
+    """1ゲームの手を記録する.
+
+    :param cell_num: 盤のマス数
+    :param fail_num: 失敗判定となる数
+    :raise ValueError: 記録できない大きさ
+    """
+
+    def __init__(self, cell_num: int, fail_num: int) -> None:
+        if not 0 < cell_num <= _MAX_CELL_NUM:
+            raise ValueError(f'cell_num must be 1..{_MAX_CELL_NUM}: {cell_num}')
+        if not 0 < fail_num <= _MAX_FAIL_NUM:
+            raise ValueError(f'fail_num must be 1..{_MAX_FAIL_NUM}: {fail_num}')
+        self._cell_num = cell_num
+        self._fail_num = fail_num
+        self._result = GameResult.Playing
+        self._moves = bytearray()
+
+    @property
+    def move_num(self) -> int:
+        return len(self._moves) // _MOVE.size
+
+    @property
+    def result(self) -> GameResult:
+        return self._result
+
+    def add(self, row: int, column: int, color: int, sec: float) -> None:
+        """1手を記録する."""
+        self._moves += _MOVE.pack(row * self._cell_num + column, color, round(sec * 1000))
+
+    def finish(self, result: GameResult) -> None:
+        """ゲームの結果を記録する."""
+        self._result = result
+
+    def to_bytes(self) -> bytes:
+        """ファイルに書くゲーム1つ分のバイト列."""
+        header = _GAME_HEADER.pack(self._cell_num, self._fail_num, self._result, self.move_num)
+        return header + self._moves
+
+
+class RecordWriter:
+    """複数のゲームを1つのファイルへ書く.
+
+    close で索引を書くまではファイルは読めない.
+
+    :param path: 出力先のファイル
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'wb')
+        self._file.write(_FILE_HEADER.pack(_MAGIC, _VERSION, 0))
+        self._offsets: tp.List[int] = []
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def write(self, recorder: GameRecorder) -> None:
+        """ゲームを1つ書く."""
+        self._offsets.append(self._file.tell())
+        self._file.write(recorder.to_bytes())
+
+    def close(self) -> None:
+        """索引を書いてファイルを閉じる."""
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        self._file.write(struct.pack(f'<{len(self._offsets)}Q', *self._offsets))
+        self._file.write(_FOOTER.pack(index_offset, len(self._offsets), _INDEX_MAGIC))
+        self._file.close()
+
+
+class RecordedGame:
+    """ファイル上の1ゲーム. 読むのは必要な手だけ.
+
+    :param buffer: ファイル全体
+    :param offset: ゲームの開始位置
+    """
+
+    def __init__(self, buffer: tp.Any, offset: int) -> None:
+        self._buffer = buffer
+        (self._cell_num, self._fail_num, result, self._move_num) = _GAME_HEADER.unpack_from(buffer, offset)
+        self._result = GameResult(result)
+        self._moves_offset = offset + _GAME_HEADER.size
+
+    @property
+    def cell_num(self) -> int:
+        return self._cell_num
+
+    @property
+    def fail_num(self) -> int:
+        return self._fail_num
+
+    @property
+    def result(self) -> GameResult:
+        return self._result
+
+    @property
+    def move_num(self) -> int:
+        return self._move_num
+
+    def move(self, n: int) -> Move:
+        """n 手目(0始まり)を得る."""
+        if not 0 <= n < self._move_num:
+            raise IndexError(f'move out of range: {n}')
+        (index, color, msec) = _MOVE.unpack_from(self._buffer, self._moves_offset + n * _MOVE.size)
+        (row, column) = divmod(index, self._cell_num)
+        return Move(row, column, color, msec / 1000)
+
+    def moves(self) -> tp.Iterator[Move]:
+        """全ての手を順に得る."""
+        return (self.move(n) for n in range(self._move_num))
+
+    def replay(self, n: tp.Optional[int] = None, backend: BanBackend = BanBackend.List) -> Ban:
+        """最初の n 手を置いた盤を得る.
+
+        :param n: 置く手の数. 省略時は最後まで
+        :param backend: 盤の保持方法
+        """
+        if n is None:
+            n = self._move_num
+        if not 0 <= n <= self._move_num:
+            raise IndexError(f'move out of range: {n}')
+        ban = Ban(_BAN_SIZE, self._cell_num, _BAN_MARGIN, self._fail_num, backend)
+        end = self._moves_offset + n * _MOVE.size
+        for (index, color, _) in _MOVE.iter_unpack(self._buffer[self._moves_offset:end]):
+            ban.put(Cell(*divmod(index, self._cell_num)), color)
+        return ban
+
+
+class RecordFile:
+    """記録ファイルを mmap して読む.
+
+    :param path: 記録ファイル
+    :raise ValueError: 記録ファイルでない
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, _) = _FILE_HEADER.unpack_from(self._mmap, 0)
+            (index_offset, game_num, index_magic) = _FOOTER.unpack_from(
+                self._mmap, len(self._mmap) - _FOOTER.size)
+        except struct.error as e:
+            self._mmap.close()
+            raise ValueError(f'not a record file: {path}') from e
+        if magic != _MAGIC or index_magic != _INDEX_MAGIC or version != _VERSION:
+            self._mmap.close()
+            raise ValueError(f'not a record file: {path}')
+        self._index_offset = index_offset
+        self._game_num = game_num
+
+    def __enter__(self) -> 'RecordFile':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._game_num
+
+    def __getitem__(self, i: int) -> RecordedGame:
+        if i < 0:
+            i += self._game_num
+        if not 0 <= i < self._game_num:
+            raise IndexError(f'game out of range: {i}')
+        (offset,) = _OFFSET.unpack_from(self._mmap, self._index_offset + i * _OFFSET.size)
+        return RecordedGame(self._mmap, offset)
+
+    def __iter__(self) -> tp.Iterator[RecordedGame]:
+        return (self[i] for i in range(self._game_num))
+
+    def close(self) -> None:
+        self._mmap.close()
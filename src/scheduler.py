@@ -0,0 +1,176 @@
+"""フレームスケジューラー.
+
+決まった間隔でループを回す代わりに、次に描き直しが必要になる時刻まで眠る.
+起きるのは次のどれかのときだけ.
+
+- モデルが次の更新を求める時刻(経過時間の表示が次の秒に変わるなど)
+- 入力があったとき(wake)
+- ビューが描き直しを求めたとき(request_frame)
+
+どれもなければ idle_sec ごとにしか起きないので、開始待ちや終了後はほとんど
+CPUを使わない. モデルには実際の経過秒(単調時計の差分)を渡す.
+
+asyncio は読み込みが重いので、run_async で初めて使うときに読み込む.
+"""
+import time
+import typing as tp
+from collections import deque
+from dataclasses import dataclass
+
+from stats import percentile
+
+if tp.TYPE_CHECKING:
+    import asyncio
+
+#: フレームの最短間隔(秒)
+_MIN_INTERVAL = 1.0 / 30.0
+#: 待つものがないときの最長の眠り(秒)
+_IDLE_SEC = 1.0
+#: 秒の境目をまたぎ損ねないための余裕(秒)
+_WAKE_MARGIN = 0.001
+#: 統計に残すフレーム数
+_STATS_FRAMES = 600
+
+#: 1フレームの処理. 実経過秒を受け取り、終了時はFalseを返す
+Step = tp.Callable[[float], bool]
+#: 次の更新までの秒数を返す. 時間で変わるものがなければNone
+NextUpdate = tp.Callable[[], tp.Optional[float]]
+#: 指定秒だけ待つ. 入力があれば早く戻ってよい
+Wait = tp.Callable[[float], None]
+
+
+@dataclass(frozen=True)
+class FrameStats:
+    """フレームの統計.
+
+    :param frames: 処理したフレーム数
+    :param mean: 1フレームの処理時間の平均(秒)
+    :param p50: 処理時間の中央値(秒)
+    :param p99: 処理時間の99パーセンタイル(秒)
+    :param max: 処理時間の最大(秒)
+    """
+    frames: int
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+
+class FrameScheduler:
+    """次に必要な時刻までフレームを止めるスケジューラー.
+
+    :param next_update: 次の更新までの秒数を返す関数
+    :param min_interval: フレームの最短間隔(秒)
+    :param idle_sec: 待つものがないときの最長の眠り(秒)
+    :param clock: 単調時計
+    """
+
+    def __init__(
+            self,
+            next_update: NextUpdate = lambda: None,
+            min_interval: float = _MIN_INTERVAL,
+            idle_sec: float = _IDLE_SEC,
+            clock: tp.Callable[[], float] = time.monotonic) -> None:
+        if min_interval < 0.0 or idle_sec < min_interval:
+            raise ValueError(f'invalid interval: min={min_interval}, idle={idle_sec}')
+        self._next_update = next_update
+        self._min_interval = min_interval
+        self._idle_sec = idle_sec
+        self._clock = clock
+        self._last: tp.Optional[float] = None
+        self._dirty = True
+        self._frames = 0
+        self._work: tp.Deque[float] = deque(maxlen=_STATS_FRAMES)
+        self._event: tp.Optional['asyncio.Event'] = None
+
+    @property
+    def frames(self) -> int:
+        """処理したフレーム数."""
+        return self._frames
+
+    def request_frame(self) -> None:
+        """次のフレームをすぐに回すよう求める."""
+        self._dirty = True
+
+    def wake(self) -> None:
+        """入力があったことを知らせて眠りを打ち切る."""
+        self._dirty = True
+        if self._event is not None:
+            self._event.set()
+
+    def begin_frame(self) -> float:
+        """フレームを始める.
+
+        :return: 前のフレームの開始からの実経過秒. 最初のフレームは0
+        """
+        now = self._clock()
+        delta = 0.0 if self._last is None else now - self._last
+        self._last = now
+        self._dirty = False
+        if self._event is not None:
+            self._event.clear()
+        return delta
+
+    def end_frame(self) -> None:
+        """フレームを終える. 処理時間を統計に残す."""
+        assert self._last is not None
+        self._work.append(self._clock() - self._last)
+        self._frames += 1
+
+    def next_delay(self) -> float:
+        """次のフレームまで眠る秒数."""
+        assert self._last is not None
+        elapsed = self._clock() - self._last
+        if self._dirty:
+            wait = self._min_interval
+        else:
+            wait = self._next_update()
+            if wait is None:
+                wait = self._idle_sec
+            else:
+                wait = max(self._min_interval, min(wait + _WAKE_MARGIN, self._idle_sec))
+        return max(0.0, wait - elapsed)
+
+    def stats(self) -> FrameStats:
+        """直近のフレームの統計."""
+        if not self._work:
+            return FrameStats(self._frames, 0.0, 0.0, 0.0, 0.0)
+        return FrameStats(
+            frames=self._frames,
+            mean=sum(self._work) / len(self._work),
+            p50=percentile(self._work, 50),
+            p99=percentile(self._work, 99),
+            max=max(self._work))
+
+    def run(self, step: Step, wait: Wait = time.sleep) -> None:
+        """ブロッキングでループを回す.
+
+        :param step: 1フレームの処理
+        :param wait: 待ち関数. 入力で早く戻るものを渡すと入力にすぐ応答できる
+        """
+        while True:
+            delta = self.begin_frame()
+            if not step(delta):
+                return
+            self.end_frame()
+            wait(self.next_delay())
+
+    async def run_async(self, step: Step) -> None:
+        """asyncioでループを回す. 眠っている間も wake で起こせる.
+
+        :param step: 1フレームの処理
+        """
+        import asyncio
+        self._event = asyncio.Event()
+        try:
+            while True:
+                delta = self.begin_frame()
+                if not step(delta):
+                    return
+                self.end_frame()
+                try:
+                    await asyncio.wait_for(self._event.wait(), self.next_delay())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._event = None
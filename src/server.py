@@ -0,0 +1,351 @@
+"""マルチセッションのゲームサーバー.
+
+1プロセスで多数のプレイヤーを受け持つ asyncio の TCP サーバー.
+接続ごとに GameModel を1つ持ち、経過時間は全セッション共通の1本のループで進める.
+
+プロトコルは1行1メッセージの JSON.
+
+クライアント→サーバー(OperationParam 相当)::
+
+    {"seq": 1, "code": "MouseLeft", "state": "Press", "x": 120, "y": 80}
+
+サーバー→クライアント::
+
+    {"type": "hello", "session": 1, "size": 400, "cell_num": 9, "margin": 10}
+    {"type": "state", "ack": 1, "mode": "InGame", "time": 3, "next": 2, "board": "0100..."}
+    {"type": "error", "ack": 1, "message": "..."}
+
+入力には必ず ack 付きの state を返す. それ以外の state は変化があったときだけ送り、
+board は盤が変わったときだけ付ける.
+
+使い方::
+
+    python server.py --port 8765 --max-sessions 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+import typing as tp
+from dataclasses import dataclass
+
+from event_log import EventLog, JsonLinesSink, Level
+from game import GameModel
+from input import InputState, OperationParam, VirtualKey
+from scheduler import FrameScheduler
+from values import Position
+
+#: 盤の大きさ
+_BAN_SIZE = 400
+#: 盤のマス数
+_BAN_CELL_NUM = 9
+#: 盤の余白
+_BAN_MARGIN = 10
+#: 失敗判定となる数
+_BAN_FAIL_NUM = 3
+#: 1メッセージの最大バイト数
+_LINE_LIMIT = 1024
+#: 送信待ちがこれを超えたクライアントは切断する(バイト)
+_WRITE_LIMIT = 64 * 1024
+#: 接続待ちキューの長さ
+_BACKLOG = 4096
+#: 経過時間を進めるループの最短間隔(秒)
+_TICK_INTERVAL = 0.05
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """サーバーの設定.
+
+    :param host: 待ち受けるホスト
+    :param port: 待ち受けるポート. 0なら空いているポート
+    :param max_sessions: 同時に受け持つセッションの上限
+    :param cell_num: 盤のマス数
+    :param fail_num: 失敗判定となる数
+    :param write_limit: 送信待ちの上限(バイト)
+    :param tick_interval: 経過時間を進めるループの最短間隔(秒)
+    """
+    host: str = '127.0.0.1'
+    port: int = 8765
+    max_sessions: int = 10000
+    cell_num: int = _BAN_CELL_NUM
+    fail_num: int = _BAN_FAIL_NUM
+    write_limit: int = _WRITE_LIMIT
+    tick_interval: float = _TICK_INTERVAL
+
+
+def parse_operation(message: tp.Dict[str, tp.Any]) -> OperationParam:
+    """入力メッセージを OperationParam に変換する.
+
+    :raise ValueError: 不正なメッセージ
+    """
+    try:
+        code = VirtualKey[message['code']]
+        state = InputState[message['state']]
+        position = Position(int(message.get('x', 0)), int(message.get('y', 0)))
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        # 座標が数でない・無限大(Infinity, 1e400)のときも、他の不正な入力と同じ扱いにする
+        raise ValueError(f'invalid operation: {e}') from e
+    return OperationParam(code=code, state=state, position=position)
+
+
+class Session:
+    """1人分のゲーム.
+
+    :param session_id: セッションID
+    :param model: ゲームモデル
+    :param writer: 送信先
+    :param write_limit: 送信待ちの上限(バイト)
+    """
+    __slots__ = ('_id', '_model', '_writer', '_write_limit', '_sent', '_sent_board', '_last')
+
+    def __init__(
+            self,
+            session_id: int,
+            model: GameModel,
+            writer: asyncio.StreamWriter,
+            write_limit: int) -> None:
+        self._id = session_id
+        self._model = model
+        self._writer = writer
+        self._write_limit = write_limit
+        self._sent: tp.Optional[tuple] = None
+        self._sent_board: tp.Optional[int] = None
+        self._last = time.monotonic()
+
+    @property
+    def session_id(self) -> int:
+        return self._id
+
+    @property
+    def model(self) -> GameModel:
+        return self._model
+
+    def hello(self) -> None:
+        """接続直後の挨拶と最初の状態を送る."""
+        ban = self._model.ban
+        self._send({
+            'type': 'hello',
+            'session': self._id,
+            'size': ban.size,
+            'cell_num': ban.cell_num,
+            'margin': ban.margin,
+        })
+        self.push()
+
+    def advance(self, now: float) -> None:
+        """経過時間を now まで進める."""
+        self._model.update(now - self._last)
+        self._last = now
+
+    def receive(self, line: bytes) -> None:
+        """入力メッセージを1つ処理して ack を返す.
+
+        操作の前に経過時間を今まで進めておくので、共通ループの間隔に関わらず
+        開始や終了の時刻がずれない.
+        """
+        self.advance(time.monotonic())
+        ack = None
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError('message must be an object')
+            ack = message.get('seq')
+            self._model.operate(parse_operation(message))
+        except (ValueError, RecursionError) as e:
+            # 深く入れ子にした行は json.loads が RecursionError になる
+            self._send({'type': 'error', 'ack': ack, 'message': str(e)})
+            return
+        self.push(ack)
+
+    def push(self, ack: tp.Optional[int] = None) -> None:
+        """状態が変わっていたら送る. ack があれば変化がなくても送る."""
+        model = self._model
+        if model.is_waitstart():
+            mode = 'WaitStart'
+        elif model.is_gameover():
+            mode = 'GameOver'
+        elif model.is_success():
+            mode = 'Success'
+        else:
+            mode = 'InGame'
+        state = (mode, model.time_sec, int(model.next_stone))
+        board_key = model.ban.zobrist_key
+        if ack is None and state == self._sent and board_key == self._sent_board:
+            return
+        message: tp.Dict[str, tp.Any] = {
+            'type': 'state', 'ack': ack, 'mode': mode, 'time': state[1], 'next': state[2]}
+        if board_key != self._sent_board:
+            message['board'] = ''.join(str(color) for row in model.ban.to_list() for color in row)
+        self._sent = state
+        self._sent_board = board_key
+        self._send(message)
+
+    def close(self) -> None:
+        """接続を閉じる."""
+        self._writer.close()
+
+    def _send(self, message: tp.Dict[str, tp.Any]) -> None:
+        """1メッセージ送る. 受け取りが追いつかないクライアントは切断する."""
+        if self._writer.is_closing():
+            return
+        self._writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+        if self._writer.transport.get_write_buffer_size() > self._write_limit:
+            self._writer.close()
+
+
+class GameServer:
+    """マルチセッションのゲームサーバー.
+
+    :param config: サーバーの設定
+    :param log: 全セッションで共有するイベントログ. 省略時は出力しない
+    """
+
+    def __init__(self, config: ServerConfig = ServerConfig(), log: tp.Optional[EventLog] = None) -> None:
+        self._config = config
+        self._log = log
+        self._sessions: tp.Dict[int, Session] = {}
+        self._next_id = 1
+        self._server: tp.Optional[asyncio.AbstractServer] = None
+        self._tick_task: tp.Optional[asyncio.Task] = None
+        self._handlers: tp.Set[asyncio.Task] = set()
+        self._next_update: tp.Optional[float] = None
+        self._scheduler = FrameScheduler(
+            lambda: self._next_update,
+            min_interval=config.tick_interval,
+            idle_sec=max(1.0, config.tick_interval))
+
+    @property
+    def port(self) -> int:
+        """待ち受けているポート."""
+        assert self._server is not None
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def session_num(self) -> int:
+        """接続中のセッション数."""
+        return len(self._sessions)
+
+    async def start(self) -> None:
+        """待ち受けと時間を進めるループを始める."""
+        self._server = await asyncio.start_server(
+            self._handle, self._config.host, self._config.port, limit=_LINE_LIMIT,
+            backlog=min(self._config.max_sessions, _BACKLOG))
+        self._tick_task = asyncio.ensure_future(self._scheduler.run_async(self._tick))
+
+    async def serve_forever(self) -> None:
+        """閉じられるまで待ち受ける."""
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """待ち受けを止めて全セッションを切断する."""
+        if self._tick_task is not None:
+            self._tick_task.cancel()
+            self._tick_task = None
+        if self._server is None:
+            return
+        self._server.close()
+        for session in list(self._sessions.values()):
+            session.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def _tick(self, delta: float) -> bool:
+        """全セッションの経過時間を進め、変化を送る.
+
+        経過秒はセッションごとに前回進めた時刻から測る.
+        """
+        now = time.monotonic()
+        next_update = None
+        for session in self._sessions.values():
+            session.advance(now)
+            session.push()
+            model = session.model
+            wait = model.next_update_sec()
+            if wait is not None and (next_update is None or wait < next_update):
+                next_update = wait
+        self._next_update = next_update
+        return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """1接続を受け持つ."""
+        if len(self._sessions) >= self._config.max_sessions:
+            writer.write(b'{"type":"error","ack":null,"message":"server is full"}\n')
+            writer.close()
+            return
+
+        session_id = self._next_id
+        self._next_id += 1
+        model = GameModel(
+            _BAN_SIZE, self._config.cell_num, _BAN_MARGIN, self._config.fail_num, log=self._log)
+        session = Session(session_id, model, writer, self._config.write_limit)
+        self._sessions[session_id] = session
+        handler = asyncio.current_task()
+        assert handler is not None
+        self._handlers.add(handler)
+        try:
+            session.hello()
+            while not writer.is_closing():
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # 長すぎるメッセージ
+                    break
+                if not line:
+                    break
+                session.receive(line)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._sessions[session_id]
+            self._handlers.discard(handler)
+            writer.close()
+
+
+async def serve(config: ServerConfig, log: tp.Optional[EventLog] = None) -> None:
+    """サーバーを起動して待ち受け続ける."""
+    server = GameServer(config, log)
+    await server.start()
+    print(f'[GameServer] listening on {config.host}:{server.port}')
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    """メイン関数."""
+    parser = argparse.ArgumentParser(description='Sanmoku multi-session game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--cell-num', type=int, default=_BAN_CELL_NUM)
+    parser.add_argument('--fail-num', type=int, default=_BAN_FAIL_NUM)
+    parser.add_argument('--event-log', help='write model events to this JSON Lines file')
+    args = parser.parse_args()
+
+    config = ServerConfig(
+        host=args.host,
+        port=args.port,
+        max_sessions=args.max_sessions,
+        cell_num=args.cell_num,
+        fail_num=args.fail_num)
+    log = None
+    sink = None
+    if args.event_log:
+        sink = JsonLinesSink(args.event_log)
+        log = EventLog(Level.Info, [sink])
+    try:
+        asyncio.run(serve(config, log))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if sink is not None:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""ヘッドレスの一括自己対戦シミュレーター.
+
+画面を使わずに石の配置戦略を大量に試し、盤のマス数・失敗判定数ごとの
+クリア率や平均手数を集計する. ルールは GameModel._put_stone と同じで、
+速度のため GameModel を介さず Ban を直接操作する.
+
+使い方::
+
+    python simulator.py --cell-num 5 7 9 --fail-num 3 --games 100000 --strategy greedy
+    python simulator.py --cell-num 9 --fail-num 3 --games 100 --strategy montecarlo
+"""
+import argparse
+import os
+import random
+import time
+import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from ban import Ban, BanBackend, PutState
+from montecarlo import montecarlo_strategy
+from stone_stream import StoneStream
+from values import Cell, StoneColor
+
+#: 盤の大きさ(判定には影響しない)
+_BAN_SIZE = 400
+#: 盤の余白(判定には影響しない)
+_BAN_MARGIN = 10
+#: 1タスクで実行するゲーム数
+_CHUNK_GAMES = 1000
+
+#: 配置戦略. 盤面、置く石、乱数を受け取り、置くマスを返す
+Strategy = tp.Callable[[Ban, StoneColor, random.Random], Cell]
+
+
+def random_strategy(ban: Ban, color: StoneColor, rand: random.Random) -> Cell:
+    """空きマスからランダムに選ぶ."""
+    return rand.choice(ban.empty_cells())
+
+
+def greedy_strategy(ban: Ban, color: StoneColor, rand: random.Random) -> Cell:
+    """すぐには失敗しない空きマスからランダムに選ぶ. 無ければ任意の空きマス."""
+    if ban.has_safe_cell(color):
+        return rand.choice(ban.safe_cells(color))
+    return rand.choice(ban.empty_cells())
+
+
+#: 名前→配置戦略
+STRATEGIES: tp.Dict[str, Strategy] = {
+    'random': random_strategy,
+    'greedy': greedy_strategy,
+    'montecarlo': montecarlo_strategy,
+}
+
+
+@dataclass
+class GameRecord:
+    """1ゲームの結果.
+
+    :param success: クリアしたか
+    :param moves: 失敗せずに置けた石の数
+    """
+    success: bool
+    moves: int
+
+
+def play_game(
+        cell_num: int,
+        fail_num: int,
+        strategy: Strategy,
+        rand: random.Random,
+        backend: BanBackend = BanBackend.List,
+        stones: tp.Optional[StoneStream] = None) -> GameRecord:
+    """1ゲームを最後まで進める.
+
+    :param rand: 戦略が使う乱数
+    :param stones: 次の石の列. 省略時は rand から1ゲーム分ずつ生成する
+    """
+    if stones is None:
+        stones = StoneStream(rand, block=cell_num * cell_num)
+    ban = Ban(_BAN_SIZE, cell_num, _BAN_MARGIN, fail_num, backend)
+    moves = 0
+    while True:
+        color = stones.next()
+        result = ban.place(strategy(ban, color, rand), color)  # type: ignore
+        if result.state == PutState.Occupied:
+            raise ValueError(f'strategy chose an occupied cell: {strategy}')
+        if result.state == PutState.Fail:
+            return GameRecord(False, moves)
+        moves += 1
+        if result.state == PutState.Success:
+            return GameRecord(True, moves)
+
+
+@dataclass
+class SimulationResult:
+    """1つの設定でのシミュレーション結果.
+
+    :param cell_num: 盤のマス数
+    :param fail_num: 失敗判定となる数
+    :param strategy: 配置戦略の名前
+    :param games: ゲーム数
+    :param successes: クリアしたゲーム数
+    :param total_moves: 失敗せずに置けた石の合計
+    :param elapsed: 経過秒
+    """
+    cell_num: int
+    fail_num: int
+    strategy: str
+    games: int = 0
+    successes: int = 0
+    total_moves: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        """クリア率."""
+        return self.successes / self.games if self.games else 0.0
+
+    @property
+    def mean_moves(self) -> float:
+        """失敗せずに置けた石の平均."""
+        return self.total_moves / self.games if self.games else 0.0
+
+    @property
+    def games_per_sec(self) -> float:
+        """1秒あたりのゲーム数."""
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (f'cell_num={self.cell_num} fail_num={self.fail_num} strategy={self.strategy} '
+                f'games={self.games} success_rate={self.success_rate:.4f} '
+                f'mean_moves={self.mean_moves:.2f} games/sec={self.games_per_sec:.0f}')
+
+
+def _run_chunk(cell_num: int, fail_num: int, strategy: str, games: int, seed: int) -> tp.Tuple[int, int]:
+    """ワーカーで複数ゲームを実行する.
+
+    :return: (クリアしたゲーム数, 置けた石の合計)
+    """
+    rand = random.Random(seed)
+    stones = StoneStream(rand.getrandbits(64))
+    func = STRATEGIES[strategy]
+    successes = 0
+    total_moves = 0
+    for _ in range(games):
+        record = play_game(cell_num, fail_num, func, rand, stones=stones)
+        successes += record.success
+        total_moves += record.moves
+    return successes, total_moves
+
+
+def simulate(
+        cell_num: int,
+        fail_num: int,
+        strategy: str,
+        games: int,
+        seed: int = 0,
+        workers: tp.Optional[int] = None) -> SimulationResult:
+    """1つの設定でゲームを繰り返す.
+
+    ゲームはチャンクに分け、チャンクごとに seed から導いた乱数の種を使うので、
+    ワーカー数によらず同じ結果になる.
+
+    :param workers: ワーカープロセス数. Noneなら全コア、1ならプロセスを使わない
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f'unknown strategy: {strategy}')
+
+    chunks = []
+    for index, start in enumerate(range(0, games, _CHUNK_GAMES)):
+        chunk_games = min(_CHUNK_GAMES, games - start)
+        chunks.append((cell_num, fail_num, strategy, chunk_games, seed * 1000003 + index))
+
+    result = SimulationResult(cell_num, fail_num, strategy, games)
+    start_time = time.perf_counter()
+    if workers == 1:
+        outputs = [_run_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outputs = list(executor.map(_run_chunk, *zip(*chunks)))
+    result.elapsed = time.perf_counter() - start_time
+
+    for (successes, total_moves) in outputs:
+        result.successes += successes
+        result.total_moves += total_moves
+    return result
+
+
+def main():
+    """メイン関数."""
+    parser = argparse.ArgumentParser(description='Sanmoku headless simulator')
+    parser.add_argument('--cell-num', type=int, nargs='+', default=[9])
+    parser.add_argument('--fail-num', type=int, nargs='+', default=[3])
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='greedy')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    for cell_num in args.cell_num:
+        for fail_num in args.fail_num:
+            print(simulate(cell_num, fail_num, args.strategy, args.games, args.seed, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""期待値最大化(expectimax)による求解.
+
+次の石は StoneStream により StoneColor から一様に選ばれるので、最善手を
+打ち続けたときのクリア確率が定まる. 石が決まった後は置くマスを選ぶ(最大化)、
+石が決まる前は色の平均を取る(確率ノード)として、メモ化しながら探索する.
+
+最後まで読む(max_depth=None)と局面の数は盤の大きさとともに急激に増える.
+正規化しても空の 4x4 には数百万以上の局面があるので、現実的な時間で厳密解が
+求まるのは 3x3 と、石が半分ほど埋まった 4x4 まで. それより大きい盤や序盤は
+max_depth を指定して使う.
+"""
+import typing as tp
+
+from ban import Ban
+from canonical import Canonicalizer
+from transposition import TranspositionTable
+from values import Cell, StoneColor
+
+#: 石の色
+_COLORS = tuple(range(StoneColor.Min, StoneColor.Max + 1))
+#: 最後まで読んだ値を置換表に入れるときの残り探索深さ
+_EXACT_DEPTH = 1 << 30
+#: 置換表のメモリ量の既定値(MB). 約33万エントリ
+_DEFAULT_MEGABYTES = 64
+#: 回転・反転でも正規化する、盤上の石の数の上限
+_CANONICAL_STONES = 6
+#: 局面から回転・反転で正規化したキーへの対応を覚えておく数. 超えたら捨てる
+_KEY_CACHE_NUM = 1 << 16
+
+#: 局面. (色ごとの生きた石, 生きた空きマス, 影響しない空きマスの数, 生きた列)
+#: 石とマスはビットボードで、色 c の石は c - StoneColor.Min 番目. 生きた列は列の番号のビット集合
+State = tp.Tuple[tp.Tuple[int, ...], int, int, int]
+
+
+class Solver:
+    """クリア確率を求めるソルバー.
+
+    失敗判定となる数の列のうち、石が1色以下で、影響しないマスを含まないものを
+    「生きた列」と呼ぶ. どの生きた列にも含まれないマスは以降の判定に影響しない.
+    そうした空きマスはどれに置いても同じなので数だけを覚えて候補手も1つに絞り、
+    石は盤から取り除く.
+
+    局面は色ごとの石と空きマスのビットボードで持つ. メモのキーは色ごとの石を
+    並べ替えて色の入れ替えを吸収し、対称な局面の多い序盤は回転・反転でも正規化する.
+    同じ手番で同じキーになる候補手は1つだけ調べる.
+
+    確率ノードでは、調べていない色が全てクリアになっても親の最善手に届かないと
+    分かった時点で打ち切る(Star1 の下限側の枝刈り). 打ち切った値は上界として
+    置換表に入れ、後で正確な値が要るときは続きを読む.
+
+    :param cell_num: 一辺のマス数
+    :param fail_num: 失敗判定となる数
+    :param max_depth: 先読みする石の数. Noneなら最後まで読む(厳密解. 3x3 と中盤以降の 4x4 向け)
+    :param table: メモに使う置換表. Noneなら既定のメモリ量(64MB)のLRU置換表を作る
+    """
+
+    def __init__(
+            self,
+            cell_num: int,
+            fail_num: int,
+            max_depth: tp.Optional[int] = None,
+            table: tp.Optional[TranspositionTable] = None) -> None:
+        if max_depth is not None and max_depth < 0:
+            raise ValueError(f'max_depth must not be negative: {max_depth}')
+        self._cell_num = cell_num
+        self._fail_num = fail_num
+        self._max_depth = max_depth
+        self._cell_count = cell_num * cell_num
+        self._lines = self._make_lines(cell_num, fail_num)
+        self._cell_lines = [
+            tuple((1 << line_index, line) for (line_index, line) in enumerate(self._lines) if line >> index & 1)
+            for index in range(cell_num * cell_num)]
+        self._cell_line_sets = []
+        self._reaches = []
+        for lines in self._cell_lines:
+            line_set = 0
+            reach = 0
+            for (line_bit, line) in lines:
+                line_set |= line_bit
+                reach |= line
+            self._cell_line_sets.append(line_set)
+            self._reaches.append(reach)
+        self._fail_masks = [
+            tuple(line & ~(1 << index) for (_, line) in lines)
+            for (index, lines) in enumerate(self._cell_lines)]
+        self._table = table if table is not None else TranspositionTable.from_memory(_DEFAULT_MEGABYTES)
+        self._canonicalizer = Canonicalizer(cell_num)
+        self._keys: tp.Dict[tp.Tuple[int, ...], tp.Tuple[tp.Hashable, tp.Tuple[int, ...]]] = {}
+
+    @property
+    def table(self) -> TranspositionTable:
+        """メモに使う置換表."""
+        return self._table
+
+    @property
+    def memo_num(self) -> int:
+        """メモ化した局面の数."""
+        return len(self._table)
+
+    def clear(self) -> None:
+        """メモを破棄する."""
+        self._table.clear()
+        self._keys.clear()
+
+    def solve(self, ban: Ban, next_stone: StoneColor) -> tp.List[tp.Tuple[Cell, float]]:
+        """空きマスごとに、そこへ次の石を置いた後のクリア確率を求める.
+
+        置くとすぐ失敗するマスは0.0になる.
+
+        :return: (マス, クリア確率) のリスト
+        """
+        state = self._load(ban)
+        empty = state[1]
+        color_index = next_stone - StoneColor.Min
+        child_depth = self._child_depth(self._max_depth)
+        free_value = None
+        result = []
+        for (index, color) in enumerate(self._to_board(ban)):
+            if color != 0:
+                continue
+            if not empty >> index & 1:
+                # 影響しない空きマスはどれも同じ値
+                if free_value is None:
+                    free_value = self._chance_value(self._free_child(state), child_depth, -1.0)
+                value = free_value
+            elif self._is_fail(state, index, color_index):
+                value = 0.0
+            else:
+                value = self._chance_value(self._place(state, index, color_index), child_depth, -1.0)
+            result.append((Cell(index // self._cell_num, index % self._cell_num), value))
+        return result
+
+    def best_cell(self, ban: Ban, next_stone: StoneColor) -> tp.Optional[Cell]:
+        """次の石を置くべきマスを得る. 空きマスが無ければNone."""
+        values = self.solve(ban, next_stone)
+        if not values:
+            return None
+        (cell, _) = max(values, key=lambda item: item[1])
+        return cell
+
+    def value(self, ban: Ban) -> float:
+        """次の石が決まる前の盤面のクリア確率を求める."""
+        depth = None if self._max_depth is None else self._max_depth + 1
+        return self._chance_value(self._load(ban), depth, -1.0)
+
+    def _to_board(self, ban: Ban) -> bytearray:
+        """Banを一次元の盤面にする."""
+        if ban.cell_num != self._cell_num:
+            raise ValueError(f'cell_num mismatch: {ban.cell_num} != {self._cell_num}')
+        board = bytearray()
+        for row in ban.to_list():
+            board.extend(row)
+        return board
+
+    def _load(self, ban: Ban) -> State:
+        """Banから探索の局面を作る."""
+        board = self._to_board(ban)
+        if ban.is_fail():
+            raise ValueError('ban is already failed')
+        masks = [0] * len(_COLORS)
+        empty = 0
+        for (index, color) in enumerate(board):
+            if color:
+                masks[color - StoneColor.Min] |= 1 << index
+            else:
+                empty |= 1 << index
+        live = 0
+        live_lines = 0
+        for (line_index, line) in enumerate(self._lines):
+            if sum(1 for mask in masks if mask & line) <= 1:
+                live |= line
+                live_lines |= 1 << line_index
+        free = bin(empty & ~live).count('1')
+        return tuple(mask & live for mask in masks), empty & live, free, live_lines
+
+    def _key(self, state: State, canonical: bool) -> tp.Hashable:
+        """局面のメモのキー.
+
+        :param canonical: 回転・反転でも正規化するか(_is_canonical の結果)
+        """
+        (masks, empty, free, _) = state
+        if canonical:
+            return self._canonical(state)[0]
+        # 色ごとの石を並べ替えて1つの整数に詰める
+        shift = self._cell_count
+        key = free << shift | empty
+        for mask in sorted(masks):
+            key = key << shift | mask
+        return key
+
+    def _color_order(self, state: State) -> tp.Sequence[int]:
+        """キーでの色ごとの石の並びに対応する、色の添字."""
+        masks = state[0]
+        if self._is_canonical(state):
+            return self._canonical(state)[1]
+        return sorted(range(len(masks)), key=masks.__getitem__)
+
+    def _is_canonical(self, state: State, placed: int = 0) -> bool:
+        """回転・反転でも正規化したキーを使うか. 石が少なく、対称な局面が多い序盤だけ使う.
+
+        :param placed: この後に置く石の数
+        """
+        (_, empty, free, _) = state
+        return self._cell_count - free - bin(empty).count('1') + placed < _CANONICAL_STONES
+
+    def _canonical(self, state: State) -> tp.Tuple[tp.Hashable, tp.Tuple[int, ...]]:
+        """回転・反転と色の入れ替えで正規化したキーと、キーでの色の並び."""
+        (masks, empty, free, _) = state
+        raw = (free, empty) + masks
+        result = self._keys.get(raw)
+        if result is None:
+            if _KEY_CACHE_NUM <= len(self._keys):
+                self._keys.clear()
+            (key, order) = self._canonicalizer.canonical_masks(masks, empty)
+            result = ((free,) + key, order)
+            self._keys[raw] = result
+        return result
+
+    def _chance_value(
+            self,
+            state: State,
+            depth: tp.Optional[int],
+            alpha: float,
+            key: tp.Optional[tp.Hashable] = None) -> float:
+        """石が決まる前の局面のクリア確率.
+
+        :param alpha: 親の最善手の値. これ以下と分かれば、その時点の上界を返す
+        :param key: 局面のメモのキー. Noneなら求める
+        """
+        (masks, empty, _, _) = state
+        if not empty:
+            # 残りが全て影響しない空きマスならクリアできる
+            return 1.0
+        if key is None:
+            key = self._key(state, self._is_canonical(state))
+        table_depth = _EXACT_DEPTH if depth is None else depth
+        entry = self._table.get(key, table_depth)
+        total = 0.0
+        rest = 1.0
+        done = 0
+        if entry is not None:
+            (total, upper, done) = entry
+            if total == upper or upper <= alpha:
+                return upper
+            rest = upper - total
+        elif depth == 0:
+            value = self._estimate(state)
+            self._table.put(key, (value, value, 0), table_depth)
+            return value
+
+        # 生きた石のある色から調べる. 生きた石の無い色は入れ替えても同じ局面になるので
+        # まとめて1回だけ調べる. 色の並びはキーから決まるので、打ち切った局面は
+        # 同じキーの局面から続きを読める
+        order = self._color_order(state)
+        groups = [(color_index, 1) for color_index in reversed(order) if masks[color_index]]
+        absent = [color_index for color_index in order if not masks[color_index]]
+        if absent:
+            groups.append((absent[0], len(absent)))
+        for (group_index, (color_index, color_num)) in enumerate(groups):
+            if group_index < done:
+                continue
+            if total + rest <= alpha:
+                self._table.put(key, (total, total + rest, group_index), table_depth)
+                return total + rest
+            probability = color_num / len(_COLORS)
+            rest -= probability
+            total += probability * self._max_value(state, color_index, depth)
+        self._table.put(key, (total, total, len(groups)), table_depth)
+        return total
+
+    def _max_value(self, state: State, color_index: int, depth: tp.Optional[int]) -> float:
+        """石が決まった局面で、最善のマスに置いたときのクリア確率."""
+        (_, empty, free, _) = state
+        child_depth = self._child_depth(depth)
+        canonical = self._is_canonical(state, 1)
+        best = 0.0
+        seen = set()
+        if free:
+            child = self._free_child(state)
+            key = self._key(child, canonical)
+            seen.add(key)
+            best = self._chance_value(child, child_depth, best, key)
+            if 1.0 <= best:
+                return best
+        rest = empty
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            index = bit.bit_length() - 1
+            if self._is_fail(state, index, color_index):
+                continue
+            child = self._place(state, index, color_index)
+            key = self._key(child, canonical)
+            if key in seen:
+                continue
+            seen.add(key)
+            value = self._chance_value(child, child_depth, best, key)
+            if best < value:
+                best = value
+                if 1.0 <= best:
+                    break
+        return best
+
+    @staticmethod
+    def _child_depth(depth: tp.Optional[int]) -> tp.Optional[int]:
+        """石を1つ置いた後の残り探索深さ."""
+        return None if depth is None else depth - 1
+
+    @staticmethod
+    def _free_child(state: State) -> State:
+        """影響しない空きマスに石を置いた局面."""
+        (masks, empty, free, live_lines) = state
+        return masks, empty, free - 1, live_lines
+
+    def _is_fail(self, state: State, index: int, color_index: int) -> bool:
+        """生きた空きマスに石を置くと失敗になるか.
+
+        :param color_index: 石の色の添字. 色 c なら c - StoneColor.Min
+        """
+        mask = state[0][color_index]
+        for other in self._fail_masks[index]:
+            if mask & other == other:
+                return True
+        return False
+
+    def _place(self, state: State, index: int, color_index: int) -> State:
+        """生きた空きマスに石を置いた局面.
+
+        2色目の石が入った列は生きた列でなくなる. その列のマスのうち、
+        他の生きた列にも含まれないものを取り除く.
+        """
+        (masks, empty, free, live_lines) = state
+        bit = 1 << index
+        mask = masks[color_index]
+        placed = masks[:color_index] + (mask | bit,) + masks[color_index + 1:]
+        empty &= ~bit
+        others = 0
+        for other in masks:
+            others |= other
+        others &= ~mask & self._reaches[index]
+        if not others:
+            return placed, empty, free, live_lines
+        killed = 0
+        for (line_bit, line) in self._cell_lines[index]:
+            if live_lines & line_bit and line & others:
+                live_lines &= ~line_bit
+                killed |= line
+        if not killed:
+            return placed, empty, free, live_lines
+
+        cell_line_sets = self._cell_line_sets
+        dead = 0
+        while killed:
+            cell_bit = killed & -killed
+            killed ^= cell_bit
+            if not cell_line_sets[cell_bit.bit_length() - 1] & live_lines:
+                dead |= cell_bit
+        if not dead:
+            return placed, empty, free, live_lines
+        free += bin(empty & dead).count('1')
+        keep = ~dead
+        return tuple([mask & keep for mask in placed]), empty & keep, free, live_lines
+
+    def _estimate(self, state: State) -> float:
+        """読みを打ち切った局面の評価値.
+
+        空きマスと色の組のうち、置いてもすぐには失敗しないものの割合.
+        確率ではなく、局面の余裕を表す目安.
+        """
+        (_, empty, free, _) = state
+        safe = free * len(_COLORS)
+        cell_num = 0
+        rest = empty
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            cell_num += 1
+            index = bit.bit_length() - 1
+            for color_index in range(len(_COLORS)):
+                if not self._is_fail(state, index, color_index):
+                    safe += 1
+        return safe / ((cell_num + free) * len(_COLORS))
+
+    @staticmethod
+    def _make_lines(cell_num: int, fail_num: int) -> tp.List[int]:
+        """盤面上の fail_num 個の列を全て、ビットボードで求める."""
+        lines = []
+        for row in range(cell_num):
+            for column in range(cell_num):
+                for (dr, dc) in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + dr * (fail_num - 1)
+                    end_column = column + dc * (fail_num - 1)
+                    if not (0 <= end_row < cell_num and 0 <= end_column < cell_num):
+                        continue
+                    line = 0
+                    for d in range(fail_num):
+                        line |= 1 << ((row + dr * d) * cell_num + column + dc * d)
+                    lines.append(line)
+        return lines
@@ -0,0 +1,11 @@
+"""計測値の集計."""
+import typing as tp
+
+
+def percentile(samples: tp.Sequence[float], percent: float) -> float:
+    """パーセンタイルを得る(最近傍順位法)."""
+    if not samples:
+        raise ValueError('samples is empty')
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
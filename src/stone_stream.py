@@ -0,0 +1,87 @@
+"""次の石の列.
+
+セッションごとに独立した乱数で次の石を決める. 石はブロック単位でまとめて生成し、
+1手ごとの取り出しはリストの読み出しだけにする. 同じ種からは同じ列が得られる.
+
+NumPy があれば use_numpy=True でブロックの生成をベクトル化できる. ただし NumPy の
+乱数は random と別の系列なので、同じ種でも use_numpy の有無で列は変わる.
+NumPy は読み込みが重いので、use_numpy で初めて使うときに読み込む.
+"""
+import random
+import typing as tp
+from functools import lru_cache
+
+from values import StoneColor
+
+#: 1度に生成する石の数
+_BLOCK = 1024
+#: 石の色
+_COLORS = tuple(range(StoneColor.Min, StoneColor.Max + 1))
+
+
+@lru_cache(maxsize=None)
+def _load_numpy() -> tp.Any:
+    """NumPy を読み込む. 無ければNone."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - NumPy は任意
+        return None
+    return numpy
+
+
+class StoneStream:
+    """次の石をブロック単位で生成して順に返す.
+
+    :param seed: 乱数の種か random.Random. 省略時は種を決めない
+    :param block: 1度に生成する石の数
+    :param use_numpy: NumPy でブロックを生成するか
+    :raise ImportError: use_numpy なのに NumPy がない
+    """
+
+    def __init__(
+            self,
+            seed: tp.Union[int, random.Random, None] = None,
+            block: int = _BLOCK,
+            use_numpy: bool = False) -> None:
+        if block < 1:
+            raise ValueError(f'block must be positive: {block}')
+        np = _load_numpy() if use_numpy else None
+        if use_numpy and np is None:
+            raise ImportError('use_numpy requires numpy')
+        self._block = block
+        self._numpy_rng: tp.Any = None
+        self._rand: tp.Optional[random.Random] = None
+        if use_numpy:
+            if isinstance(seed, random.Random):
+                seed = seed.getrandbits(64)
+            self._numpy_rng = np.random.default_rng(seed)
+        elif isinstance(seed, random.Random):
+            self._rand = seed
+        else:
+            self._rand = random.Random(seed)
+        self._stones: tp.List[int] = []
+        self._pos = 0
+
+    def __iter__(self) -> 'StoneStream':
+        return self
+
+    def __next__(self) -> int:
+        return self.next()
+
+    def next(self) -> int:
+        """次の石を得る."""
+        if self._pos == len(self._stones):
+            self._fill()
+        stone = self._stones[self._pos]
+        self._pos += 1
+        return stone
+
+    def _fill(self) -> None:
+        """次のブロックを生成する."""
+        if self._numpy_rng is not None:
+            self._stones = self._numpy_rng.integers(
+                StoneColor.Min, StoneColor.Max + 1, size=self._block, dtype='uint8').tolist()
+        else:
+            assert self._rand is not None
+            self._stones = self._rand.choices(_COLORS, k=self._block)
+        self._pos = 0
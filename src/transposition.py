@@ -0,0 +1,149 @@
+"""置換表.
+
+探索で同じ局面を何度も評価しないよう、局面のキーと評価値を覚えておく.
+ソルバーや解析ツールで共有できるよう、上限と追い出し方式を選べる.
+"""
+import typing as tp
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum, auto
+
+#: 1エントリあたりのおおよそのメモリ量(バイト)
+ENTRY_BYTES = 200
+
+
+class Eviction(Enum):
+    """追い出し方式."""
+    #: 最も長く使われていないエントリを追い出す
+    LRU = auto()
+    #: キーのハッシュで決まる枠を、残り探索深さの大きい方が使う
+    Depth = auto()
+
+
+@dataclass
+class TableStats:
+    """置換表の統計.
+
+    :param hits: 見つかった回数
+    :param misses: 見つからなかった回数
+    :param evictions: 追い出した、または上書きを断念した回数
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """ヒット率."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TranspositionTable:
+    """上限付きの置換表.
+
+    エントリは (キー, 値, 残り探索深さ). get では指定した深さ以上で
+    探索済みのエントリだけを返す.
+
+    :param capacity: エントリ数の上限
+    :param eviction: 追い出し方式
+    """
+
+    def __init__(self, capacity: int, eviction: Eviction = Eviction.LRU) -> None:
+        if capacity <= 0:
+            raise ValueError(f'capacity must be positive: {capacity}')
+        self._capacity = capacity
+        self._eviction = eviction
+        self._stats = TableStats()
+        self._lru: tp.OrderedDict[tp.Hashable, tp.Tuple[tp.Any, int]] = OrderedDict()
+        self._slots: tp.List[tp.Optional[tp.Tuple[tp.Hashable, tp.Any, int]]] = []
+        self._slot_num = 0
+        if eviction == Eviction.Depth:
+            self._slots = [None] * capacity
+
+    @classmethod
+    def from_memory(cls, megabytes: float, eviction: Eviction = Eviction.LRU) -> 'TranspositionTable':
+        """メモリ量の上限から置換表を作る."""
+        return cls(max(1, int(megabytes * 1024 * 1024 / ENTRY_BYTES)), eviction)
+
+    @property
+    def capacity(self) -> int:
+        """エントリ数の上限."""
+        return self._capacity
+
+    @property
+    def eviction(self) -> Eviction:
+        """追い出し方式."""
+        return self._eviction
+
+    @property
+    def stats(self) -> TableStats:
+        """統計."""
+        return self._stats
+
+    def __len__(self) -> int:
+        if self._eviction == Eviction.LRU:
+            return len(self._lru)
+        return self._slot_num
+
+    def clear(self) -> None:
+        """全てのエントリと統計を破棄する."""
+        self._lru.clear()
+        if self._eviction == Eviction.Depth:
+            self._slots = [None] * self._capacity
+        self._slot_num = 0
+        self._stats = TableStats()
+
+    def get(self, key: tp.Hashable, depth: int = 0) -> tp.Optional[tp.Any]:
+        """値を得る.
+
+        :param depth: 必要な残り探索深さ
+        :return: 見つからない、または探索深さが足りない場合はNone
+        """
+        if self._eviction == Eviction.LRU:
+            entry = self._lru.get(key)
+            if entry is not None and depth <= entry[1]:
+                self._lru.move_to_end(key)
+                self._stats.hits += 1
+                return entry[0]
+        else:
+            slot = self._slots[hash(key) % self._capacity]
+            if slot is not None and slot[0] == key and depth <= slot[2]:
+                self._stats.hits += 1
+                return slot[1]
+        self._stats.misses += 1
+        return None
+
+    def put(self, key: tp.Hashable, value: tp.Any, depth: int = 0) -> None:
+        """値を覚える.
+
+        :param depth: 値を求めたときの残り探索深さ
+        """
+        if self._eviction == Eviction.LRU:
+            entry = self._lru.get(key)
+            if entry is not None and depth < entry[1]:
+                # 同じ局面でも、深く探索済みの値を残す
+                self._lru.move_to_end(key)
+                return
+            self._lru[key] = (value, depth)
+            self._lru.move_to_end(key)
+            if self._capacity < len(self._lru):
+                self._lru.popitem(last=False)
+                self._stats.evictions += 1
+            return
+
+        index = hash(key) % self._capacity
+        slot = self._slots[index]
+        if slot is None:
+            self._slot_num += 1
+        elif slot[0] == key:
+            if depth < slot[2]:
+                # 同じ局面でも、深く探索済みの値を残す
+                return
+        else:
+            if depth < slot[2]:
+                # 深く探索済みのエントリを優先して残す
+                self._stats.evictions += 1
+                return
+            self._stats.evictions += 1
+        self._slots[index] = (key, value, depth)
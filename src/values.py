@@ -1,37 +1,75 @@
 """値オブジェクトたち."""
-from dataclasses import dataclass
+import typing as tp
 from enum import Enum, IntEnum, auto
 
 
-@dataclass
 class Position:
-    """座標."""
-    x: int = 0
-    y: int = 0
+    """座標(不変)."""
+    __slots__ = ('x', 'y')
+
+    x: int
+    y: int
+
+    def __init__(self, x: int = 0, y: int = 0) -> None:
+        object.__setattr__(self, 'x', x)
+        object.__setattr__(self, 'y', y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        return Position, (self.x, self.y)
 
     def __str__(self):
         return f'({self.x}, {self.y})'
 
+    def __repr__(self):
+        return f'Position(x={self.x}, y={self.y})'
+
     def __eq__(self, other):
         if isinstance(other, Position):
             return self.x == other.x and self.y == other.y
         elif isinstance(other, tuple):
-            (x, y) = other
-            return self.x == x and self.y == y
-        else:
-            self == other
+            return (self.x, self.y) == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+
+#: 共有インスタンスを用意する最大のマス数
+_INTERN_LIMIT = 128
+#: 共有インスタンス. _interned[row][column]
+_interned: tp.List[tp.List['Cell']] = []
 
 
 class Cell:
-    """マス目."""
+    """マス目(不変).
 
-    def __init__(self, row: int, column: int) -> None:
-        if row < 0:
-            raise ValueError()
-        if column < 0:
+    intern_cells で用意した範囲の Cell(row, column) は共有インスタンスを返す.
+    タプル (row, column) とも比較でき、ハッシュも等しい.
+    """
+    __slots__ = ('_row', '_column', '_hash')
+
+    def __new__(cls, row: int, column: int) -> 'Cell':
+        if row < 0 or column < 0:
             raise ValueError()
-        self._row: int = row
-        self._column: int = column
+        try:
+            return _interned[row][column]
+        except IndexError:
+            return cls._create(row, column)
+
+    @classmethod
+    def _create(cls, row: int, column: int) -> 'Cell':
+        """共有せずに新しいインスタンスを作る."""
+        cell = object.__new__(cls)
+        object.__setattr__(cell, '_row', row)
+        object.__setattr__(cell, '_column', column)
+        object.__setattr__(cell, '_hash', hash((row, column)))
+        return cell
 
     @property
     def row(self) -> int:
@@ -42,7 +80,16 @@ class Cell:
         return self._column
 
     def get(self) -> tuple[int, int]:
-        return self._row, self.column
+        return self._row, self._column
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Cell is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Cell is immutable')
+
+    def __reduce__(self):
+        return Cell, (self._row, self._column)
 
     def __str__(self) -> str:
         return f'Cell({self.row}, {self.column})'
@@ -51,10 +98,31 @@ class Cell:
         return f'Cell({self.row}, {self.column})'
 
     def __eq__(self, other) -> bool:
+        if self is other:
+            return True
         if isinstance(other, Cell):
-            return self.row == other.row and self.column == other.column
-        else:
-            return self == other
+            return self._row == other._row and self._column == other._column
+        elif isinstance(other, tuple):
+            return (self._row, self._column) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return self._hash
+
+
+def intern_cells(cell_num: int) -> None:
+    """cell_num 四方の Cell を共有インスタンスとして用意する.
+
+    大きすぎる盤では _INTERN_LIMIT 四方までにとどめ、それより外は都度作る.
+    """
+    num = min(cell_num, _INTERN_LIMIT)
+    old = len(_interned)
+    if num <= old:
+        return
+    for row in range(old):
+        _interned[row].extend(Cell._create(row, column) for column in range(old, num))
+    for row in range(old, num):
+        _interned.append([Cell._create(row, column) for column in range(num)])
 
 
 class StoneColor(IntEnum):
@@ -1,7 +1,8 @@
 import unittest
 
 from sanmoku.src.values import Cell, Position
-from sanmoku.src.ban import Ban, SequenceCounter
+from sanmoku.src.ban import (
+    Ban, BanBackend, BitCells, PutState, SequenceCounter, SparseCells, get_zobrist_table)
 
 #: 盤の大きさ
 _SIZE = 400
@@ -89,9 +90,9 @@ class TestBan(unittest.TestCase):
     def test_position_to_cell(self):
         ban = self.ban
         self.assertIsNone(ban.position_to_cell(Position(0, 0)))
-        self.assertEqual(ban.position_to_cell(Position(10, 10)), Cell(0, 0))
-        self.assertEqual(ban.position_to_cell(Position(52, 52)), Cell(1, 1))
-        self.assertEqual(ban.position_to_cell(Position(94, 94)), Cell(2, 2))
+        self.assertEqual(ban.position_to_cell(Position(10, 10)), (0, 0))
+        self.assertEqual(ban.position_to_cell(Position(52, 52)), (1, 1))
+        self.assertEqual(ban.position_to_cell(Position(94, 94)), (2, 2))
 
     def test_is_success(self):
         ban = self.ban
@@ -101,6 +102,213 @@ class TestBan(unittest.TestCase):
                 ban.put(Cell(row, column), 1)
         self.assertTrue(ban.is_success())
 
+    def test_empty_num(self):
+        ban = self.ban
+        self.assertEqual(ban.empty_num, _CELL_NUM * _CELL_NUM)
+        ban.put(Cell(0, 0), 1)
+        self.assertEqual(ban.empty_num, _CELL_NUM * _CELL_NUM - 1)
+        ban.put(Cell(0, 0), 2)
+        self.assertEqual(ban.empty_num, _CELL_NUM * _CELL_NUM - 1)
+
+    def test_remove(self):
+        ban = self.ban
+        ban.put(Cell(3, 4), 2)
+        self.assertEqual(ban.remove(Cell(3, 4)), 2)
+        self.assertEqual(ban.get(Cell(3, 4)), 0)
+        self.assertEqual(ban.remove(Cell(3, 4)), 0)
+        self.assertEqual(ban.empty_num, _CELL_NUM * _CELL_NUM)
+        with self.assertRaises(ValueError):
+            ban.remove(Cell(_CELL_NUM, 0))
+
+    def test_zobrist_key(self):
+        ban = self.ban
+        self.assertEqual(ban.zobrist_key, 0)
+        ban.put(Cell(0, 0), 1)
+        ban.put(Cell(1, 2), 3)
+        key = ban.zobrist_key
+        self.assertNotEqual(key, 0)
+
+        # 置く順番によらない
+        other = Ban(_SIZE, _CELL_NUM, _MARGIN, _FAIL_NUM, ban.backend)
+        other.put(Cell(1, 2), 3)
+        other.put(Cell(0, 0), 1)
+        self.assertEqual(other.zobrist_key, key)
+
+        # 色が違えば別のキー
+        other.remove(Cell(0, 0))
+        other.put(Cell(0, 0), 2)
+        self.assertNotEqual(other.zobrist_key, key)
+
+        ban.remove(Cell(0, 0))
+        ban.remove(Cell(1, 2))
+        self.assertEqual(ban.zobrist_key, 0)
+
+    def test_safe_cells(self):
+        ban = Ban(_SIZE, 3, _MARGIN, _FAIL_NUM, self.ban.backend)
+        self.assertEqual(len(ban.safe_cells(1)), 9)
+        ban.put(Cell(0, 0), 1)
+        ban.put(Cell(0, 1), 1)
+        self.assertTrue(ban.would_fail(Cell(0, 2), 1))
+        self.assertFalse(ban.would_fail(Cell(0, 2), 2))
+        self.assertEqual(ban.forbidden_num(1), 1)
+        self.assertNotIn((0, 2), [cell.get() for cell in ban.safe_cells(1)])
+        self.assertEqual(len(ban.safe_cells(2)), 7)
+
+        ban.put(Cell(1, 1), 1)
+        self.assertEqual(sorted(cell.get() for cell in ban.safe_cells(1)), [(1, 0), (1, 2), (2, 0)])
+
+        ban.remove(Cell(0, 1))
+        self.assertFalse(ban.would_fail(Cell(0, 2), 1))
+        self.assertTrue(ban.would_fail(Cell(2, 2), 1))
+
+    def test_has_safe_cell(self):
+        ban = Ban(_SIZE, 2, _MARGIN, 2, self.ban.backend)
+        ban.put(Cell(0, 0), 1)
+        self.assertFalse(ban.has_safe_cell(1))
+        self.assertTrue(ban.has_safe_cell(2))
+        self.assertEqual(ban.safe_cells(1), [])
+
+    def test_forbidden_after_puts(self):
+        # 問い合わせより前に置いた石からも、置くと失敗になるマスを求める
+        ban = Ban(_SIZE, 4, _MARGIN, _FAIL_NUM, self.ban.backend)
+        for (cell, color) in ((Cell(0, 0), 1), (Cell(0, 1), 1), (Cell(1, 1), 2), (Cell(2, 2), 2),
+                              (Cell(3, 0), 3), (Cell(2, 1), 3), (Cell(3, 3), 1)):
+            ban.put(cell, color)
+        for color in range(1, 5):
+            for cell in ban.empty_cells():
+                ban.put(cell, color)
+                expected = ban.is_fail()
+                ban.remove(cell)
+                self.assertEqual(ban.would_fail(cell, color), expected, (cell.get(), color))
+
+    def test_fail_num_one(self):
+        ban = Ban(_SIZE, 3, _MARGIN, 1, self.ban.backend)
+        ban.put(Cell(1, 1), 1)
+        self.assertTrue(ban.would_fail(Cell(0, 0), 2))
+        self.assertEqual(ban.forbidden_num(2), 8)
+        self.assertEqual(ban.safe_cells(2), [])
+        self.assertFalse(ban.has_safe_cell(2))
+
+    def test_empty_cells(self):
+        ban = Ban(_SIZE, 3, _MARGIN, _FAIL_NUM, self.ban.backend)
+        ban.put(Cell(0, 1), 1)
+        ban.put(Cell(2, 2), 2)
+        self.assertEqual([cell.get() for cell in ban.empty_cells()],
+                         [(0, 0), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1)])
+
+    def test_place(self):
+        ban = self.ban
+        self.assertEqual(ban.place(Cell(1, 3), 1).state, PutState.Continue)
+        self.assertEqual(ban.place(Cell(1, 3), 2).state, PutState.Occupied)
+        self.assertEqual(ban.place(Cell(2, 2), 1).state, PutState.Continue)
+        self.assertEqual(ban.place(Cell(3, 2), 2).state, PutState.Continue)
+        result = ban.place(Cell(3, 1), 1)
+        self.assertEqual(result.state, PutState.Fail)
+        self.assertEqual([c.get() for c in result.line], [(1, 3), (2, 2), (3, 1)])
+        self.assertTrue(ban.is_fail())
+
+    def test_place_middle(self):
+        ban = self.ban
+        ban.place(Cell(4, 3), 2)
+        ban.place(Cell(4, 5), 2)
+        result = ban.place(Cell(4, 4), 2)
+        self.assertEqual(result.state, PutState.Fail)
+        self.assertEqual([c.get() for c in result.line], [(4, 3), (4, 4), (4, 5)])
+
+    def test_place_success(self):
+        ban = Ban(_SIZE, 2, _MARGIN, _FAIL_NUM)
+        self.assertEqual(ban.place(Cell(0, 0), 1).state, PutState.Continue)
+        self.assertEqual(ban.place(Cell(0, 1), 1).state, PutState.Continue)
+        self.assertEqual(ban.place(Cell(1, 0), 1).state, PutState.Continue)
+        self.assertEqual(ban.place(Cell(1, 1), 1).state, PutState.Success)
+
+
+class TestBitBan(TestBan):
+
+    def setUp(self):
+        self.ban = Ban(_SIZE, _CELL_NUM, _MARGIN, _FAIL_NUM, BanBackend.Bit)
+
+    def test_backend(self):
+        self.assertEqual(self.ban.backend, BanBackend.Bit)
+        self.assertIsInstance(self.ban._cells, BitCells)
+
+    def test_no_wrap(self):
+        ban = self.ban
+        # 行の端をまたぐ並びは失敗にならない
+        ban.put(Cell(0, _CELL_NUM - 1), 1)
+        ban.put(Cell(1, 0), 1)
+        ban.put(Cell(1, 1), 1)
+        self.assertFalse(ban.is_fail())
+        ban.put(Cell(2, _CELL_NUM - 1), 2)
+        ban.put(Cell(3, _CELL_NUM - 2), 2)
+        ban.put(Cell(4, 0), 2)
+        self.assertFalse(ban.is_fail())
+
+    def test_get_after_overwrite(self):
+        cells = BitCells(_CELL_NUM, _FAIL_NUM)
+        cells.set(2, 3, 1)
+        cells.set(2, 3, 4)
+        self.assertEqual(cells.get(2, 3), 4)
+        cells.set(2, 3, 0)
+        self.assertEqual(cells.get(2, 3), 0)
+
+
+class TestSparseBan(TestBan):
+
+    def setUp(self):
+        self.ban = Ban(_SIZE, _CELL_NUM, _MARGIN, _FAIL_NUM, BanBackend.Sparse)
+
+    def test_backend(self):
+        self.assertEqual(self.ban.backend, BanBackend.Sparse)
+        self.assertIsInstance(self.ban._cells, SparseCells)
+
+    def test_no_wrap(self):
+        ban = self.ban
+        # 行の端をまたぐ並びは失敗にならない
+        ban.put(Cell(0, _CELL_NUM - 1), 1)
+        ban.put(Cell(1, 0), 1)
+        ban.put(Cell(1, 1), 1)
+        self.assertFalse(ban.is_fail())
+        ban.put(Cell(1, _CELL_NUM - 1), 2)
+        ban.put(Cell(2, 0), 2)
+        ban.put(Cell(3, 1), 2)
+        self.assertFalse(ban.is_fail())
+
+    def test_large_board(self):
+        cell_num = 5000
+        ban = Ban(_SIZE, cell_num, _MARGIN, _FAIL_NUM, BanBackend.Sparse)
+        self.assertEqual(ban.empty_num, cell_num * cell_num)
+        self.assertEqual(ban.place(Cell(4000, 4000), 1).state, PutState.Continue)
+        self.assertEqual(ban.place(Cell(4001, 3999), 1).state, PutState.Continue)
+        self.assertTrue(ban.would_fail(Cell(4002, 3998), 1))
+        self.assertFalse(ban.is_fail())
+        self.assertEqual(ban._cells.stone_num, 2)
+        self.assertEqual(ban.stone_num, 2)
+        self.assertEqual(ban.empty_num, cell_num * cell_num - 2)
+        self.assertNotEqual(ban.zobrist_key, 0)
+        result = ban.place(Cell(3999, 4001), 1)
+        self.assertEqual(result.state, PutState.Fail)
+        self.assertEqual(len(result.line), 3)
+        self.assertTrue(ban.is_fail())
+        ban.remove(Cell(3999, 4001))
+        self.assertFalse(ban.is_fail())
+
+    def test_large_board_empty_cells(self):
+        cell_num = 1000
+        ban = Ban(_SIZE, cell_num, _MARGIN, _FAIL_NUM, BanBackend.Sparse)
+        ban.put(Cell(0, 0), 1)
+        ban.put(Cell(999, 999), 2)
+        cells = ban.empty_cells()
+        self.assertEqual(len(cells), cell_num * cell_num - 2)
+        self.assertEqual(cells[0].get(), (0, 1))
+        self.assertEqual(cells[-1].get(), (999, 998))
+
+    def test_hashed_zobrist(self):
+        table = get_zobrist_table(5000)
+        self.assertIs(table, get_zobrist_table(5000))
+        self.assertEqual(table[123], get_zobrist_table(5000)[123])
+        self.assertNotEqual(table[123], table[124])
+
 
 class TestSequenceCounter(unittest.TestCase):
 
@@ -0,0 +1,79 @@
+import random
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sanmoku.src.values import Cell
+
+#: 盤の大きさ
+_SIZE = 400
+#: 盤の余白
+_MARGIN = 10
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        from sanmoku.src import batch
+        from sanmoku.src.ban import Ban
+        self.batch = batch
+        self.Ban = Ban
+
+    def test_evaluate(self):
+        boards = np.zeros((4, 5, 5), dtype=np.uint8)
+        boards[1, 0, 0:3] = 1
+        boards[2, 1:4, 4] = 2
+        boards[3] = [[(row + 2 * column) % 4 + 1 for column in range(5)] for row in range(5)]
+        result = self.batch.evaluate(boards, 3, with_mask=True)
+        self.assertEqual(result.fail.tolist(), [False, True, True, False])
+        self.assertEqual(result.success.tolist(), [False, False, False, True])
+        self.assertEqual(result.fail_mask[1].sum(), 3)
+        self.assertTrue(result.fail_mask[2, 1:4, 4].all())
+
+    def test_evaluate_diagonal_left(self):
+        boards = np.zeros((1, 5, 5), dtype=np.uint8)
+        for d in range(4):
+            boards[0, d, 4 - d] = 3
+        result = self.batch.evaluate(boards, 4, with_mask=True)
+        self.assertTrue(result.fail[0])
+        self.assertEqual(result.fail_mask[0].sum(), 4)
+
+    def test_evaluate_empty(self):
+        boards = np.zeros((0, 5, 5), dtype=np.uint8)
+        result = self.batch.evaluate(boards, 3, with_mask=True)
+        self.assertEqual(result.fail.shape, (0,))
+        self.assertEqual(result.success.shape, (0,))
+        self.assertEqual(result.fail_mask.shape, (0, 5, 5))
+        self.assertEqual(self.batch.bans_to_array([], 5).shape, (0, 5, 5))
+        self.assertEqual(self.batch.evaluate(self.batch.bans_to_array([]), 3).fail.shape, (0,))
+
+    def test_same_as_ban(self):
+        rand = random.Random(0)
+        for fail_num in (2, 3, 4):
+            bans = []
+            for _ in range(50):
+                ban = self.Ban(_SIZE, 6, _MARGIN, fail_num)
+                for _ in range(rand.randint(0, 36)):
+                    ban.put(Cell(rand.randrange(6), rand.randrange(6)), rand.randint(1, 4))
+                bans.append(ban)
+            result = self.batch.evaluate(self.batch.bans_to_array(bans), fail_num)
+            self.assertEqual(result.fail.tolist(), [ban.is_fail() for ban in bans])
+            self.assertEqual(result.success.tolist(), [ban.is_success() for ban in bans])
+
+    def test_convert(self):
+        ban = self.Ban(_SIZE, 4, _MARGIN, 3)
+        ban.put(Cell(1, 2), 3)
+        ban.put(Cell(3, 0), 4)
+        boards = self.batch.bans_to_array([ban])
+        self.assertEqual(boards.shape, (1, 4, 4))
+        (restored,) = self.batch.array_to_bans(boards, _SIZE, _MARGIN, 3)
+        self.assertEqual(restored.to_list(), ban.to_list())
+        self.assertEqual(restored.empty_num, ban.empty_num)
+
+
+if __name__ == "__main__":
+    unittest.main()
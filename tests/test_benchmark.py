@@ -0,0 +1,34 @@
+import unittest
+
+from sanmoku.src.benchmark import CASES, compare, measure, percentile
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_percentile(self):
+        samples = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(percentile(samples, 50), 3.0)
+        self.assertEqual(percentile(samples, 100), 5.0)
+        self.assertEqual(percentile(samples, 1), 1.0)
+        with self.assertRaises(ValueError):
+            percentile([], 50)
+
+    def test_measure(self):
+        for case in CASES:
+            result = measure(case, 3, repeat=2, warmup=1)
+            self.assertEqual(len(result.samples), 2)
+            self.assertIn('p99', result.to_dict())
+
+    def test_compare(self):
+        baseline = [{'name': 'ban.put', 'cell_num': 9, 'p50': 1.0},
+                    {'name': 'ban.get', 'cell_num': 9, 'p50': 1.0}]
+        results = [{'name': 'ban.put', 'cell_num': 9, 'p50': 1.2},
+                   {'name': 'ban.get', 'cell_num': 9, 'p50': 1.05},
+                   {'name': 'ban.new', 'cell_num': 9, 'p50': 9.0}]
+        regressions = compare(results, baseline, 0.1)
+        self.assertEqual([regression.key for regression in regressions], ['ban.put[9]'])
+        self.assertAlmostEqual(regressions[0].ratio, 1.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+
+from sanmoku.src.build_bundle import build, build_bundle, find_modules, measure_import
+
+
+class TestBuildBundle(unittest.TestCase):
+
+    def setUp(self):
+        self._work = tempfile.TemporaryDirectory()
+        self.addCleanup(self._work.cleanup)
+        self.output = self._work.name
+
+    def test_find_modules(self):
+        modules = find_modules()
+        self.assertEqual(modules[0], 'pyscript_app')
+        for name in ('game', 'ban', 'values', 'pyscript_view', 'pyscript_controller', 'recording'):
+            self.assertIn(name, modules)
+        # ブラウザの外のものや pygame 版は含めない
+        for name in ('js', 'pyodide', 'pygame_view', 'simulator', 'build_bundle'):
+            self.assertNotIn(name, modules)
+
+    def test_build_bundle(self):
+        bundle = build_bundle(self.output)
+        with zipfile.ZipFile(bundle.path) as archive:
+            names = set(archive.namelist())
+        for name in bundle.modules:
+            self.assertIn(f'{name}.pyc', names)
+            self.assertIn(f'{name}.py', names)
+        self.assertEqual(bundle.size, os.path.getsize(bundle.path))
+
+    def test_build_bundle_without_source(self):
+        bundle = build_bundle(self.output, with_source=False)
+        with zipfile.ZipFile(bundle.path) as archive:
+            self.assertTrue(all(name.endswith('.pyc') for name in archive.namelist()))
+
+    def test_reproducible(self):
+        first = build_bundle(os.path.join(self.output, 'a'))
+        second = build_bundle(os.path.join(self.output, 'b'))
+        with open(first.path, 'rb') as f1, open(second.path, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_build(self):
+        build(self.output)
+        with open(os.path.join(self.output, 'index.html'), encoding='utf-8') as f:
+            html = f.read()
+        self.assertIn('- sanmoku.zip', html)
+        self.assertNotIn('- game.py', html)
+        self.assertIn('<py-script src="boot.py">', html)
+        with open(os.path.join(self.output, 'boot.py'), encoding='utf-8') as f:
+            self.assertIn("sys.path.insert(0, 'sanmoku.zip')", f.read())
+
+    def test_import_from_bundle(self):
+        bundle = build_bundle(self.output, with_source=False)
+        # 起動時に使わない重いモジュールは読み込まない
+        code = ('import sys; sys.path.insert(0, sys.argv[1]); import game; '
+                'print(game.__file__); '
+                "print(sorted({'numpy', 'recording', 'asyncio', 'json'} & set(sys.modules)))")
+        result = subprocess.run(
+            [sys.executable, '-I', '-B', '-c', code, bundle.path], capture_output=True, text=True, check=True)
+        (path, lazy) = result.stdout.splitlines()
+        self.assertTrue(path.startswith(bundle.path))
+        self.assertEqual(lazy, '[]')
+
+    def test_measure_import(self):
+        bundle = build_bundle(self.output)
+        timing = measure_import('bundle', bundle.path, 2)
+        self.assertEqual(len(timing.samples), 2)
+        self.assertTrue(all(sec > 0.0 for sec in timing.samples))
+        self.assertGreater(timing.module_num, len(bundle.modules))
+        self.assertIn('p99', str(timing))
+        with self.assertRaises(ValueError):
+            measure_import('bundle', bundle.path, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import typing as tp
+import unittest
+
+from sanmoku.src.ban import Ban
+from sanmoku.src.canonical import Canonicalizer, make_transforms
+from sanmoku.src.values import Cell
+
+
+def _rotate(board: bytes, cell_num: int) -> bytes:
+    """時計回りに90度回転する."""
+    return bytes(
+        board[(cell_num - 1 - column) * cell_num + row]
+        for row in range(cell_num)
+        for column in range(cell_num))
+
+
+class TestCanonical(unittest.TestCase):
+
+    def test_transforms(self):
+        transforms = make_transforms(3)
+        self.assertEqual(len(transforms), 8)
+        self.assertEqual(transforms[0], tuple(range(9)))
+        self.assertEqual(len(set(transforms)), 8)
+        for perm in transforms:
+            self.assertEqual(sorted(perm), list(range(9)))
+
+    def test_symmetry(self):
+        canonicalizer = Canonicalizer(3)
+        board = bytes([1, 2, 0,
+                       0, 3, 0,
+                       0, 0, 4])
+        key = canonicalizer.canonical(board)
+        rotated = _rotate(board, 3)
+        self.assertEqual(canonicalizer.canonical(rotated), key)
+        mirrored = bytes(board[row * 3 + 2 - column] for row in range(3) for column in range(3))
+        self.assertEqual(canonicalizer.canonical(mirrored), key)
+
+    def test_color_permutation(self):
+        canonicalizer = Canonicalizer(3)
+        board = bytes([1, 2, 0, 0, 3, 0, 0, 0, 4])
+        swapped = bytes([4, 3, 0, 0, 1, 0, 0, 0, 2])
+        self.assertEqual(canonicalizer.canonical(board), canonicalizer.canonical(swapped))
+        self.assertEqual(canonicalizer.canonical(board, 1), canonicalizer.canonical(swapped, 4))
+        self.assertNotEqual(canonicalizer.canonical(board, 1), canonicalizer.canonical(board, 2))
+
+    def test_distinct(self):
+        canonicalizer = Canonicalizer(3)
+        same = bytes([1, 1, 0, 0, 0, 0, 0, 0, 0])
+        different = bytes([1, 2, 0, 0, 0, 0, 0, 0, 0])
+        self.assertNotEqual(canonicalizer.canonical(same), canonicalizer.canonical(different))
+
+    def test_markers(self):
+        canonicalizer = Canonicalizer(2)
+        key = canonicalizer.canonical(bytes([255, 3, 0, 254]))
+        self.assertIn(255, key)
+        self.assertIn(254, key)
+
+    def test_canonical_masks(self):
+        canonicalizer = Canonicalizer(3)
+
+        def to_masks(board: bytes) -> tp.Tuple[tp.List[int], int]:
+            masks = [0] * 4
+            empty = 0
+            for (index, color) in enumerate(board):
+                if color:
+                    masks[color - 1] |= 1 << index
+                else:
+                    empty |= 1 << index
+            return masks, empty
+
+        board = bytes([1, 2, 0, 0, 3, 0, 0, 0, 4])
+        (key, order) = canonicalizer.canonical_masks(*to_masks(board))
+        self.assertEqual(sorted(order), [0, 1, 2, 3])
+        swapped = bytes([4, 3, 0, 0, 1, 0, 0, 0, 2])
+        (masks, empty) = to_masks(_rotate(swapped, 3))
+        (rotated_key, rotated_order) = canonicalizer.canonical_masks(masks, empty)
+        self.assertEqual(rotated_key, key)
+        # 並べ替えた色は、元の盤面で同じ役割の色を指す
+        self.assertEqual([board.index(order[i] + 1) for i in range(4)],
+                         [swapped.index(rotated_order[i] + 1) for i in range(4)])
+        different = bytes([1, 1, 0, 0, 3, 0, 0, 0, 4])
+        self.assertNotEqual(canonicalizer.canonical_masks(*to_masks(different))[0], key)
+
+    def test_canonical_ban(self):
+        canonicalizer = Canonicalizer(3)
+        ban = Ban(400, 3, 10, 3)
+        ban.put(Cell(0, 0), 2)
+        other = Ban(400, 3, 10, 3)
+        other.put(Cell(2, 2), 3)
+        self.assertEqual(canonicalizer.canonical_ban(ban, 2), canonicalizer.canonical_ban(other, 3))
+        with self.assertRaises(ValueError):
+            canonicalizer.canonical(bytes(4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import itertools
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sanmoku.src.ban import Ban
+from sanmoku.src.values import Cell
+
+#: 盤の大きさ
+_SIZE = 400
+#: 盤の余白
+_MARGIN = 10
+
+
+def _brute_force(cell_num, fail_num, color_num):
+    """全ての塗り方を Ban で判定して数える."""
+    count = 0
+    cells = [Cell(row, column) for row in range(cell_num) for column in range(cell_num)]
+    for colors in itertools.product(range(1, color_num + 1), repeat=len(cells)):
+        ban = Ban(_SIZE, cell_num, _MARGIN, fail_num)
+        for (cell, color) in zip(cells, colors):
+            ban.put(cell, color)
+        count += not ban.is_fail()
+    return count
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestCountColorings(unittest.TestCase):
+
+    def setUp(self):
+        from sanmoku.src import coloring
+        self.coloring = coloring
+
+    def test_all_adjacent(self):
+        # 2x2で2つ並びが失敗なら、4色全て異なる必要がある
+        self.assertEqual(self.coloring.count_colorings(2, 2).count, 4 * 3 * 2 * 1)
+
+    def test_never_fail(self):
+        result = self.coloring.count_colorings(2, 3)
+        self.assertEqual(result.count, 4 ** 4)
+        self.assertEqual(result.density, 1.0)
+
+    def test_always_fail(self):
+        self.assertEqual(self.coloring.count_colorings(3, 1).count, 0)
+        self.assertEqual(self.coloring.count_colorings(3, 2, 3).count, 0)
+
+    def test_brute_force(self):
+        for (cell_num, fail_num, color_num) in ((2, 2, 4), (3, 2, 2), (3, 3, 2), (3, 3, 3)):
+            self.assertEqual(
+                self.coloring.count_colorings(cell_num, fail_num, color_num).count,
+                _brute_force(cell_num, fail_num, color_num),
+                (cell_num, fail_num, color_num))
+
+    def test_known(self):
+        self.assertEqual(self.coloring.count_colorings(3, 3).count, 154632)
+        self.assertEqual(self.coloring.count_colorings(4, 3).count, 982059276)
+        self.assertEqual(self.coloring.count_colorings(4, 4, 2).count, 16688)
+
+    def test_workers(self):
+        # 状態数が少なくてもワーカーに分ける
+        threshold = self.coloring._PARALLEL_STATES
+        self.coloring._PARALLEL_STATES = 1
+        try:
+            result = self.coloring.count_colorings(5, 3, workers=2)
+        finally:
+            self.coloring._PARALLEL_STATES = threshold
+        self.assertEqual(result.count, 61910117206944)
+        self.assertEqual(result.max_states, self.coloring.count_colorings(5, 3).max_states)
+
+    def test_six(self):
+        self.assertEqual(self.coloring.count_colorings(6, 3).count, 39412391428033195632)
+
+    def test_expand_row(self):
+        # 1行目は色の付け直しで、先頭が1色目になる
+        states = self.coloring.expand_row([((0, 0, 0), 1)], 0, 3, 3)
+        self.assertEqual(sum(states.values()), 4 ** 3 - 4)
+        self.assertTrue(all(state[0] // 27 in (0, 1) for state in states))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.coloring.count_colorings(0, 3)
+        with self.assertRaises(ValueError):
+            self.coloring.count_colorings(3, 3, workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from sanmoku.src.draw_commands import DrawCommandBuffer, MockExecutor
+
+
+class TestDrawCommandBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = DrawCommandBuffer()
+        self.target = self.buffer.add_object('ctx')
+        self.executor = MockExecutor()
+
+    def test_lines_batched(self):
+        self.buffer.target(self.target)
+        for x in range(10):
+            self.buffer.line((x, 0), (x, 100), 'black', 2)
+        self.assertTrue(self.buffer.flush(self.executor))
+        self.assertEqual(self.executor.execute_num, 1)
+        self.assertEqual(self.executor.count('beginPath'), 1)
+        self.assertEqual(self.executor.count('stroke'), 1)
+        self.assertEqual(self.executor.count('lineTo'), 10)
+        self.assertIn((self.target, 'lineWidth', (2.0,)), self.executor.calls)
+
+    def test_circles_grouped_by_color(self):
+        self.buffer.target(self.target)
+        for x in range(6):
+            self.buffer.circle((x * 10, 5), 3, 'red' if x % 2 else 'blue')
+        self.buffer.flush(self.executor)
+        self.assertEqual(self.executor.count('fill'), 2)
+        self.assertEqual(self.executor.count('arc'), 6)
+        self.assertEqual(self.executor.count('fillStyle'), 2)
+
+    def test_order_kept(self):
+        self.buffer.target(self.target)
+        self.buffer.circle((1, 1), 3, 'red')
+        self.buffer.fill_rect(0, 0, 10, 10, 'white')
+        self.buffer.circle((2, 2), 3, 'red')
+        self.buffer.flush(self.executor)
+        names = [name for (_, name, _) in self.executor.calls if name in ('fill', 'fillRect')]
+        self.assertEqual(names, ['fill', 'fillRect', 'fill'])
+
+    def test_text_and_styles(self):
+        self.buffer.target(self.target)
+        self.buffer.text('Time:1', (1, 2), '30px sans-serif', 'black')
+        self.buffer.text('Next', (3, 4), '30px sans-serif', 'black')
+        self.buffer.flush(self.executor)
+        self.assertEqual(self.executor.count('font'), 1)
+        self.assertEqual(self.executor.count('fillStyle'), 1)
+        self.assertIn((self.target, 'fillText', ('Next', 3.0, 4.0)), self.executor.calls)
+
+    def test_strings_per_frame(self):
+        # 毎フレーム変わるテキストでも、渡す文字列の表は伸びない
+        for frame in range(100):
+            self.buffer.target(self.target)
+            self.buffer.text(f'Time:{frame}', (1, 2), '30px sans-serif', 'black')
+            self.buffer.flush(self.executor)
+            self.assertEqual(self.executor.string_num, 3)
+        self.assertIn((self.target, 'fillText', ('Time:99', 1.0, 2.0)), self.executor.calls)
+
+    def test_targets_and_images(self):
+        other = self.buffer.add_object('other')
+        self.buffer.target(other)
+        self.buffer.clear_rect(0, 0, 5, 5)
+        self.buffer.target(self.target)
+        self.buffer.draw_image(other, 0, 0)
+        self.buffer.flush(self.executor)
+        self.assertEqual(self.executor.calls, [
+            (other, 'clearRect', (0.0, 0.0, 5.0, 5.0)),
+            (self.target, 'drawImage', (other, 0.0, 0.0)),
+        ])
+
+    def test_flush_empty(self):
+        self.assertFalse(self.buffer.flush(self.executor))
+        self.assertEqual(self.executor.execute_num, 0)
+        self.buffer.target(self.target)
+        self.buffer.fill_rect(0, 0, 1, 1, 'red')
+        self.buffer.flush(self.executor)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(self.buffer.flush_num, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from sanmoku.src.event_log import (
+    EventLog, EventType, JsonLinesSink, Level, RingBufferSink, StdoutSink)
+from sanmoku.src.game import GameModel, InputState, OperationParam, Position, VirtualKey
+
+
+class TestEventLog(unittest.TestCase):
+
+    def test_disabled_without_sink(self):
+        log = EventLog(Level.Debug)
+        self.assertFalse(log.enabled(Level.Warning))
+        sink = RingBufferSink()
+        log.add_sink(sink)
+        self.assertTrue(log.enabled(Level.Debug))
+        log.remove_sink(sink)
+        self.assertFalse(log.enabled(Level.Warning))
+
+    def test_level(self):
+        sink = RingBufferSink()
+        log = EventLog(Level.Info, [sink])
+        log.emit(Level.Debug, EventType.Placed, row=0)
+        log.emit(Level.Info, EventType.Placed, row=1)
+        self.assertEqual([event.fields['row'] for event in sink.events], [1])
+        log.level = Level.Off
+        log.emit(Level.Warning, EventType.Placed, row=2)
+        self.assertEqual(len(sink), 1)
+
+    def test_ring_buffer(self):
+        sink = RingBufferSink(capacity=2)
+        log = EventLog(Level.Info, [sink])
+        for row in range(3):
+            log.emit(Level.Info, EventType.Placed, row=row)
+        self.assertEqual([event.fields['row'] for event in sink.events], [1, 2])
+
+    def test_stdout(self):
+        stream = io.StringIO()
+        log = EventLog(Level.Info, [StdoutSink(stream)])
+        log.emit(Level.Info, EventType.Succeeded, time=1.5)
+        self.assertEqual(stream.getvalue(), '[Info] Succeeded time=1.5\n')
+
+    def test_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            with JsonLinesSink(path, batch_lines=2) as sink:
+                log = EventLog(Level.Info, [sink])
+                log.emit(Level.Info, EventType.Placed, row=0)
+                self.assertEqual(os.path.getsize(path), 0)
+                log.emit(Level.Info, EventType.Placed, row=1)
+                log.emit(Level.Info, EventType.Failed, row=2)
+                with open(path, encoding='utf-8') as f:
+                    self.assertEqual(len(f.readlines()), 2)
+            with open(path, encoding='utf-8') as f:
+                events = [json.loads(line) for line in f]
+        self.assertEqual([event['row'] for event in events], [0, 1, 2])
+        self.assertEqual(events[2]['type'], 'Failed')
+
+
+class TestGameModelEvents(unittest.TestCase):
+
+    def test_events(self):
+        sink = RingBufferSink()
+        model = GameModel(400, 9, 10, 3, log=EventLog(Level.Info, [sink]))
+        for x, y in ((0, 0), (30, 30)):
+            model.operate(OperationParam(VirtualKey.MouseLeft, InputState.Press, Position(x, y)))
+            model.operate(OperationParam(VirtualKey.MouseLeft, InputState.Release))
+        types = [event.type.name for event in sink.events]
+        self.assertEqual(types, ['Created', 'Placed'])
+        placed = sink.events[1].fields
+        self.assertEqual((placed['row'], placed['column']), (0, 0))
+        self.assertEqual(placed['color'], model.ban.to_list()[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
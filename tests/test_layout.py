@@ -0,0 +1,55 @@
+import unittest
+
+from sanmoku.src.layout import BoardLayout, get_layout
+
+
+class TestBoardLayout(unittest.TestCase):
+
+    def test_hit(self):
+        layout = BoardLayout(400, 9, 10)
+        self.assertEqual(layout.cell_size, 42)
+        self.assertEqual(layout.hit(10, 10), (0, 0))
+        self.assertEqual(layout.hit(51, 10), (0, 0))
+        self.assertEqual(layout.hit(52, 10), (0, 1))
+        self.assertEqual(layout.hit(10, 52), (1, 0))
+        self.assertEqual(layout.hit(387, 387), (8, 8))
+        self.assertEqual(layout.hit(10.5, 51.9), (0, 0))
+
+    def test_hit_outside(self):
+        layout = BoardLayout(400, 9, 10)
+        self.assertIsNone(layout.hit(9, 10))
+        self.assertIsNone(layout.hit(10, 9))
+        self.assertIsNone(layout.hit(388, 10))
+        self.assertIsNone(layout.hit(-1, -1))
+        self.assertIsNone(layout.hit(1000, 1000))
+
+    def test_hit_matches_formula(self):
+        for (size, cell_num, margin) in ((400, 9, 10), (300, 7, 3), (100, 3, 0)):
+            layout = BoardLayout(size, cell_num, margin)
+            cell_size = int((size - margin * 2) / cell_num)
+            for v in range(-1, size + 1):
+                index = (v - margin) // cell_size
+                expected = index if v >= margin and index < cell_num else None
+                cell = layout.hit(v, margin)
+                self.assertEqual(cell.column if cell is not None else None, expected, (size, cell_num, margin, v))
+
+    def test_center(self):
+        layout = BoardLayout(400, 9, 10)
+        pitch = 380 / 9
+        self.assertEqual(layout.center(0, 0), (10 + pitch / 2, 10 + pitch / 2))
+        self.assertEqual(layout.center(1, 2), (10 + pitch * 2.5, 10 + pitch * 1.5))
+
+    def test_lines(self):
+        layout = BoardLayout(400, 9, 10)
+        self.assertEqual(len(layout.lines), 20)
+        self.assertEqual(layout.lines[0], ((10, 10), (10, 390)))
+        self.assertEqual(layout.lines[10], ((10, 10), (390, 10)))
+        self.assertAlmostEqual(layout.lines[9][0][0], 390)
+
+    def test_get_layout(self):
+        self.assertIs(get_layout(400, 9, 10), get_layout(400, 9, 10))
+        self.assertIsNot(get_layout(400, 9, 10), get_layout(400, 8, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
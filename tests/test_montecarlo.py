@@ -0,0 +1,142 @@
+import random
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sanmoku.src.ban import Ban
+from sanmoku.src.montecarlo import (
+    HintEngine, MonteCarloPlayer, Search, make_montecarlo_strategy, montecarlo_strategy)
+from sanmoku.src.simulator import play_game
+from sanmoku.src.values import Cell
+
+#: 盤の大きさ
+_SIZE = 400
+#: 盤の余白
+_MARGIN = 10
+
+
+def _make_ban(cell_num, stones):
+    ban = Ban(_SIZE, cell_num, _MARGIN, 3)
+    for ((row, column), color) in stones:
+        ban.put(Cell(row, column), color)
+    return ban
+
+
+class TestSearch(unittest.TestCase):
+
+    def test_candidates(self):
+        # (0, 2) に1を置くと横に3つ並ぶ
+        ban = _make_ban(3, [((0, 0), 1), ((0, 1), 1)])
+        search = Search(ban.to_list(), 3, 1, seed=0)
+        self.assertEqual(len(search.candidates), 6)
+        self.assertNotIn((0, 2), [cell.get() for cell in search.candidates])
+
+    def test_run(self):
+        ban = _make_ban(4, [((0, 0), 1), ((1, 1), 2)])
+        search = Search(ban.to_list(), 3, 3, seed=0)
+        done = search.run(0.01)
+        self.assertGreater(done, 0)
+        self.assertEqual(search.rollouts, done)
+        for (_, value) in search.results():
+            self.assertTrue(0.0 <= value <= 1.0)
+        # プレイアウトの後は盤面が元に戻っている
+        self.assertEqual(len(Search(ban.to_list(), 3, 3).candidates), len(search.candidates))
+        self.assertIn(search.best_cell(), search.candidates)
+
+    def test_no_choice(self):
+        ban = _make_ban(2, [((0, 0), 1), ((0, 1), 2), ((1, 0), 3)])
+        search = Search(ban.to_list(), 3, 1, seed=0)
+        self.assertEqual(search.run(1.0), 0)
+        self.assertEqual(search.best_cell(), (1, 1))
+
+        full = _make_ban(2, [((0, 0), 1), ((0, 1), 2), ((1, 0), 3), ((1, 1), 4)])
+        self.assertIsNone(Search(full.to_list(), 3, 1).best_cell())
+
+    def test_merge(self):
+        ban = _make_ban(3, [])
+        search = Search(ban.to_list(), 3, 1, seed=0)
+        other = Search(ban.to_list(), 3, 1, seed=1)
+        other.run(0.01)
+        search.merge(other.totals, other.counts)
+        self.assertEqual(search.rollouts, other.rollouts)
+        with self.assertRaises(ValueError):
+            search.merge([0.0], [1])
+
+
+class TestMonteCarloPlayer(unittest.TestCase):
+
+    def test_best_cell(self):
+        ban = _make_ban(3, [((0, 0), 1), ((0, 1), 1)])
+        with MonteCarloPlayer(0.01, seed=0) as player:
+            cell = player.best_cell(ban, 1)
+        self.assertIsNotNone(cell)
+        self.assertFalse(ban.would_fail(cell, 1))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            MonteCarloPlayer(0.0)
+        with self.assertRaises(ValueError):
+            MonteCarloPlayer(workers=0)
+
+    def test_strategy(self):
+        record = play_game(3, 3, montecarlo_strategy, random.Random(0))
+        self.assertGreater(record.moves, 0)
+
+    def test_make_strategy(self):
+        strategy = make_montecarlo_strategy(0.001)
+        for seed in range(2):
+            record = play_game(3, 3, strategy, random.Random(seed))
+            self.assertGreater(record.moves, 0)
+
+
+class TestHintEngine(unittest.TestCase):
+
+    def _wait(self, hint):
+        for _ in range(1000):
+            cell = hint.poll()
+            if not hint.pending:
+                return cell
+            time.sleep(0.001)
+        self.fail('hint did not finish')
+
+    def test_slice(self):
+        ban = _make_ban(4, [((0, 0), 1), ((0, 1), 1)])
+        hint = HintEngine(0.02, slice_sec=0.002, seed=0)
+        self.assertIsNone(hint.poll())
+        hint.request(ban, 1)
+        self.assertTrue(hint.pending)
+        cell = self._wait(hint)
+        self.assertIsNotNone(cell)
+        self.assertEqual(hint.hint, cell)
+        self.assertFalse(ban.would_fail(cell, 1))
+
+        hint.cancel()
+        self.assertIsNone(hint.hint)
+        self.assertFalse(hint.pending)
+
+    def test_slice_time(self):
+        # executor が無いときは、1回の poll で slice_sec より長く考えない
+        ban = _make_ban(5, [((0, 0), 1), ((1, 1), 2)])
+        slice_sec = 0.02
+        hint = HintEngine(0.1, slice_sec=slice_sec, seed=0)
+        hint.request(ban, 1)
+        durations = []
+        while hint.pending:
+            start = time.monotonic()
+            hint.poll()
+            durations.append(time.monotonic() - start)
+        self.assertGreater(len(durations), 1)
+        self.assertLess(max(durations), slice_sec)
+        self.assertIsNotNone(hint.hint)
+
+    def test_executor(self):
+        ban = _make_ban(4, [((0, 0), 1), ((0, 1), 1)])
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            hint = HintEngine(0.01, executor=executor, seed=0)
+            hint.request(ban, 1)
+            cell = self._wait(hint)
+        self.assertFalse(ban.would_fail(cell, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import unittest
+
+from sanmoku.src.profiler import Histogram, Profiler
+
+
+class _Clock:
+    """呼ぶたびに1ミリ秒進む時計."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+class _Target:
+
+    def __init__(self):
+        self.calls = 0
+
+    def work(self, value):
+        self.calls += 1
+        return value * 2
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_stats(self):
+        histogram = Histogram(capacity=100)
+        for i in range(1, 101):
+            histogram.add(i / 1000)
+        stats = histogram.stats('x')
+        self.assertEqual(stats.name, 'x')
+        self.assertEqual(stats.count, 100)
+        self.assertAlmostEqual(stats.mean, 0.0505)
+        self.assertAlmostEqual(stats.max, 0.1)
+        self.assertTrue(stats.p50 <= stats.p99 <= stats.max)
+
+    def test_rolling(self):
+        histogram = Histogram(capacity=3)
+        for sec in (1.0, 1.0, 1.0, 1e-6, 1e-6, 1e-6):
+            histogram.add(sec)
+        self.assertEqual(len(histogram), 3)
+        self.assertAlmostEqual(histogram.stats().max, 1e-6)
+        counts = [count for (_, count) in histogram.buckets()]
+        self.assertEqual(sum(counts), 3)
+        self.assertEqual(counts[0], 3)
+
+    def test_buckets(self):
+        histogram = Histogram()
+        histogram.add(100.0)
+        (edge, count) = histogram.buckets()[-1]
+        self.assertEqual((edge, count), (float('inf'), 1))
+
+    def test_empty(self):
+        self.assertEqual(Histogram().stats().count, 0)
+        with self.assertRaises(ValueError):
+            Histogram(0)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_attach(self):
+        profiler = Profiler(clock=_Clock())
+        target = _Target()
+        profiler.attach(target, 'work')
+        self.assertEqual(target.work(1), 2)
+        self.assertEqual(profiler.stats(), [])
+
+        profiler.enabled = True
+        self.assertIn('work', vars(target))
+        self.assertEqual(target.work(2), 4)
+        self.assertEqual(target.work(3), 6)
+        [stats] = profiler.stats()
+        self.assertEqual((stats.name, stats.count), ('_Target.work', 2))
+        self.assertAlmostEqual(stats.mean, 0.001)
+
+        self.assertFalse(profiler.toggle())
+        self.assertNotIn('work', vars(target))
+        self.assertEqual(target.work(4), 8)
+        self.assertEqual(profiler.stats()[0].count, 2)
+        self.assertEqual(target.calls, 4)
+
+    def test_attach_enabled(self):
+        profiler = Profiler(clock=_Clock())
+        profiler.enabled = True
+        target = _Target()
+        profiler.attach(target, 'work', 'custom')
+        target.work(1)
+        self.assertEqual(profiler.stats()[0].name, 'custom')
+
+    def test_section(self):
+        profiler = Profiler(clock=_Clock())
+        with profiler.section('frame'):
+            pass
+        self.assertEqual(profiler.trace_num, 0)
+        profiler.enabled = True
+        with profiler.section('frame'):
+            with profiler.section('inner'):
+                pass
+        self.assertEqual([stats.name for stats in profiler.stats()], ['inner', 'frame'])
+        self.assertEqual(profiler.trace_num, 2)
+
+    def test_trace(self):
+        profiler = Profiler(trace_capacity=2, clock=_Clock())
+        profiler.enabled = True
+        for _ in range(3):
+            with profiler.section('frame'):
+                pass
+        events = profiler.trace_events()
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]['ph'], 'X')
+        self.assertAlmostEqual(events[0]['dur'], 1000.0)
+        self.assertLess(events[0]['ts'], events[1]['ts'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.json')
+            self.assertEqual(profiler.dump_trace(path), 2)
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        self.assertEqual(len(data['traceEvents']), 2)
+
+        profiler.clear()
+        self.assertEqual((profiler.trace_num, profiler.stats()), (0, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
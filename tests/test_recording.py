@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from sanmoku.src.game import GameModel, InputState, OperationParam, Position, VirtualKey
+from sanmoku.src.recording import GameRecorder, GameResult, RecordFile, RecordWriter
+
+
+class TestRecording(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'games.rec')
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def test_write_and_read(self):
+        games = []
+        for i in range(3):
+            recorder = GameRecorder(9, 3)
+            for n in range(i + 2):
+                recorder.add(n, 8 - n, n % 4 + 1, n * 1.5)
+            recorder.finish(GameResult.GameOver if i else GameResult.Success)
+            games.append(recorder)
+        with RecordWriter(self.path) as writer:
+            for recorder in games:
+                writer.write(recorder)
+            self.assertEqual(len(writer), 3)
+
+        with RecordFile(self.path) as record:
+            self.assertEqual(len(record), 3)
+            game = record[2]
+            self.assertEqual((game.cell_num, game.fail_num), (9, 3))
+            self.assertEqual(game.result, GameResult.GameOver)
+            self.assertEqual(game.move_num, 4)
+            move = game.move(3)
+            self.assertEqual((move.row, move.column, move.color, move.sec), (3, 5, 4, 4.5))
+            self.assertEqual(record[0].result, GameResult.Success)
+            self.assertEqual([game.move_num for game in record], [2, 3, 4])
+            with self.assertRaises(IndexError):
+                game.move(4)
+            with self.assertRaises(IndexError):
+                record[3]
+
+    def test_replay(self):
+        recorder = GameRecorder(9, 3)
+        for n in range(5):
+            recorder.add(0, n * 2, n % 2 + 1, 0.0)
+        with RecordWriter(self.path) as writer:
+            writer.write(recorder)
+        with RecordFile(self.path) as record:
+            game = record[0]
+            self.assertEqual(game.replay(0).empty_num, 81)
+            ban = game.replay(3)
+            self.assertEqual(ban.empty_num, 78)
+            self.assertEqual(ban.to_list()[0][:6], [1, 0, 2, 0, 1, 0])
+            self.assertEqual(game.replay().empty_num, 76)
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a record file at all')
+        with self.assertRaises(ValueError):
+            RecordFile(self.path)
+
+    def test_invalid_size(self):
+        for (cell_num, fail_num) in ((0, 3), (256, 3), (9, 0), (9, 256)):
+            with self.assertRaises(ValueError):
+                GameRecorder(cell_num, fail_num)
+        GameRecorder(255, 255)
+
+    def test_game_model(self):
+        recorder = GameRecorder(9, 3)
+        model = GameModel(400, 9, 10, 3, recorder=recorder)
+        for x, y in ((0, 0), (30, 30), (30, 30), (80, 30)):
+            model.operate(OperationParam(VirtualKey.MouseLeft, InputState.Press, Position(x, y)))
+            model.operate(OperationParam(VirtualKey.MouseLeft, InputState.Release))
+        self.assertEqual(recorder.move_num, 2)
+        with RecordWriter(self.path) as writer:
+            writer.write(recorder)
+        with RecordFile(self.path) as record:
+            self.assertEqual(record[0].replay().to_list(), model.ban.to_list())
+
+
+if __name__ == '__main__':
+    unittest.main()
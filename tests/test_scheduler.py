@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+
+from sanmoku.src.game import Timer
+from sanmoku.src.scheduler import FrameScheduler
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, sec: float) -> None:
+        self.now += sec
+
+
+class TestFrameScheduler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.next_update = None
+
+    def _scheduler(self) -> FrameScheduler:
+        return FrameScheduler(lambda: self.next_update, min_interval=0.1, idle_sec=2.0, clock=self.clock)
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            FrameScheduler(min_interval=1.0, idle_sec=0.5)
+
+    def test_delta(self):
+        scheduler = self._scheduler()
+        self.assertEqual(scheduler.begin_frame(), 0.0)
+        self.clock.now += 0.25
+        self.assertAlmostEqual(scheduler.begin_frame(), 0.25)
+
+    def test_idle(self):
+        scheduler = self._scheduler()
+        scheduler.begin_frame()
+        scheduler.end_frame()
+        self.assertAlmostEqual(scheduler.next_delay(), 2.0)
+
+    def test_next_update(self):
+        scheduler = self._scheduler()
+        scheduler.begin_frame()
+        self.clock.now += 0.05
+        scheduler.end_frame()
+        self.next_update = 0.5
+        self.assertAlmostEqual(scheduler.next_delay(), 0.451)
+        # 最短間隔より短くはならない
+        self.next_update = 0.0
+        self.assertAlmostEqual(scheduler.next_delay(), 0.05)
+
+    def test_request_frame(self):
+        scheduler = self._scheduler()
+        scheduler.begin_frame()
+        scheduler.end_frame()
+        scheduler.request_frame()
+        self.assertAlmostEqual(scheduler.next_delay(), 0.1)
+        scheduler.begin_frame()
+        self.assertAlmostEqual(scheduler.next_delay(), 2.0)
+
+    def test_run(self):
+        scheduler = self._scheduler()
+        timer = Timer()
+        timer.start()
+        self.next_update = None
+        deltas = []
+
+        def step(delta: float) -> bool:
+            deltas.append(delta)
+            timer.update(delta)
+            self.next_update = timer.time_to_next_sec()
+            return len(deltas) < 4
+
+        scheduler.run(step, self.clock.sleep)
+        # 秒が変わるときだけ起きる
+        self.assertEqual(len(deltas), 4)
+        self.assertEqual(timer.get_int(), 3)
+        self.assertEqual(scheduler.frames, 3)
+        self.assertEqual(scheduler.stats().frames, 3)
+
+    def test_run_async_wake(self):
+        scheduler = FrameScheduler(min_interval=0.0, idle_sec=60.0)
+        frames = []
+
+        def step(delta: float) -> bool:
+            frames.append(delta)
+            return len(frames) < 2
+
+        async def main():
+            task = asyncio.ensure_future(scheduler.run_async(step))
+            await asyncio.sleep(0.01)
+            scheduler.wake()
+            await asyncio.wait_for(task, 5.0)
+
+        asyncio.run(main())
+        self.assertEqual(len(frames), 2)
+
+
+class TestTimer(unittest.TestCase):
+
+    def test_time_to_next_sec(self):
+        timer = Timer()
+        self.assertIsNone(timer.time_to_next_sec())
+        timer.start()
+        timer.update(1.25)
+        self.assertAlmostEqual(timer.time_to_next_sec(), 0.75)
+        timer.stop()
+        self.assertIsNone(timer.time_to_next_sec())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import unittest
+
+from sanmoku.src.input import InputState, VirtualKey
+from sanmoku.src.loadgen import run
+from sanmoku.src.server import GameServer, ServerConfig, parse_operation
+
+
+class TestParseOperation(unittest.TestCase):
+
+    def test_parse(self):
+        param = parse_operation({'code': 'MouseLeft', 'state': 'Press', 'x': 3, 'y': 4})
+        self.assertEqual(param.code.name, VirtualKey.MouseLeft.name)
+        self.assertEqual(param.state.name, InputState.Press.name)
+        self.assertEqual((param.position.x, param.position.y), (3, 4))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_operation({'code': 'NoSuchKey', 'state': 'Press'})
+        with self.assertRaises(ValueError):
+            parse_operation({'code': 'MouseLeft'})
+        for x in (float('inf'), float('nan'), 'a'):
+            with self.assertRaises(ValueError):
+                parse_operation({'code': 'MouseLeft', 'state': 'Press', 'x': x, 'y': 0})
+
+
+class TestGameServer(unittest.TestCase):
+
+    def _run(self, coroutine_function, **config):
+        async def main():
+            server = GameServer(ServerConfig(port=0, **config))
+            await server.start()
+            try:
+                return await coroutine_function(server)
+            finally:
+                await server.close()
+
+        return asyncio.run(main())
+
+    @staticmethod
+    async def _receive(reader):
+        return json.loads(await reader.readline())
+
+    def test_session(self):
+        async def session(server):
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            hello = await self._receive(reader)
+            self.assertEqual(hello['type'], 'hello')
+            self.assertEqual(hello['cell_num'], 9)
+            state = await self._receive(reader)
+            self.assertEqual(state['mode'], 'WaitStart')
+            self.assertEqual(state['board'], '0' * 81)
+            self.assertEqual(server.session_num, 1)
+
+            writer.write(b'{"seq": 1, "code": "MouseLeft", "state": "Press", "x": 0, "y": 0}\n')
+            state = await self._receive(reader)
+            self.assertEqual((state['ack'], state['mode']), (1, 'InGame'))
+            self.assertNotIn('board', state)
+
+            writer.write(b'{"seq": 2, "code": "MouseLeft", "state": "Release"}\n')
+            await self._receive(reader)
+            writer.write(b'{"seq": 3, "code": "MouseLeft", "state": "Press", "x": 30, "y": 30}\n')
+            state = await self._receive(reader)
+            self.assertEqual(state['ack'], 3)
+            self.assertNotEqual(state['board'][0], '0')
+
+            writer.write(b'not json\n')
+            error = await self._receive(reader)
+            self.assertEqual(error['type'], 'error')
+
+            writer.write(b'{"seq": 4, "code": "MouseLeft", "state": "Press", "x": Infinity, "y": 1e400}\n')
+            error = await self._receive(reader)
+            self.assertEqual((error['type'], error['ack']), ('error', 4))
+            writer.write(b'{"seq": 5, "code": "MouseLeft", "state": "Release"}\n')
+            state = await self._receive(reader)
+            self.assertEqual(state['ack'], 5)
+
+            # 深く入れ子にした行でもセッションは続く
+            writer.write(b'[' * 1000 + b'\n')
+            error = await self._receive(reader)
+            self.assertEqual(error['type'], 'error')
+            writer.write(b'{"seq": 6, "code": "MouseLeft", "state": "Release"}\n')
+            state = await self._receive(reader)
+            self.assertEqual(state['ack'], 6)
+            writer.close()
+
+        self._run(session)
+
+    def test_max_sessions(self):
+        async def session(server):
+            reader1, writer1 = await asyncio.open_connection('127.0.0.1', server.port)
+            await self._receive(reader1)
+            reader2, writer2 = await asyncio.open_connection('127.0.0.1', server.port)
+            error = await self._receive(reader2)
+            self.assertEqual(error['message'], 'server is full')
+            writer1.close()
+            writer2.close()
+
+        self._run(session, max_sessions=1)
+
+    def test_load(self):
+        async def load(server):
+            return await run('127.0.0.1', server.port, 20, 5)
+
+        result = self._run(load)
+        self.assertEqual(result.errors, 0)
+        self.assertGreater(result.moves, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import random
+import unittest
+
+from sanmoku.src.simulator import greedy_strategy, play_game, random_strategy, simulate
+
+
+class TestSimulator(unittest.TestCase):
+
+    def test_play_game(self):
+        record = play_game(4, 3, random_strategy, random.Random(0))
+        self.assertLessEqual(record.moves, 16)
+        self.assertEqual(record.success, record.moves == 16)
+
+    def test_greedy_success(self):
+        # 1マスの盤は必ずクリアできる
+        record = play_game(1, 2, greedy_strategy, random.Random(0))
+        self.assertTrue(record.success)
+        self.assertEqual(record.moves, 1)
+
+    def test_simulate(self):
+        result = simulate(4, 3, 'greedy', 50, seed=1, workers=1)
+        self.assertEqual(result.games, 50)
+        self.assertLessEqual(result.successes, 50)
+        self.assertGreater(result.mean_moves, 0)
+        self.assertGreater(result.games_per_sec, 0)
+
+    def test_simulate_deterministic(self):
+        first = simulate(4, 3, 'random', 30, seed=5, workers=1)
+        second = simulate(4, 3, 'random', 30, seed=5, workers=2)
+        self.assertEqual(first.successes, second.successes)
+        self.assertEqual(first.total_moves, second.total_moves)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            simulate(4, 3, 'unknown', 1, workers=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import time
+import unittest
+
+from sanmoku.src.ban import Ban
+from sanmoku.src.solver import Solver
+from sanmoku.src.values import Cell
+
+#: 盤の大きさ
+_SIZE = 400
+#: 盤の余白
+_MARGIN = 10
+#: 4x4 を最後まで読むときの時間の上限(秒)
+_FULL_SOLVE_SEC = 5.0
+
+
+class TestSolver(unittest.TestCase):
+
+    def test_value_all_adjacent(self):
+        # 2x2で2つ並びが失敗なら、4色全て異なる必要がある
+        solver = Solver(2, 2)
+        ban = Ban(_SIZE, 2, _MARGIN, 2)
+        self.assertAlmostEqual(solver.value(ban), 1.0 * 3 / 4 * 2 / 4 * 1 / 4)
+
+    def test_value_never_fail(self):
+        solver = Solver(2, 3)
+        self.assertEqual(solver.value(Ban(_SIZE, 2, _MARGIN, 3)), 1.0)
+
+    def test_solve(self):
+        solver = Solver(3, 3)
+        ban = Ban(_SIZE, 3, _MARGIN, 3)
+        for (cell, color) in ((Cell(0, 0), 1), (Cell(0, 1), 1), (Cell(1, 0), 2), (Cell(1, 1), 3),
+                              (Cell(2, 0), 3), (Cell(2, 2), 2)):
+            ban.put(cell, color)
+        values = {cell.get(): value for (cell, value) in solver.solve(ban, 1)}
+        self.assertEqual(sorted(values), [(0, 2), (1, 2), (2, 1)])
+        self.assertEqual(values[(0, 2)], 0.0)
+        self.assertGreater(values[(1, 2)], 0.0)
+        self.assertEqual(solver.best_cell(ban, 1).get(), max(values, key=values.get))
+
+    def test_solve_full(self):
+        solver = Solver(2, 3)
+        ban = Ban(_SIZE, 2, _MARGIN, 3)
+        for row in range(2):
+            for column in range(2):
+                ban.put(Cell(row, column), 1)
+        self.assertEqual(solver.solve(ban, 1), [])
+        self.assertIsNone(solver.best_cell(ban, 1))
+
+    def test_depth_limited(self):
+        solver = Solver(9, 3, max_depth=1)
+        ban = Ban(_SIZE, 9, _MARGIN, 3)
+        values = solver.solve(ban, 1)
+        self.assertEqual(len(values), 81)
+        for (_, value) in values:
+            self.assertGreater(value, 0.0)
+            self.assertLessEqual(value, 1.0)
+
+    def test_value_matches_solve(self):
+        # 盤面の価値は、色ごとの最善手の価値の平均になる
+        ban = Ban(_SIZE, 4, _MARGIN, 3)
+        for (cell, color) in ((Cell(0, 0), 1), (Cell(0, 1), 1), (Cell(1, 1), 2), (Cell(2, 2), 2),
+                              (Cell(3, 0), 3), (Cell(1, 3), 4), (Cell(3, 3), 1), (Cell(2, 0), 4)):
+            ban.put(cell, color)
+        solver = Solver(4, 3)
+        best = [max(value for (_, value) in solver.solve(ban, color)) for color in range(1, 5)]
+        self.assertAlmostEqual(solver.value(ban), sum(best) / 4)
+
+    def test_full_4x4(self):
+        # 石が半分埋まった 4x4 は、最後まで読んでも数秒で解ける
+        ban = Ban(_SIZE, 4, _MARGIN, 3)
+        for (row, colors) in enumerate(([1, 4, 0, 0], [0, 2, 0, 0], [1, 3, 0, 3], [0, 0, 4, 2])):
+            for (column, color) in enumerate(colors):
+                if color:
+                    ban.put(Cell(row, column), color)
+        solver = Solver(4, 3)
+        start = time.perf_counter()
+        value = solver.value(ban)
+        self.assertLess(time.perf_counter() - start, _FULL_SOLVE_SEC)
+        self.assertAlmostEqual(value, 0.9720611572265625)
+
+    def test_symmetric_memo(self):
+        # 回転と色の入れ替えで移り合う局面は、メモを共有する
+        solver = Solver(3, 3)
+        ban = Ban(_SIZE, 3, _MARGIN, 3)
+        ban.put(Cell(0, 0), 1)
+        ban.put(Cell(0, 1), 2)
+        value = solver.value(ban)
+        memo_num = solver.memo_num
+        rotated = Ban(_SIZE, 3, _MARGIN, 3)
+        rotated.put(Cell(0, 2), 3)
+        rotated.put(Cell(1, 2), 4)
+        self.assertEqual(solver.value(rotated), value)
+        self.assertEqual(solver.memo_num, memo_num)
+
+    def test_default_table_bounded(self):
+        # 既定の置換表は数十 MB に収まる
+        self.assertLessEqual(Solver(9, 3)._table.capacity, 1 << 20)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Solver(3, 3, max_depth=-1)
+        with self.assertRaises(ValueError):
+            Solver(3, 3).value(Ban(_SIZE, 4, _MARGIN, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import random
+import unittest
+
+from sanmoku.src.game import GameModel, get_next_stone
+from sanmoku.src.stone_stream import StoneStream, _load_numpy
+from sanmoku.src.values import StoneColor
+
+
+class TestStoneStream(unittest.TestCase):
+
+    def test_range(self):
+        stones = StoneStream(0, block=7)
+        for _ in range(50):
+            self.assertTrue(StoneColor.Min <= stones.next() <= StoneColor.Max)
+
+    def test_seed(self):
+        first = [stone for stone, _ in zip(StoneStream(1, block=5), range(20))]
+        second = [stone for stone, _ in zip(StoneStream(1, block=5), range(20))]
+        self.assertEqual(first, second)
+        third = [stone for stone, _ in zip(StoneStream(2, block=5), range(20))]
+        self.assertNotEqual(first, third)
+
+    def test_random_object(self):
+        first = StoneStream(random.Random(3))
+        second = StoneStream(random.Random(3))
+        self.assertEqual([first.next() for _ in range(10)], [second.next() for _ in range(10)])
+
+    def test_game_model(self):
+        first = GameModel(400, 9, 10, 3, stones=StoneStream(5))
+        second = GameModel(400, 9, 10, 3, stones=StoneStream(5))
+        self.assertEqual(first.next_stone, second.next_stone)
+
+    def test_game_model_seed(self):
+        first = GameModel(400, 9, 10, 3, seed=5)
+        second = GameModel(400, 9, 10, 3, seed=random.Random(5))
+        self.assertEqual(first.next_stone, second.next_stone)
+        with self.assertRaises(ValueError):
+            GameModel(400, 9, 10, 3, stones=StoneStream(5), seed=5)
+
+    def test_get_next_stone(self):
+        for _ in range(50):
+            self.assertTrue(StoneColor.Min <= get_next_stone() <= StoneColor.Max)
+
+    def test_invalid_block(self):
+        with self.assertRaises(ValueError):
+            StoneStream(block=0)
+
+    @unittest.skipIf(_load_numpy() is None, 'numpy is not installed')
+    def test_numpy(self):
+        first = StoneStream(4, block=16, use_numpy=True)
+        second = StoneStream(4, block=16, use_numpy=True)
+        stones = [first.next() for _ in range(40)]
+        self.assertEqual(stones, [second.next() for _ in range(40)])
+        self.assertTrue(all(StoneColor.Min <= stone <= StoneColor.Max for stone in stones))
+        self.assertIsInstance(stones[0], int)
+
+
+if __name__ == '__main__':
+    unittest.main()
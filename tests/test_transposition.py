@@ -0,0 +1,76 @@
+import unittest
+
+from sanmoku.src.transposition import Eviction, TranspositionTable
+
+
+class TestTranspositionTable(unittest.TestCase):
+
+    def test_lru(self):
+        table = TranspositionTable(2)
+        table.put('a', 1)
+        table.put('b', 2)
+        self.assertEqual(table.get('a'), 1)
+        table.put('c', 3)
+        self.assertIsNone(table.get('b'))
+        self.assertEqual(table.get('a'), 1)
+        self.assertEqual(table.get('c'), 3)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.stats.hits, 3)
+        self.assertEqual(table.stats.misses, 1)
+        self.assertEqual(table.stats.evictions, 1)
+
+    def test_depth(self):
+        table = TranspositionTable(1, Eviction.Depth)
+        table.put(10, 'deep', depth=5)
+        table.put(20, 'shallow', depth=1)
+        self.assertIsNone(table.get(20))
+        self.assertEqual(table.get(10, depth=5), 'deep')
+        self.assertIsNone(table.get(10, depth=6))
+        table.put(30, 'deeper', depth=6)
+        self.assertEqual(table.get(30), 'deeper')
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.stats.evictions, 2)
+
+    def test_depth_same_key(self):
+        table = TranspositionTable(4, Eviction.Depth)
+        table.put(10, 'deep', depth=5)
+        table.put(10, 'shallow', depth=1)
+        self.assertEqual(table.get(10, depth=5), 'deep')
+        table.put(10, 'deeper', depth=6)
+        self.assertEqual(table.get(10, depth=6), 'deeper')
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.stats.evictions, 0)
+
+    def test_lru_same_key(self):
+        table = TranspositionTable(2)
+        table.put(10, 'deep', depth=5)
+        table.put(20, 'other')
+        table.put(10, 'shallow', depth=1)
+        self.assertEqual(table.get(10, depth=5), 'deep')
+        # 浅い値を置こうとしても最近使ったものとして扱う
+        table.put(20, 'other')
+        table.put(10, 'shallow', depth=1)
+        table.put(30, 'new')
+        self.assertIsNone(table.get(20))
+        self.assertEqual(table.get(10, depth=5), 'deep')
+        table.put(10, 'deeper', depth=6)
+        self.assertEqual(table.get(10, depth=6), 'deeper')
+
+    def test_clear(self):
+        table = TranspositionTable(4)
+        table.put('a', 1)
+        table.get('a')
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.stats.hits, 0)
+        self.assertIsNone(table.get('a'))
+
+    def test_from_memory(self):
+        table = TranspositionTable.from_memory(1)
+        self.assertGreater(table.capacity, 0)
+        with self.assertRaises(ValueError):
+            TranspositionTable(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
+import pickle
 import unittest
 
-from sanmoku.src.values import Cell
+from sanmoku.src.values import Cell, Position, intern_cells
 
 
 class TestValues(unittest.TestCase):
@@ -13,6 +14,41 @@ class TestValues(unittest.TestCase):
         self.assertEqual(cell.get(), (5, 7))
         print(cell)
 
+    def test_cell_eq(self):
+        self.assertEqual(Cell(1, 2), Cell(1, 2))
+        self.assertNotEqual(Cell(1, 2), Cell(2, 1))
+        self.assertEqual(Cell(1, 2), (1, 2))
+        self.assertNotEqual(Cell(1, 2), 'Cell(1, 2)')
+        self.assertEqual(hash(Cell(1, 2)), hash((1, 2)))
+        self.assertEqual(len({Cell(1, 2), Cell(1, 2), Cell(0, 0)}), 2)
+
+    def test_cell_intern(self):
+        intern_cells(9)
+        self.assertIs(Cell(8, 8), Cell(8, 8))
+        self.assertIs(pickle.loads(pickle.dumps(Cell(3, 4))), Cell(3, 4))
+        # 用意した範囲の外でも値としては等しい
+        self.assertEqual(Cell(1000, 1), Cell(1000, 1))
+        with self.assertRaises(ValueError):
+            Cell(-1, 0)
+
+    def test_cell_immutable(self):
+        cell = Cell(1, 2)
+        with self.assertRaises(AttributeError):
+            cell._row = 3
+        with self.assertRaises(AttributeError):
+            cell.extra = 1
+
+    def test_position(self):
+        pos = Position(3, 4)
+        self.assertEqual(pos, Position(3, 4))
+        self.assertEqual(pos, (3, 4))
+        self.assertNotEqual(pos, Position(4, 3))
+        self.assertEqual(hash(pos), hash(Position(3, 4)))
+        self.assertEqual(Position(), (0, 0))
+        self.assertEqual(pickle.loads(pickle.dumps(pos)), pos)
+        with self.assertRaises(AttributeError):
+            pos.x = 5
+
 
 if __name__ == "__main__":
     unittest.main()